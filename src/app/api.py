@@ -0,0 +1,266 @@
+"""Read-only query API over the measures, hospitals and budget data.
+
+Run with: uvicorn api:app --host 0.0.0.0 --port 8000
+
+Responses are JSON (default) or Arrow IPC (?format=arrow or
+Accept: application/vnd.apache.arrow.stream). Every response carries an ETag
+derived from the ETL data version, so clients revalidating with
+If-None-Match get a 304 until the next ETL commit.
+
+/export/measure_values streams a full selection as CSV or Parquet straight
+from a server-side cursor, without ever holding the result in memory.
+"""
+import csv
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from sqlalchemy import create_engine, text
+from budget import BUDGET_FILE, BUDGET_TABLES, budget_version
+from queries import EXPORT_ONLY, QUERIES, QUERY_PARAMS
+from result_cache import CACHE_MAX_ENTRY_SHARE
+
+DATABASE_URL = "postgresql+psycopg2://{user}:{password}@{host}:{port}/{db}".format(
+    user=os.environ.get("POSTGRES_USER", "myuser"),
+    password=os.environ.get("POSTGRES_PASSWORD", "mypassword"),
+    host=os.environ.get("POSTGRES_HOST", "postgres"),
+    port=os.environ.get("POSTGRES_PORT", "5432"),
+    db=os.environ.get("POSTGRES_DB", "mydatabase")
+)
+# Seconds shared caches may serve a response without revalidating
+API_MAX_AGE = int(os.environ.get("API_MAX_AGE", "60"))
+# Seconds the data version is reused before Postgres is asked again
+VERSION_TTL = float(os.environ.get("API_VERSION_TTL", "2"))
+# Bytes of encoded responses kept in memory, keyed by ETag; like the dashboard's
+# result cache, responses over CACHE_MAX_ENTRY_SHARE of it are never kept
+RESPONSE_CACHE_BYTES = int(os.environ.get("API_RESPONSE_CACHE_BYTES", str(64 * 2**20)))
+# Rows fetched from the server-side cursor (and encoded) per export chunk
+EXPORT_CHUNK_ROWS = int(os.environ.get("API_EXPORT_CHUNK_ROWS", "10000"))
+
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+EXPORT_COLUMNS = ["reportingstartdate", "value", "hospital_name", "reportingunitcode", "datasetid"]
+EXPORT_SCHEMA = pa.schema([
+    ("reportingstartdate", pa.date32()),
+    ("value", pa.float64()),
+    ("hospital_name", pa.string()),
+    ("reportingunitcode", pa.string()),
+    ("datasetid", pa.int32())
+])
+EXPORT_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+engine = create_engine(DATABASE_URL, pool_size=5, max_overflow=10)
+
+app = FastAPI(title="Healthcare Resource Allocation API")
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+_version = {"value": None, "checked": 0.0}
+_responses = OrderedDict()  # ETag -> (body, media type)
+_response_bytes = {"value": 0}
+_lock = threading.Lock()
+
+
+def data_version():
+    """Returns the ETL data version, bumped by every ETL commit."""
+    with _lock:
+        if time.monotonic() - _version["checked"] < VERSION_TTL:
+            return _version["value"]
+    with engine.connect() as conn:
+        value = conn.execute(text("SELECT version FROM data_version WHERE id = 1")).scalar()
+    with _lock:
+        _version["value"], _version["checked"] = value, time.monotonic()
+    return value
+
+
+def response_format(request):
+    fmt = request.query_params.get("format")
+    if fmt is None:
+        fmt = "arrow" if ARROW_TYPE in request.headers.get("accept", "") else "json"
+    if fmt not in ("json", "arrow"):
+        raise HTTPException(status_code=400, detail=f"Unknown format {fmt}")
+    return fmt
+
+
+def encode(df, fmt):
+    if fmt == "arrow":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue(), ARROW_TYPE
+    return df.to_json(orient="records", date_format="iso").encode("utf-8"), "application/json"
+
+
+def keep_response(etag, response):
+    """Adds an encoded response to the cache, evicting the least recently used ones to stay within budget."""
+    size = len(response[0])
+    if size > RESPONSE_CACHE_BYTES * CACHE_MAX_ENTRY_SHARE:
+        return
+    with _lock:
+        if etag in _responses:
+            _response_bytes["value"] -= len(_responses.pop(etag)[0])
+        while _responses and _response_bytes["value"] + size > RESPONSE_CACHE_BYTES:
+            _response_bytes["value"] -= len(_responses.popitem(last=False)[1][0])
+        _responses[etag] = response
+        _response_bytes["value"] += size
+
+
+def cached_response(request, version, key, fmt, load):
+    """Serves a result with ETag/Cache-Control, answering 304 when the client is up to date."""
+    digest = hashlib.sha1(repr((key, fmt)).encode("utf-8")).hexdigest()[:16]
+    etag = f'"{version}-{digest}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={API_MAX_AGE}, must-revalidate",
+        "Vary": "Accept, Accept-Encoding"
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    with _lock:
+        cached = _responses.get(etag)
+        if cached is not None:
+            _responses.move_to_end(etag)
+    if cached is None:
+        cached = encode(load(), fmt)
+        keep_response(etag, cached)
+
+    body, media_type = cached
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+@app.get("/version")
+def version():
+    return {"data_version": data_version(), "budget_version": budget_version()}
+
+
+@app.get("/query/{name}")
+def query(name: str, request: Request):
+    if name not in QUERIES:
+        raise HTTPException(status_code=404, detail=f"Unknown query {name}")
+    if name in EXPORT_ONLY:
+        # Would build the whole selection in memory; the export endpoint streams it
+        raise HTTPException(status_code=400, detail=f"{name} is export-only, use /export/measure_values")
+    missing = [param for param in QUERY_PARAMS[name] if param not in request.query_params]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing parameters: {', '.join(missing)}")
+
+    params = {param: request.query_params[param] for param in QUERY_PARAMS[name]}
+    fmt = response_format(request)
+
+    def load():
+        with engine.connect() as conn:
+            return pd.read_sql(text(QUERIES[name]), conn, params=params)
+
+    return cached_response(request, data_version(), (name, sorted(params.items())), fmt, load)
+
+
+@app.get("/budget/{table}")
+def budget(table: str, request: Request):
+    if table not in BUDGET_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown budget table {table}")
+    fmt = response_format(request)
+    return cached_response(request, budget_version(), ("budget", table), fmt,
+                           lambda: BUDGET_TABLES[table](pd.ExcelFile(BUDGET_FILE)))
+
+
+def stream_rows(sql, params, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields lists of rows through a server-side cursor, chunk_rows at a time."""
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows).execute(text(sql), params)
+        for chunk in result.partitions(chunk_rows):
+            yield chunk
+
+
+def csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class ChunkSink:
+    """Write-only file handing out what was written since the last drain.
+
+    The position keeps counting across drains, so the Parquet footer offsets
+    stay right although only one row group is ever buffered.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def parquet_chunks(chunks):
+    sink = ChunkSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), EXPORT_SCHEMA) as writer:
+        for rows in chunks:
+            # One row group per chunk
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, EXPORT_SCHEMA)],
+                schema=EXPORT_SCHEMA
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+
+@app.get("/export/measure_values")
+def export_measure_values(measure: str, reported_measure: str, state: str = "", national: bool = False,
+                          hospital_filter: str = "", descending: bool = False, format: str = "csv"):
+    """Streams every row of a measure selection, encoded chunk by chunk."""
+    if format not in EXPORT_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown export format {format}")
+    params = {
+        "measure": measure,
+        "reported_measure": reported_measure,
+        "state": state,
+        "national": national,
+        "hospital_filter": hospital_filter
+    }
+    name = "measure_values_export_desc" if descending else "measure_values_export"
+    chunks = stream_rows(QUERIES[name], params)
+    body = csv_chunks(chunks) if format == "csv" else parquet_chunks(chunks)
+    filename = f"{measure} - {reported_measure}.{format}".replace('"', "")
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Cache-Control": "no-store"
+    }
+    return StreamingResponse(body, media_type=EXPORT_TYPES[format], headers=headers)
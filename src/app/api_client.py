@@ -0,0 +1,78 @@
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+import pyarrow as pa
+import requests
+
+# Base URL of the read API (api.py)
+API_URL = os.environ.get("API_URL", "http://api:8000")
+# Address of the read API as seen from the browser; enables streamed exports when set
+API_PUBLIC_URL = os.environ.get("API_PUBLIC_URL", "")
+# Responses kept for revalidation with If-None-Match
+CLIENT_CACHE_SIZE = int(os.environ.get("API_CLIENT_CACHE_SIZE", "128"))
+
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+
+class ApiClient:
+    """Fetches query results from the read API as DataFrames.
+
+    The last ETag of every URL is remembered and sent back as If-None-Match,
+    so unchanged results cost a 304 and no payload.
+    """
+
+    def __init__(self, base_url=API_URL, cache_size=CLIENT_CACHE_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.cache_size = cache_size
+        self.session = requests.Session()
+        self.session.headers["Accept"] = ARROW_TYPE
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path, params=None):
+        key = (path, tuple(sorted((params or {}).items())))
+        headers = {}
+        with self.lock:
+            cached = self.cache.get(key)
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+
+        response = self.session.get(f"{self.base_url}{path}", params=params, headers=headers, timeout=60)
+        if response.status_code == 304 and cached is not None:
+            with self.lock:
+                self.cache.move_to_end(key)
+            # Callers modify frames in place, so the cached frame is never handed out
+            return cached[1].copy()
+        response.raise_for_status()
+
+        with pa.ipc.open_stream(response.content) as reader:
+            df = reader.read_pandas()
+
+        etag = response.headers.get("ETag")
+        if etag:
+            with self.lock:
+                self.cache[key] = (etag, df)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return df.copy()
+
+    def version(self):
+        response = self.session.get(f"{self.base_url}/version", headers={"Accept": "application/json"}, timeout=10)
+        response.raise_for_status()
+        return response.json()["data_version"]
+
+    def query(self, name, params=None):
+        return self.get(f"/query/{name}", params)
+
+    def budget(self, table):
+        return self.get(f"/budget/{table}")
+
+
+def export_url(params, descending, fmt):
+    """Browser link to the API's streamed export of a measure selection."""
+    query = {**params, "descending": descending, "format": fmt}
+    return f"{API_PUBLIC_URL.rstrip('/')}/export/measure_values?{urlencode(query)}"
+
+
+client = ApiClient()
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+import pandas as pd
+import streamlit as st
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL
+from budget import BUDGET_TABLES
+from queries import QUERIES
+from result_cache import cache as result_cache, frame_size
+from query_log import log as query_log
+
+
+# Database Connection Details
+POSTGRES_CONNECTION = {
+    "dialect": "postgresql",
+    "host": "postgres",
+    "port": "5432",
+    "username": "myuser",
+    "password": "mypassword",
+    "database": "mydatabase"
+}
+
+# Read backend: "postgres" queries the database, "duckdb" the ETL's latest Parquet snapshot,
+# "api" the shared read API (api.py)
+DASHBOARD_BACKEND = os.environ.get("DASHBOARD_BACKEND", "postgres")
+
+# Admin page is listed in the menu only when a token is configured
+DASHBOARD_ADMIN_TOKEN = os.environ.get("DASHBOARD_ADMIN_TOKEN", "")
+# Seconds the ETL data version is reused before the backend is asked again
+VERSION_CHECK_SECONDS = float(os.environ.get("DASHBOARD_VERSION_CHECK_SECONDS", "5"))
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def engine():
+    """Postgres engine shared by every session and the warm-up thread.
+
+    Created directly rather than through st.connection, which needs a script
+    run context, and read without going through Streamlit's own, unbounded
+    result cache.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            options = dict(POSTGRES_CONNECTION)
+            url = URL.create(options.pop("dialect"), port=int(options.pop("port")), **options)
+            _engine = create_engine(url, pool_pre_ping=True)
+        return _engine
+
+
+# Fetch data function
+
+def query_backend(sql, params=None):
+    """Runs SQL on the configured backend, raising on failure."""
+    if DASHBOARD_BACKEND == "duckdb":
+        from duckdb_backend import reader
+        return reader.query(sql, params)
+
+    with engine().connect() as connection:
+        return pd.read_sql_query(text(sql), connection, params=params)
+
+
+_data_version = {"value": None, "checked": 0.0}
+
+def data_version():
+    """ETL data version of the configured backend; cached results are dropped when it changes."""
+    if time.monotonic() - _data_version["checked"] < VERSION_CHECK_SECONDS:
+        return _data_version["value"]
+    try:
+        if DASHBOARD_BACKEND == "duckdb":
+            from duckdb_backend import reader
+            value = reader.current_version()
+        elif DASHBOARD_BACKEND == "api":
+            from api_client import client
+            value = client.version()
+        else:
+            value = int(query_backend("SELECT version FROM data_version WHERE id = 1").iloc[0, 0])
+    except Exception:
+        # Keep serving the last known version rather than flushing the cache on a hiccup
+        value = _data_version["value"]
+    _data_version["value"], _data_version["checked"] = value, time.monotonic()
+    return value
+
+
+def load_query(name, params=None):
+    """Runs one of the named queries in queries.py on the configured backend, bypassing the cache."""
+    if DASHBOARD_BACKEND == "api":
+        from api_client import client
+        return client.query(name, params)
+    return query_backend(QUERIES[name], params or None)
+
+
+def cached_query(name, **params):
+    """Runs one of the named queries in queries.py through the shared result cache, raising on failure.
+
+    Every call is timed into query_log, with its row count, result size and
+    whether the cache answered it. Needs no Streamlit session, so the warm-up
+    thread uses it directly.
+    """
+    key = (name, tuple(sorted(params.items())))
+    version = data_version()
+    loaded = []
+
+    def load():
+        loaded.append(True)
+        return load_query(name, params)
+
+    start = time.perf_counter()
+    try:
+        df = result_cache.get_or_load(key, version, load)
+    except Exception as e:
+        query_log.record(name, params, time.perf_counter() - start, error=str(e))
+        raise
+    seconds = time.perf_counter() - start
+    # Results too large for the cache are not sized by it
+    nbytes = result_cache.size_of(key)
+    query_log.record(name, params, seconds, len(df), frame_size(df) if nbytes is None else nbytes,
+                     cache="miss" if loaded else "hit")
+    return df
+
+
+def run_query(name, **params):
+    """cached_query for pages: failures are shown in the page and give an empty DataFrame."""
+    try:
+        return cached_query(name, **params)
+    except Exception as e:
+        st.error(f"Failed to fetch data: {e}")
+        return pd.DataFrame()
+
+
+def load_budget_table(name, xls=None):
+    """Loads a cleaned budget table, from the read API when DASHBOARD_BACKEND is "api"."""
+    if DASHBOARD_BACKEND == "api":
+        from api_client import client
+        return client.budget(name)
+    return BUDGET_TABLES[name](xls)
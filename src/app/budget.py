@@ -0,0 +1,67 @@
+import os
+import pandas as pd
+
+# Health expenditure workbook shipped with the dashboard image
+BUDGET_FILE = 'data/Expediture.xlsx'
+
+
+def budget_version():
+    """Version of the budget data, taken from the workbook's modification time."""
+    return str(int(os.path.getmtime(BUDGET_FILE)))
+
+
+def load_health_spending(xls=None):
+    """Table 1: total health spending and annual rates of change."""
+    if xls is None:
+        xls = pd.ExcelFile(BUDGET_FILE)
+    df_table_1 = pd.read_excel(xls, 'Table 1')
+    df_cleaned_1 = df_table_1.drop([0, 1]).reset_index(drop=True)
+    df_cleaned_1.columns = ['Year', 'Current_Price', 'Constant_Price', 'NaN1', 'Nominal_Change', 'Real_Growth']
+    df_cleaned_1 = df_cleaned_1.drop(columns=['NaN1'])
+    df_cleaned_1['Current_Price'] = pd.to_numeric(df_cleaned_1['Current_Price'], errors='coerce')
+    df_cleaned_1['Constant_Price'] = pd.to_numeric(df_cleaned_1['Constant_Price'], errors='coerce')
+    df_cleaned_1['Nominal_Change'] = pd.to_numeric(df_cleaned_1['Nominal_Change'], errors='coerce')
+    df_cleaned_1['Real_Growth'] = pd.to_numeric(df_cleaned_1['Real_Growth'], errors='coerce')
+
+    # Use only the first 10 rows (excluding the first row with NaNs)
+    return df_cleaned_1[1:11].reset_index(drop=True)
+
+
+def load_state_spending(xls=None):
+    """Table 4: health spending in constant prices by state and territory."""
+    if xls is None:
+        xls = pd.ExcelFile(BUDGET_FILE)
+    df_table_4 = pd.read_excel(xls, 'Table 4')
+
+    # Remove unnecessary rows and columns
+    df_table_4 = df_table_4.iloc[1:12].reset_index(drop=True)
+    df_table_4.columns = ['Year', 'NSW', 'NSW_NaN', 'VIC', 'VIC_NaN', 'QLD', 'QLD_NaN', 'SA', 'SA_NaN', 'WA', 'WA_NaN',
+                          'TAS', 'TAS_NaN', 'ACT', 'ACT_NaN', 'NT', 'NT_NaN', 'Australia']
+    df_table_4 = df_table_4[['Year', 'NSW', 'VIC', 'QLD', 'SA', 'WA', 'TAS', 'ACT', 'NT', 'Australia']]
+
+    # Convert numeric columns to proper numeric types
+    cols = df_table_4.columns.drop('Year')
+    df_table_4[cols] = df_table_4[cols].apply(pd.to_numeric, errors='coerce')
+    return df_table_4
+
+
+def load_gdp_ratio(xls=None):
+    """Table 7: GDP and the health spending to GDP ratio."""
+    if xls is None:
+        xls = pd.ExcelFile(BUDGET_FILE)
+    df_table_7 = pd.read_excel(xls, 'Table 7')
+    df_table_7_cleaned = df_table_7.iloc[2:13, [0, 4, 6]].reset_index(drop=True)
+    df_table_7_cleaned.columns = ['Year', 'GDP', 'Health_to_GDP_Ratio']
+
+    # Clean the 'Year' column to handle the '2011–12' format
+    df_table_7_cleaned['Year'] = df_table_7_cleaned['Year'].apply(lambda x: x.split('–')[0]).astype(int)
+    df_table_7_cleaned['GDP'] = pd.to_numeric(df_table_7_cleaned['GDP'], errors='coerce')
+    df_table_7_cleaned['Health_to_GDP_Ratio'] = pd.to_numeric(df_table_7_cleaned['Health_to_GDP_Ratio'], errors='coerce')
+    return df_table_7_cleaned
+
+
+BUDGET_TABLES = {
+    "health_spending": load_health_spending,
+    "state_spending": load_state_spending,
+    "gdp_ratio": load_gdp_ratio
+}
@@ -0,0 +1,66 @@
+import os
+import re
+import threading
+import duckdb
+
+# Directory the ETL publishes Parquet snapshots to (see processing/utilities/snapshot.py)
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", "/data/lake/snapshots")
+
+TABLES = ["datasets", "measurements", "reported_measurements", "hospitals", "anomalies", "hospital_rankings"]
+
+
+class SnapshotReader:
+    """Runs dashboard SQL with DuckDB over the current Parquet snapshot.
+
+    The CURRENT pointer is checked before every query; when the ETL has
+    published a new snapshot, a new in-memory DuckDB database is built over it
+    and swapped in, so a query always sees one complete snapshot.
+    """
+
+    def __init__(self, snapshot_path=SNAPSHOT_PATH):
+        self.snapshot_path = snapshot_path
+        self.version = None
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def current_version(self):
+        with open(os.path.join(self.snapshot_path, "CURRENT")) as f:
+            return f.read().strip()
+
+    def open_snapshot(self, version):
+        directory = os.path.join(self.snapshot_path, version)
+        conn = duckdb.connect(database=":memory:")
+        for table in TABLES:
+            path = os.path.join(directory, f"{table}.parquet")
+            conn.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{path}')")
+        info_glob = os.path.join(directory, "info", "*.parquet")
+        conn.execute(f"CREATE VIEW info AS SELECT datasetid, reportingunitcode, value, caveats "
+                     f"FROM read_parquet('{info_glob}', union_by_name = true)")
+        return conn
+
+    def connection(self):
+        version = self.current_version()
+        with self.lock:
+            if version != self.version:
+                # The previous database is left to the garbage collector so
+                # cursors still running on it can finish
+                self.conn, self.version = self.open_snapshot(version), version
+            # DuckDB connections are not shared across threads; each query gets a cursor
+            return self.conn.cursor()
+
+    def query(self, sql, params=None):
+        """Runs a query and returns a pandas DataFrame.
+
+        SQLAlchemy-style :name parameters are rewritten to DuckDB's $name.
+        """
+        cursor = self.connection()
+        try:
+            if params:
+                sql = re.sub(r"(?<!:):(\w+)", r"$\1", sql)
+                return cursor.execute(sql, params).df()
+            return cursor.execute(sql).df()
+        finally:
+            cursor.close()
+
+
+reader = SnapshotReader()
@@ -0,0 +1,36 @@
+"""Starts the dashboard with a warm start.
+
+Runs the Streamlit server in this process, so the page modules imported and
+the results preloaded by warmup.start() are the ones sessions use.
+Usage: python3 launch.py [streamlit server flags, e.g. --server.port 8501 or --server.port=8501]
+"""
+import logging
+import sys
+from streamlit.web import bootstrap
+import warmup
+
+
+def parse_flags(args):
+    """Streamlit flag options of "--key=value" and "--key value" arguments, typed like the CLI would."""
+    flag_options = {}
+    args = list(args)
+    while args:
+        key, equals, value = args.pop(0).lstrip("-").partition("=")
+        if not equals:
+            # A flag without a value is a switch, e.g. --server.headless
+            value = args.pop(0) if args and not args[0].startswith("--") else "true"
+        if value.isdigit():
+            value = int(value)
+        elif value.lower() in ("true", "false"):
+            value = value.lower() == "true"
+        flag_options[key.replace(".", "_")] = value
+    return flag_options
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    flag_options = parse_flags(sys.argv[1:])
+    warmup.start()
+    bootstrap.load_config_options(flag_options=flag_options)
+    bootstrap.run("dashboard.py", False, [], flag_options)
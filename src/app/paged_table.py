@@ -0,0 +1,86 @@
+import pandas as pd
+import streamlit as st
+from api_client import API_PUBLIC_URL, export_url
+from backend import run_query
+
+PAGE_SIZES = [50, 100, 500]
+
+# Keyset of the first page: any real row sorts after (or, descending, before) it
+FIRST_PAGE = {"first_page": True, "after_date": "0001-01-01", "after_hospital": "", "after_datasetid": 0,
+              "after_unit": ""}
+
+
+def page_query(descending):
+    return "measure_values_page_desc" if descending else "measure_values_page"
+
+
+def keyset_after(row):
+    """Keyset parameters for the page that follows row."""
+    return {
+        "first_page": False,
+        "after_date": str(pd.to_datetime(row['reportingstartdate']).date()),
+        # Pages order a missing name as '', see MEASURE_VALUES_PAGE
+        "after_hospital": row['hospital_name'] if pd.notna(row['hospital_name']) else "",
+        "after_datasetid": int(row['datasetid']),
+        "after_unit": row['reportingunitcode']
+    }
+
+
+def paged_table(key, measure, reported_measure, state, national):
+    """Raw data table with keyset pagination, server-side sort and hospital filter.
+
+    Only one page of page_size rows is fetched and sent to the browser per
+    rerun, however large the selection.
+    """
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        hospital_filter = st.text_input("Filter by hospital", key=f"{key}_filter")
+    with col2:
+        order = st.selectbox("Sort", ["Oldest first", "Newest first"], key=f"{key}_order")
+    with col3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+
+    descending = order == "Newest first"
+    params = {
+        "measure": measure,
+        "reported_measure": reported_measure,
+        "state": state,
+        "national": national,
+        "hospital_filter": hospital_filter.strip()
+    }
+
+    # Keysets of the pages visited so far; reset whenever the selection changes
+    selection = (tuple(sorted(params.items())), descending, page_size)
+    if st.session_state.get(f"{key}_selection") != selection:
+        st.session_state[f"{key}_selection"] = selection
+        st.session_state[f"{key}_keysets"] = [FIRST_PAGE]
+    keysets = st.session_state[f"{key}_keysets"]
+
+    # One extra row tells whether a next page exists
+    page = run_query(page_query(descending), **params, **keysets[-1], page_size=page_size + 1)
+    has_next = len(page) > page_size
+    page = page.head(page_size)
+
+    st.dataframe(page[['reportingstartdate', 'value', 'hospital_name']] if not page.empty else page,
+                 use_container_width=True)
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("Previous", key=f"{key}_prev", disabled=len(keysets) == 1):
+            keysets.pop()
+            st.rerun()
+    with col2:
+        st.write(f"Page {len(keysets)}")
+    with col3:
+        if st.button("Next", key=f"{key}_next", disabled=not has_next):
+            keysets.append(keyset_after(page.iloc[-1]))
+            st.rerun()
+
+    with st.expander("Export full result"):
+        fmt = st.radio("Format", ["csv", "parquet"], horizontal=True, key=f"{key}_format")
+        if API_PUBLIC_URL:
+            # Streamed by the API straight from the database, nothing is buffered here
+            st.link_button("Download", export_url(params, descending, fmt))
+        else:
+            # A download button needs the whole file in this process, so exports go through the API only
+            st.info("Full exports are streamed by the query API; set API_PUBLIC_URL to enable them.")
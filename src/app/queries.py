@@ -0,0 +1,326 @@
+# Named dashboard queries, shared by dashboard.py and the read API (api.py).
+# Parameters use the :name style understood by SQLAlchemy (and rewritten for DuckDB).
+
+QUERIES = {
+    "measures_catalogue": '''
+    SELECT
+        ds.*,
+        m.measurename,
+        rm.reportedmeasurename
+    FROM
+        datasets ds
+    LEFT JOIN
+        measurements m ON ds.measurecode = m.measurecode
+    LEFT JOIN
+        reported_measurements rm ON ds.reportedmeasurecode = rm.reportedmeasurecode
+    WHERE
+        ds.stored = TRUE;
+    ''',
+
+    "states": '''
+    SELECT DISTINCT
+        state
+    FROM
+        hospitals
+    WHERE
+        open_closed = 'Open';
+    ''',
+
+    "measure_values_state": '''
+    SELECT
+        info.value,
+        ds.reportingstartdate,
+        info.reportingunitcode,
+        h.name as hospital_name,
+        h.latitude,
+        h.longitude
+    FROM
+        datasets ds
+    JOIN
+        measurements m ON ds.measurecode = m.measurecode
+    JOIN
+        reported_measurements rm ON ds.reportedmeasurecode = rm.reportedmeasurecode
+    JOIN
+        info ON ds.datasetid = info.datasetid
+    JOIN
+        hospitals h ON info.reportingunitcode = h.code
+    WHERE
+        m.measurename = :measure AND
+        rm.reportedmeasurename = :reported_measure AND
+        ds.stored = TRUE AND
+        h.state = :state
+    ORDER BY
+        ds.reportingstartdate ASC;
+    ''',
+
+    "measure_values_national": '''
+    SELECT
+        info.value,
+        ds.reportingstartdate,
+        info.reportingunitcode,
+        h.name as hospital_name,
+        h.latitude,
+        h.longitude
+    FROM
+        datasets ds
+    JOIN
+        measurements m ON ds.measurecode = m.measurecode
+    JOIN
+        reported_measurements rm ON ds.reportedmeasurecode = rm.reportedmeasurecode
+    JOIN
+        info ON ds.datasetid = info.datasetid
+    JOIN
+        hospitals h ON info.reportingunitcode = h.code
+    WHERE
+        m.measurename = :measure AND
+        rm.reportedmeasurename = :reported_measure AND
+        ds.stored = TRUE AND
+        info.reportingunitcode = 'NAT'
+    ORDER BY
+        ds.reportingstartdate ASC;
+    ''',
+
+    "national_average": '''
+    SELECT
+        info.value,
+        ds.reportingstartdate
+    FROM
+        datasets ds
+    JOIN
+        measurements m ON ds.measurecode = m.measurecode
+    JOIN
+        reported_measurements rm ON ds.reportedmeasurecode = rm.reportedmeasurecode
+    JOIN
+        info ON ds.datasetid = info.datasetid
+    WHERE
+        m.measurename = :measure AND
+        rm.reportedmeasurename = :reported_measure AND
+        ds.stored = TRUE AND
+        info.reportingunitcode = 'NAT'
+    ORDER BY
+        ds.reportingstartdate ASC;
+    ''',
+
+    "metric_by_state": '''
+    SELECT
+        info.value,
+        ds.reportingstartdate,
+        info.reportingunitcode,
+        h.name as hospital_name
+    FROM
+        datasets ds
+    JOIN
+        measurements m ON ds.measurecode = m.measurecode
+    JOIN
+        reported_measurements rm ON ds.reportedmeasurecode = rm.reportedmeasurecode
+    JOIN
+        info ON ds.datasetid = info.datasetid
+    JOIN
+        hospitals h ON info.reportingunitcode = h.code
+    WHERE
+        m.measurename = :measure AND
+        ds.stored = TRUE AND
+        h.state = :state
+    ORDER BY
+        ds.reportingstartdate ASC;
+    ''',
+
+    "hospitals": '''
+    SELECT Latitude, Longitude, Name, Type, Sector, Open_Closed, State FROM hospitals
+    ''',
+
+    "hospital_locations": '''
+    SELECT
+        code, name, type, sector, open_closed, state, lhn, phn, latitude, longitude
+    FROM
+        hospitals
+    WHERE
+        latitude IS NOT NULL AND longitude IS NOT NULL;
+    ''',
+
+    # Most recent value of a measure for every reporting unit
+    "measure_latest_values": '''
+    SELECT DISTINCT ON (info.reportingunitcode)
+        info.reportingunitcode,
+        info.value,
+        ds.reportingstartdate
+    FROM
+        datasets ds
+    JOIN
+        measurements m ON ds.measurecode = m.measurecode
+    JOIN
+        reported_measurements rm ON ds.reportedmeasurecode = rm.reportedmeasurecode
+    JOIN
+        info ON ds.datasetid = info.datasetid
+    WHERE
+        m.measurename = :measure AND
+        rm.reportedmeasurename = :reported_measure AND
+        ds.stored = TRUE AND
+        info.value IS NOT NULL
+    ORDER BY
+        info.reportingunitcode, ds.reportingstartdate DESC;
+    ''',
+
+    # Points flagged by the ETL's anomaly stage, most recent and most extreme first
+    "measure_anomalies": '''
+    SELECT
+        a.reportingstartdate,
+        h.name as hospital_name,
+        a.value,
+        a.baseline,
+        a.robust_z,
+        a.pct_change,
+        a.reason
+    FROM
+        anomalies a
+    JOIN
+        measurements m ON a.measurecode = m.measurecode
+    JOIN
+        reported_measurements rm ON a.reportedmeasurecode = rm.reportedmeasurecode
+    LEFT JOIN
+        hospitals h ON a.reportingunitcode = h.code
+    WHERE
+        m.measurename = :measure AND
+        rm.reportedmeasurename = :reported_measure AND
+        (CAST(:national AS BOOLEAN) OR h.state = :state)
+    ORDER BY
+        a.reportingstartdate DESC, ABS(a.robust_z) DESC NULLS LAST
+    LIMIT 500;
+    ''',
+
+    # Top k hospitals of a measure from the rankings the ETL maintains, within
+    # a state or across all states
+    "top_hospitals": '''
+    SELECT
+        CASE WHEN CAST(:national AS BOOLEAN) THEN r.national_rank ELSE r.state_rank END AS rank,
+        h.name as hospital_name,
+        r.state,
+        r.mean_value AS value,
+        r.latest_value,
+        r.latest_date,
+        r.periods,
+        CASE WHEN CAST(:national AS BOOLEAN) THEN r.national_percentile ELSE r.state_percentile END AS percentile
+    FROM
+        hospital_rankings r
+    JOIN
+        measurements m ON r.measurecode = m.measurecode
+    JOIN
+        reported_measurements rm ON r.reportedmeasurecode = rm.reportedmeasurecode
+    JOIN
+        hospitals h ON r.reportingunitcode = h.code
+    WHERE
+        m.measurename = :measure AND
+        rm.reportedmeasurename = :reported_measure AND
+        ((CAST(:national AS BOOLEAN) AND r.national_rank <= CAST(:k AS INTEGER)) OR
+         (NOT CAST(:national AS BOOLEAN) AND r.state = :state AND r.state_rank <= CAST(:k AS INTEGER)))
+    ORDER BY
+        rank ASC, hospital_name ASC;
+    '''
+}
+
+# Keyset-paginated raw rows of a measure, for the Measures data table. Pages are
+# ordered by (reportingstartdate, hospital_name, datasetid, reportingunitcode)
+# and each page starts after the last row of the previous one, so every page
+# costs the same whatever its position. The key must be unique or rows tied
+# with the last row of a page are skipped: datasetid breaks ties between
+# datasets sharing a date, reportingunitcode between hospitals sharing a name.
+# A NULL name would make the row comparison NULL, so names compare as ''.
+MEASURE_VALUES_PAGE = '''
+    SELECT
+        ds.reportingstartdate,
+        info.value,
+        h.name as hospital_name,
+        info.datasetid,
+        info.reportingunitcode
+    FROM
+        datasets ds
+    JOIN
+        measurements m ON ds.measurecode = m.measurecode
+    JOIN
+        reported_measurements rm ON ds.reportedmeasurecode = rm.reportedmeasurecode
+    JOIN
+        info ON ds.datasetid = info.datasetid
+    JOIN
+        hospitals h ON info.reportingunitcode = h.code
+    WHERE
+        m.measurename = :measure AND
+        rm.reportedmeasurename = :reported_measure AND
+        ds.stored = TRUE AND
+        info.value IS NOT NULL AND
+        ((CAST(:national AS BOOLEAN) AND info.reportingunitcode = 'NAT') OR
+         (NOT CAST(:national AS BOOLEAN) AND h.state = :state)) AND
+        (:hospital_filter = '' OR h.name ILIKE '%' || :hospital_filter || '%') AND
+        (CAST(:first_page AS BOOLEAN) OR
+         (ds.reportingstartdate, COALESCE(h.name, ''), info.datasetid, info.reportingunitcode) {op}
+         (CAST(:after_date AS DATE), :after_hospital, CAST(:after_datasetid AS INTEGER), :after_unit))
+    ORDER BY
+        ds.reportingstartdate {direction}, COALESCE(h.name, '') {direction}, info.datasetid {direction},
+        info.reportingunitcode {direction}
+    LIMIT CAST(:page_size AS INTEGER);
+    '''
+
+QUERIES["measure_values_page"] = MEASURE_VALUES_PAGE.format(op=">", direction="ASC")
+QUERIES["measure_values_page_desc"] = MEASURE_VALUES_PAGE.format(op="<", direction="DESC")
+
+# Full selection behind the data table (same filter and order, no keyset or
+# limit), streamed through a server-side cursor by the API's /export endpoint
+MEASURE_VALUES_EXPORT = '''
+    SELECT
+        ds.reportingstartdate,
+        info.value,
+        h.name as hospital_name,
+        info.reportingunitcode,
+        info.datasetid
+    FROM
+        datasets ds
+    JOIN
+        measurements m ON ds.measurecode = m.measurecode
+    JOIN
+        reported_measurements rm ON ds.reportedmeasurecode = rm.reportedmeasurecode
+    JOIN
+        info ON ds.datasetid = info.datasetid
+    JOIN
+        hospitals h ON info.reportingunitcode = h.code
+    WHERE
+        m.measurename = :measure AND
+        rm.reportedmeasurename = :reported_measure AND
+        ds.stored = TRUE AND
+        info.value IS NOT NULL AND
+        ((CAST(:national AS BOOLEAN) AND info.reportingunitcode = 'NAT') OR
+         (NOT CAST(:national AS BOOLEAN) AND h.state = :state)) AND
+        (:hospital_filter = '' OR h.name ILIKE '%' || :hospital_filter || '%')
+    ORDER BY
+        ds.reportingstartdate {direction}, COALESCE(h.name, '') {direction}, info.datasetid {direction},
+        info.reportingunitcode {direction};
+    '''
+
+QUERIES["measure_values_export"] = MEASURE_VALUES_EXPORT.format(direction="ASC")
+QUERIES["measure_values_export_desc"] = MEASURE_VALUES_EXPORT.format(direction="DESC")
+
+# Queries whose whole result is only served streamed, by the API's /export endpoint
+EXPORT_ONLY = {"measure_values_export", "measure_values_export_desc"}
+
+PAGE_PARAMS = ["measure", "reported_measure", "state", "national", "hospital_filter",
+               "first_page", "after_date", "after_hospital", "after_datasetid", "after_unit",
+               "page_size"]
+
+EXPORT_PARAMS = ["measure", "reported_measure", "state", "national", "hospital_filter"]
+
+# Parameters each query requires
+QUERY_PARAMS = {
+    "measures_catalogue": [],
+    "states": [],
+    "measure_values_state": ["measure", "reported_measure", "state"],
+    "measure_values_national": ["measure", "reported_measure"],
+    "national_average": ["measure", "reported_measure"],
+    "metric_by_state": ["measure", "state"],
+    "hospitals": [],
+    "hospital_locations": [],
+    "measure_latest_values": ["measure", "reported_measure"],
+    "measure_anomalies": ["measure", "reported_measure", "state", "national"],
+    "top_hospitals": ["measure", "reported_measure", "state", "national", "k"],
+    "measure_values_page": PAGE_PARAMS,
+    "measure_values_page_desc": PAGE_PARAMS,
+    "measure_values_export": EXPORT_PARAMS,
+    "measure_values_export_desc": EXPORT_PARAMS
+}
@@ -0,0 +1,92 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Queries slower than this (cache hits included) go to the slow-query log
+SLOW_QUERY_MS = float(os.environ.get("DASHBOARD_SLOW_QUERY_MS", "500"))
+# Slow queries kept for the admin page
+SLOW_LOG_SIZE = int(os.environ.get("DASHBOARD_SLOW_LOG_SIZE", "200"))
+# Recent durations kept per page and query for the percentiles
+DURATIONS_KEPT = 256
+
+_page = threading.local()
+
+
+def set_page(page):
+    """Attributes the queries of the current thread (one Streamlit session run) to page."""
+    _page.name = page
+
+
+def current_page():
+    return getattr(_page, "name", None) or "(background)"
+
+
+class QueryLog:
+    """Timings of every dashboard query, per page and query name, plus the recent slow ones.
+
+    Shared by all sessions of the process, like result_cache.cache.
+    """
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS, slow_size=SLOW_LOG_SIZE):
+        self.slow_ms = slow_ms
+        self.slow = deque(maxlen=slow_size)
+        self.totals = {}  # (page, name) -> counters and recent durations
+        self.lock = threading.Lock()
+
+    def record(self, name, params, seconds, rows=0, nbytes=0, cache="miss", error=None):
+        page = current_page()
+        ms = seconds * 1000
+        with self.lock:
+            totals = self.totals.get((page, name))
+            if totals is None:
+                totals = self.totals[(page, name)] = {"calls": 0, "hits": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                                      "rows": 0, "bytes": 0, "durations": deque(maxlen=DURATIONS_KEPT)}
+            totals["calls"] += 1
+            totals["hits"] += cache == "hit"
+            totals["errors"] += error is not None
+            totals["total_ms"] += ms
+            totals["max_ms"] = max(totals["max_ms"], ms)
+            totals["rows"] += rows
+            totals["bytes"] += nbytes
+            totals["durations"].append(ms)
+            if ms >= self.slow_ms or error is not None:
+                self.slow.append({"at": time.strftime("%Y-%m-%d %H:%M:%S"), "page": page, "query": name,
+                                  "ms": round(ms, 1), "rows": rows, "bytes": nbytes, "cache": cache,
+                                  "params": dict(params or {}), "error": error})
+        if ms >= self.slow_ms:
+            logging.warning(f"Slow query {name} on {page}: {ms:.0f} ms, {rows} rows, cache {cache}, params {params}")
+
+    def snapshot(self):
+        """Per page and query breakdown and the slowest recent queries, for the admin page."""
+        with self.lock:
+            breakdown = []
+            for (page, name), totals in self.totals.items():
+                durations = np.array(totals["durations"])
+                breakdown.append({
+                    "page": page,
+                    "query": name,
+                    "calls": totals["calls"],
+                    "hit_rate": totals["hits"] / totals["calls"],
+                    "errors": totals["errors"],
+                    "mean_ms": totals["total_ms"] / totals["calls"],
+                    "p50_ms": float(np.percentile(durations, 50)),
+                    "p95_ms": float(np.percentile(durations, 95)),
+                    "max_ms": totals["max_ms"],
+                    "total_ms": totals["total_ms"],
+                    "rows": totals["rows"],
+                    "MiB": totals["bytes"] / 2**20
+                })
+            slow = sorted(self.slow, key=lambda entry: entry["ms"], reverse=True)
+        return {"slow_ms": self.slow_ms, "breakdown": breakdown, "slow": slow}
+
+    def reset(self):
+        with self.lock:
+            self.totals.clear()
+            self.slow.clear()
+
+
+log = QueryLog()
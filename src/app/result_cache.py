@@ -0,0 +1,104 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Global cap on the bytes held by cached DataFrames
+CACHE_MAX_BYTES = int(os.environ.get("DASHBOARD_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# "lru" evicts the least recently used result, "lfu" the least frequently used
+CACHE_POLICY = os.environ.get("DASHBOARD_CACHE_POLICY", "lru")
+# Results larger than this share of the cap are never cached
+CACHE_MAX_ENTRY_SHARE = float(os.environ.get("DASHBOARD_CACHE_MAX_ENTRY_SHARE", "0.25"))
+
+
+def frame_size(df):
+    """Actual memory held by a DataFrame, object columns included."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class ResultCache:
+    """Process-wide DataFrame cache shared by all dashboard sessions.
+
+    Entries are keyed by query name and parameters and accounted by their real
+    byte size. When the ETL data version changes, every entry is dropped.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, policy=CACHE_POLICY):
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.entries = OrderedDict()  # key -> [df, size, uses]
+        self.bytes = 0
+        self.version = None
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "rejected": 0}
+
+    def check_version(self, version):
+        """Drops every entry when the data version has moved on."""
+        with self.lock:
+            if version != self.version:
+                if self.entries:
+                    self.stats["invalidations"] += 1
+                self.entries.clear()
+                self.bytes = 0
+                self.version = version
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            entry[2] += 1
+            self.entries.move_to_end(key)
+            df = entry[0]
+        # Callers modify frames in place, so the cached frame is never handed out
+        return df.copy()
+
+    def victim(self):
+        if self.policy == "lfu":
+            return min(self.entries, key=lambda key: self.entries[key][2])
+        return next(iter(self.entries))
+
+    def put(self, key, df):
+        size = frame_size(df)
+        with self.lock:
+            if size > self.max_bytes * CACHE_MAX_ENTRY_SHARE:
+                self.stats["rejected"] += 1
+                return
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key)[1]
+            while self.entries and self.bytes + size > self.max_bytes:
+                self.bytes -= self.entries.pop(self.victim())[1]
+                self.stats["evictions"] += 1
+            self.entries[key] = [df.copy(), size, 1]
+            self.bytes += size
+
+    def size_of(self, key):
+        """Bytes held by a cached result, or None when it is not cached."""
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def get_or_load(self, key, version, load):
+        self.check_version(version)
+        df = self.get(key)
+        if df is None:
+            df = load()
+            self.put(key, df)
+        return df
+
+    def snapshot(self):
+        """Counters and per-entry sizes for the admin page."""
+        with self.lock:
+            return {
+                **self.stats,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "policy": self.policy,
+                "data_version": self.version,
+                "largest": sorted(((size, uses, key) for key, (_, size, uses) in self.entries.items()), reverse=True)[:20]
+            }
+
+
+cache = ResultCache()
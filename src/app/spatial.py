@@ -0,0 +1,110 @@
+import threading
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Columns the index keeps for every hospital
+HOSPITAL_FIELDS = ["code", "name", "type", "sector", "open_closed", "state", "lhn", "phn", "latitude", "longitude"]
+# Groupings understood by HospitalIndex.aggregate besides "grid"
+REGIONS = ["state", "lhn", "phn"]
+
+
+def to_unit_vectors(latitude, longitude):
+    """Points on the unit sphere, so that nearest in 3D is nearest on the globe."""
+    lat = np.radians(np.asarray(latitude, dtype=float))
+    lon = np.radians(np.asarray(longitude, dtype=float))
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(distance_km):
+    return 2 * np.sin(min(distance_km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class HospitalIndex:
+    """KD-tree over the hospital coordinates.
+
+    Coordinates are projected onto the unit sphere, where straight-line (chord)
+    distance grows with great-circle distance, so nearest-neighbour and radius
+    searches are exact without a map projection. Results carry distance_km.
+    An empty frame (e.g. before the first ETL run) gives an empty index.
+    """
+
+    def __init__(self, hospitals):
+        hospitals = hospitals.copy()
+        for field in HOSPITAL_FIELDS:
+            if field not in hospitals.columns:
+                hospitals[field] = pd.Series(dtype=object)
+        hospitals['latitude'] = pd.to_numeric(hospitals['latitude'], errors='coerce')
+        hospitals['longitude'] = pd.to_numeric(hospitals['longitude'], errors='coerce')
+        self.hospitals = hospitals.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+        self.tree = cKDTree(to_unit_vectors(self.hospitals['latitude'], self.hospitals['longitude']))
+
+    def __len__(self):
+        return len(self.hospitals)
+
+    def located(self, positions, chords):
+        result = self.hospitals.iloc[positions].copy()
+        result['distance_km'] = chord_to_km(np.asarray(chords))
+        return result.sort_values('distance_km').reset_index(drop=True)
+
+    def nearest(self, latitude, longitude, k=5):
+        """The k hospitals closest to a point."""
+        k = min(k, len(self))
+        if k == 0:
+            return self.located([], [])
+        chords, positions = self.tree.query(to_unit_vectors([latitude], [longitude])[0], k=k)
+        return self.located(np.atleast_1d(positions), np.atleast_1d(chords))
+
+    def within(self, latitude, longitude, radius_km):
+        """Every hospital within radius_km of a point, closest first."""
+        point = to_unit_vectors([latitude], [longitude])[0]
+        positions = self.tree.query_ball_point(point, km_to_chord(radius_km))
+        chords = np.linalg.norm(self.tree.data[positions] - point, axis=1) if positions else []
+        return self.located(positions, chords)
+
+    def aggregate(self, values, by="lhn", cell_degrees=1.0, agg="sum", hospitals=None):
+        """Aggregates a measure per region ("state", "lhn", "phn") or per grid cell.
+
+        values holds one row per reportingunitcode with a value column, e.g. the
+        latest period of a measure. hospitals optionally restricts the result to
+        a subset of the index, such as the output of within().
+        """
+        hospitals = self.hospitals if hospitals is None else hospitals
+        joined = hospitals.merge(values[['reportingunitcode', 'value']], left_on='code',
+                                 right_on='reportingunitcode', how='inner')
+        if by == "grid":
+            joined['cell_latitude'] = (np.floor(joined['latitude'] / cell_degrees) + 0.5) * cell_degrees
+            joined['cell_longitude'] = (np.floor(joined['longitude'] / cell_degrees) + 0.5) * cell_degrees
+            keys = ['cell_latitude', 'cell_longitude']
+        elif by in REGIONS:
+            keys = [by]
+        else:
+            raise ValueError(f"Unknown grouping {by}")
+        return (joined.groupby(keys, dropna=False)
+                .agg(hospitals=('code', 'size'), value=('value', agg),
+                     latitude=('latitude', 'mean'), longitude=('longitude', 'mean'))
+                .reset_index()
+                .sort_values('value', ascending=False))
+
+
+_index = {"version": None, "value": None}
+_lock = threading.Lock()
+
+
+def get_index():
+    """The dashboard's hospital index, rebuilt only when the data version changes."""
+    from backend import data_version, run_query
+    version = data_version()
+    with _lock:
+        if _index["value"] is not None and _index["version"] == version:
+            return _index["value"]
+    index = HospitalIndex(run_query("hospital_locations"))
+    with _lock:
+        _index["version"], _index["value"] = version, index
+    return index
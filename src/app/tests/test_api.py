@@ -0,0 +1,50 @@
+import warnings
+
+import pytest
+import api
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client():
+    return TestClient(api.app)
+
+
+@pytest.mark.parametrize("name", ["measure_values_export", "measure_values_export_desc"])
+def test_export_only_queries_are_refused(client, name):
+    params = {param: "" for param in api.QUERY_PARAMS[name]}
+    response = client.get(f"/query/{name}", params=params)
+
+    assert response.status_code == 400
+    assert "/export/measure_values" in response.json()["detail"]
+
+
+@pytest.fixture
+def responses(monkeypatch):
+    monkeypatch.setattr(api, "RESPONSE_CACHE_BYTES", 1000)
+    monkeypatch.setattr(api, "_responses", api.OrderedDict())
+    monkeypatch.setattr(api, "_response_bytes", {"value": 0})
+    return api._responses
+
+
+def test_response_cache_is_bounded_in_bytes(responses):
+    for etag in "abcde":
+        api.keep_response(etag, (b"x" * 200, "application/json"))
+    api.keep_response("f", (b"x" * 250, "application/json"))
+
+    assert list(responses) == ["c", "d", "e", "f"]
+    assert api._response_bytes["value"] == 850
+
+
+def test_responses_over_their_share_are_not_cached(responses):
+    api.keep_response("big", (b"x" * 251, "application/json"))
+    assert not responses and api._response_bytes["value"] == 0
+
+
+def test_replacing_a_response_recounts_its_bytes(responses):
+    api.keep_response("a", (b"x" * 200, "application/json"))
+    api.keep_response("a", (b"x" * 100, "application/json"))
+    assert api._response_bytes["value"] == 100
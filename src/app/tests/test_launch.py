@@ -0,0 +1,15 @@
+from launch import parse_flags
+
+
+def test_space_separated_values():
+    assert parse_flags(["--server.port", "8501", "--server.address", "0.0.0.0"]) == \
+        {"server_port": 8501, "server_address": "0.0.0.0"}
+
+
+def test_equals_separated_values():
+    assert parse_flags(["--server.port=8501", "--theme.base=dark"]) == {"server_port": 8501, "theme_base": "dark"}
+
+
+def test_switches_and_booleans():
+    assert parse_flags(["--server.headless", "--server.runOnSave", "false"]) == \
+        {"server_headless": True, "server_runOnSave": False}
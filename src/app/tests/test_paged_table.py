@@ -0,0 +1,81 @@
+import datetime
+
+import pandas as pd
+import pytest
+from duckdb_backend import TABLES, SnapshotReader
+from paged_table import FIRST_PAGE, keyset_after, page_query
+from queries import QUERIES
+
+# Two reporting units sharing a name and a state, as in the mappings workbook
+HOSPITALS = pd.DataFrame({
+    "code": ["H0310", "LHN233", "H0001", "H0002"],
+    "name": ["Alexandra District Hospital", "Alexandra District Hospital", "Bairnsdale Hospital", "Ararat Hospital"],
+    "state": ["Vic", "Vic", "Vic", "Vic"]
+})
+SELECTION = {"measure": "Length of stay", "reported_measure": "Average", "state": "Vic", "national": False,
+             "hospital_filter": ""}
+
+
+def snapshot_of(tmp_path, hospitals):
+    snapshot = tmp_path / "v1"
+    (snapshot / "info").mkdir(parents=True)
+    tables = {
+        "datasets": pd.DataFrame({"datasetid": [1, 2, 3], "measurecode": "M1", "reportedmeasurecode": "R1",
+                                  "reportingstartdate": [datetime.date(2020, 7, 1)] * 2 + [datetime.date(2021, 7, 1)],
+                                  "stored": True}),
+        "measurements": pd.DataFrame({"measurecode": ["M1"], "measurename": ["Length of stay"]}),
+        "reported_measurements": pd.DataFrame({"reportedmeasurecode": ["R1"], "reportedmeasurename": ["Average"]}),
+        "hospitals": hospitals
+    }
+    for table in TABLES:
+        tables.get(table, pd.DataFrame({"unused": [0]})).to_parquet(snapshot / f"{table}.parquet")
+    info = pd.DataFrame([(dataset_id, code, float(dataset_id)) for dataset_id in (1, 2, 3) for code in hospitals["code"]],
+                        columns=["datasetid", "reportingunitcode", "value"])
+    info["caveats"] = None
+    info.to_parquet(snapshot / "info" / "part-0.parquet")
+    (tmp_path / "CURRENT").write_text("v1")
+    return SnapshotReader(str(tmp_path))
+
+
+@pytest.fixture
+def reader(tmp_path):
+    return snapshot_of(tmp_path, HOSPITALS)
+
+
+def all_pages(reader, descending, page_size):
+    keyset, rows = FIRST_PAGE, []
+    while True:
+        page = reader.query(QUERIES[page_query(descending)], {**SELECTION, **keyset, "page_size": page_size})
+        rows.extend(zip(page["datasetid"], page["reportingunitcode"]))
+        if len(page) < page_size:
+            return rows
+        keyset = keyset_after(page.iloc[-1])
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("page_size", [1, 2, 3, 5])
+def test_pages_visit_every_row_once(reader, descending, page_size):
+    everything = reader.query(QUERIES[page_query(descending)], {**SELECTION, **FIRST_PAGE, "page_size": 1000})
+    assert len(everything) == 12
+
+    rows = all_pages(reader, descending, page_size)
+
+    assert rows == list(zip(everything["datasetid"], everything["reportingunitcode"]))
+    assert len(set(rows)) == 12
+
+
+def test_pages_follow_the_export_order(reader):
+    exported = reader.query(QUERIES["measure_values_export"], SELECTION)
+
+    assert all_pages(reader, False, 2) == list(zip(exported["datasetid"], exported["reportingunitcode"]))
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_hospitals_without_a_name_are_paged(tmp_path, descending):
+    unnamed = pd.DataFrame({"code": ["H0003"], "name": [None], "state": ["Vic"]})
+    reader = snapshot_of(tmp_path, pd.concat([HOSPITALS, unnamed], ignore_index=True))
+    export = "measure_values_export_desc" if descending else "measure_values_export"
+    exported = reader.query(QUERIES[export], SELECTION)
+    assert len(exported) == 15
+
+    assert all_pages(reader, descending, 2) == list(zip(exported["datasetid"], exported["reportingunitcode"]))
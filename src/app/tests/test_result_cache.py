@@ -0,0 +1,59 @@
+import pandas as pd
+from result_cache import ResultCache, frame_size
+
+FRAME = pd.DataFrame({"value": [1.0] * 100})
+SIZE = frame_size(FRAME)
+
+
+def filled(policy, keys):
+    # Holds four frames, each at the largest share of the cap one entry may take
+    cache = ResultCache(max_bytes=4 * SIZE, policy=policy)
+    cache.check_version(1)
+    for key in keys:
+        cache.put(key, FRAME)
+    return cache
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = filled("lru", ["a", "b", "c", "d"])
+    cache.get("a")
+    cache.put("e", FRAME)
+
+    assert list(cache.entries) == ["c", "d", "a", "e"]
+    assert cache.bytes == 4 * SIZE
+    assert cache.stats["evictions"] == 1
+
+
+def test_lfu_evicts_the_least_frequently_used():
+    cache = filled("lfu", ["a", "b", "c", "d"])
+    for key in ("a", "a", "c", "d"):
+        cache.get(key)
+    cache.put("e", FRAME)
+
+    assert sorted(cache.entries) == ["a", "c", "d", "e"]
+
+
+def test_entries_over_their_share_of_the_cap_are_not_cached():
+    cache = filled("lru", [])
+    cache.put("big", pd.DataFrame({"value": [1.0] * 200}))
+
+    assert cache.size_of("big") is None
+    assert cache.stats["rejected"] == 1
+
+
+def test_a_new_data_version_drops_every_entry():
+    cache = filled("lru", ["a", "b"])
+    loads = []
+    df = cache.get_or_load("a", 2, lambda: loads.append("a") or FRAME)
+
+    assert loads == ["a"] and df.equals(FRAME)
+    assert list(cache.entries) == ["a"]
+    assert cache.stats["invalidations"] == 1
+
+
+def test_cached_frames_are_never_handed_out():
+    cache = filled("lru", ["a"])
+    handed_out = cache.get("a")
+    handed_out["value"] = 0.0
+
+    assert cache.get("a").equals(FRAME)
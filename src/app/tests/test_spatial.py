@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+from spatial import HOSPITAL_FIELDS, HospitalIndex
+
+HOSPITALS = pd.DataFrame({
+    "code": ["H1", "H2", "H3"],
+    "name": ["Royal Perth", "Fremantle", "Alice Springs"],
+    "state": ["WA", "WA", "NT"],
+    "latitude": ["-31.95", "-32.06", "-23.70"],
+    "longitude": ["115.87", "115.75", "133.88"],
+})
+
+
+def test_nearest_hospitals_come_closest_first():
+    nearest = HospitalIndex(HOSPITALS).nearest(-31.95, 115.86, k=2)
+    assert list(nearest["code"]) == ["H1", "H2"]
+    assert nearest["distance_km"].iloc[0] < 1
+
+
+@pytest.mark.parametrize("hospitals", [pd.DataFrame(), pd.DataFrame(columns=HOSPITAL_FIELDS)])
+def test_no_hospitals_give_an_empty_index(hospitals):
+    index = HospitalIndex(hospitals)
+    assert len(index) == 0
+    assert index.nearest(-31.95, 115.86).empty
+    assert index.within(-31.95, 115.86, 100).empty
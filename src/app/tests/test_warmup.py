@@ -0,0 +1,46 @@
+import threading
+
+import pandas as pd
+import pytest
+import backend
+import warmup
+from result_cache import ResultCache
+
+
+class NoSession:
+    """Stands in for streamlit in backend: the warm-up runs outside any script run."""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"st.{name} called outside a script run")
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    loads = []
+
+    def load_query(name, params=None):
+        loads.append(name)
+        return pd.DataFrame({"value": [1.0, 2.0]})
+
+    monkeypatch.setattr(backend, "st", NoSession())
+    monkeypatch.setattr(backend, "result_cache", ResultCache(max_bytes=2**20))
+    monkeypatch.setattr(backend, "load_query", load_query)
+    monkeypatch.setattr(backend, "data_version", lambda: 1)
+    monkeypatch.setattr(warmup, "PAGES", {})
+    return loads
+
+
+def test_warm_up_preloads_the_hot_queries_from_a_plain_thread(loads):
+    thread = threading.Thread(target=warmup.warm_up)
+    thread.start()
+    thread.join()
+
+    assert loads == warmup.HOT_QUERIES
+    for query in warmup.HOT_QUERIES:
+        assert backend.result_cache.size_of((query, ())) is not None
+
+
+def test_sessions_reuse_the_preloaded_results(loads):
+    warmup.warm_up()
+    backend.cached_query("states")
+    assert loads == warmup.HOT_QUERIES
@@ -0,0 +1,2 @@
+# Dashboard pages, imported by dashboard.py on first navigation so that each
+# page only pays for its own dependencies (statsmodels, folium, ...).
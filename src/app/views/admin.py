@@ -0,0 +1,57 @@
+import hmac
+import streamlit as st
+import pandas as pd
+from backend import DASHBOARD_ADMIN_TOKEN
+from query_log import log as query_log
+from result_cache import cache as result_cache
+
+
+def display_admin():
+    st.title("Admin")
+    if not st.session_state.get('admin'):
+        token = st.text_input("Admin token", type="password")
+        # Constant-time comparison, so response times do not reveal how much of the token matched
+        if not DASHBOARD_ADMIN_TOKEN or not hmac.compare_digest(token.encode(), DASHBOARD_ADMIN_TOKEN.encode()):
+            return
+        st.session_state['admin'] = True
+
+    st.markdown("### Result Cache")
+    stats = result_cache.snapshot()
+    lookups = stats['hits'] + stats['misses']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Hit rate", f"{stats['hits'] / lookups:.1%}" if lookups else "N/A")
+    col2.metric("Memory", f"{stats['bytes'] / 2**20:.1f} / {stats['max_bytes'] / 2**20:.0f} MiB")
+    col3.metric("Entries", stats['entries'])
+    col4.metric("Data version", str(stats['data_version']))
+    st.write({key: stats[key] for key in ['hits', 'misses', 'evictions', 'invalidations', 'rejected', 'policy']})
+
+    st.markdown("#### Largest entries")
+    st.dataframe(pd.DataFrame([(f"{key[0]} {dict(key[1])}", size / 2**20, uses) for size, uses, key in stats['largest']],
+                              columns=['query', 'MiB', 'uses']))
+
+    st.markdown("### Queries")
+    log = query_log.snapshot()
+    if not log['breakdown']:
+        st.info("No queries recorded yet.")
+        return
+    breakdown = pd.DataFrame(log['breakdown'])
+    pages = breakdown.groupby('page').agg(calls=('calls', 'sum'), total_ms=('total_ms', 'sum'), max_ms=('max_ms', 'max'),
+                                          rows=('rows', 'sum'), MiB=('MiB', 'sum'))
+    st.markdown("#### Per page")
+    st.dataframe(pages.sort_values('total_ms', ascending=False).round(1))
+
+    page = st.selectbox("Page", ["All pages"] + sorted(breakdown['page'].unique()), key="query_log_page")
+    if page != "All pages":
+        breakdown = breakdown[breakdown['page'] == page]
+    st.dataframe(breakdown.sort_values('total_ms', ascending=False).round(3), hide_index=True)
+
+    st.markdown(f"#### Slowest recent queries (over {log['slow_ms']:.0f} ms, or failed)")
+    if log['slow']:
+        slow = pd.DataFrame(log['slow'])
+        slow['params'] = slow['params'].map(str)
+        st.dataframe(slow, hide_index=True)
+    else:
+        st.write("None so far.")
+    if st.button("Reset query log"):
+        query_log.reset()
+        st.rerun()
@@ -0,0 +1,56 @@
+import streamlit as st
+import plotly.express as px
+import pandas as pd
+from backend import DASHBOARD_BACKEND, load_budget_table
+from budget import BUDGET_FILE
+
+
+def display_budget():
+    st.title("Budget")
+    # Load the Excel file once for all three tables (unused when reading from the API)
+    xls = pd.ExcelFile(BUDGET_FILE) if DASHBOARD_BACKEND != "api" else None
+
+    # Cleaned sheet "Table 1"
+    df_cleaned_1 = load_budget_table("health_spending", xls)
+
+    # Display the data in a table
+    st.write("### Health Spending")
+
+    fig1 = px.line(df_cleaned_1, x='Year', y=['Current_Price', 'Constant_Price'], 
+                   labels={'value': 'Amount ($ million)', 'variable': 'Type'}, 
+                   title='Total Health Spending in Current and Constant Prices')
+
+    fig2 = px.line(df_cleaned_1, x='Year', y=['Nominal_Change', 'Real_Growth'], 
+                   labels={'value': 'Percentage (%)', 'variable': 'Type'}, 
+                   title='Annual Rates of Change')
+
+    st.plotly_chart(fig1)
+    st.plotly_chart(fig2)
+
+    # Cleaned sheet "Table 4"
+    df_table_4 = load_budget_table("state_spending", xls)
+
+    # Display dropdown menu for state selection
+    state = st.selectbox('Select a State/Territory', df_table_4.columns[1:-1])
+
+    # Plot the data for the selected state
+    fig3 = px.line(df_table_4, x='Year', y=state, 
+                   labels={'value': 'Amount ($ million)', 'variable': 'Type'}, 
+                   title=f'Total Health Spending in Constant Prices for {state} (2011-12 to 2021-22)')
+
+    st.plotly_chart(fig3)
+
+    df_table_7_cleaned = load_budget_table("gdp_ratio", xls)
+
+    # Plot GDP over time
+    fig_gdp = px.line(df_table_7_cleaned, x='Year', y='GDP', 
+                      labels={'GDP': 'GDP ($ million)'}, 
+                      title='GDP in Australia Over Time')
+
+    # Plot Health Spending to GDP Ratio over time
+    fig_ratio = px.line(df_table_7_cleaned, x='Year', y='Health_to_GDP_Ratio', 
+                        labels={'Health_to_GDP_Ratio': 'Health Spending to GDP Ratio (%)'}, 
+                        title='Health Spending to GDP Ratio Over Time')
+
+    st.plotly_chart(fig_gdp)
+    st.plotly_chart(fig_ratio)
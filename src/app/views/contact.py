@@ -0,0 +1,32 @@
+import streamlit as st
+
+
+def display_contactus():
+    st.title("Contact Us")
+
+    st.write("""
+    We are here to assist you with any questions, concerns, or feedback you may have. Please feel free to reach out to us via email.
+    """)
+
+    # Display contact information
+    st.write("**Sonia Borsi**")
+    st.write("[Sonia.borsi@studenti.unitn.it](mailto:sonia.borsi@studenti.unitn.it) | [Linkedin](https://www.linkedin.com/in/sonia-borsi-824998260/)")
+    st.write("**Filippo Costamagna**")
+    st.write("[Filippo.costamagna](mailto:filippo.costamagna@studenti.unitn.it) | [Linkedin](https://www.linkedin.com/in/filippo-costamagna-a439b3303/)")
+
+    st.write("""
+    We look forward to hearing from you and will respond as soon as possible.
+    """)
+
+        # User feedback section
+    st.markdown("### We Value Your Feedback")
+    feedback = st.text_area("Please share your thoughts or suggestions:")
+    if st.button("Submit Feedback"):
+        st.write("Thank you for your feedback!")
+
+    st.markdown("#### Learn more")
+    st.button(
+        "  Visit our repository",
+        "https://github.com/SoniaBorsi/Healthcare-Resource-Allocation.git",
+        use_container_width=True,
+    )
@@ -0,0 +1,48 @@
+import streamlit as st
+
+
+def display_home_page():
+    st.title("Welcome to Healthcare Resource Allocation")
+
+    # Display a healthcare-related image
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.write("")
+    with col2:
+        st.image("/app/data/images/logo.png", use_column_width=True)  
+    with col3:
+        st.write("")
+
+    st.write("""
+        This application is designed to facilitate healthcare resource allocation through data-driven insights. 
+        Navigate through the various sections using the sidebar to explore different metrics and tools available to you.
+    """)
+
+
+    st.markdown("### Overview")
+    st.write("""
+        Efficient allocation of healthcare resources is critical to improving patient outcomes and optimizing costs. 
+        This application provides a comprehensive suite of tools for analyzing healthcare data, forecasting trends, 
+        and making informed decisions about resource distribution.
+    """)
+
+
+    st.markdown("### Getting Started")
+    st.write("""
+        - **Step 1:** Use the sidebar to select a section (e.g., Measures, Hospitals, etc.).
+        - **Step 2:** Choose the relevant options and filters to explore the data.
+        - **Step 3:** View visualizations and insights to assist in decision-making.
+    """)
+
+    with st.expander('Learn More', expanded=True):
+        st.write('''
+            - **Data Sources:** 
+              - [Australian Institute of Health and Welfare](https://www.aihw.gov.au)
+              - [Australian Bureau of Statistics](https://www.abs.gov.au/statistics/people/population)
+            - **Methodology:** The data is analyzed and presented in a way that supports healthcare administrators and policymakers 
+              in making informed decisions about resource allocation.
+        ''')
+
+    # Optional: Add a button to navigate to the main dashboard
+    if st.button("Go to Dashboard"):
+        st.session_state['page'] = 'dashboard'
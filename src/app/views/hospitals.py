@@ -0,0 +1,227 @@
+import streamlit as st
+import plotly.express as px
+from streamlit_folium import folium_static
+import folium
+import pandas as pd
+import numpy as np
+import time
+from backend import run_query
+import spatial
+
+
+def display_hospitals():
+    """Display hospitals on a map, as a pie chart, and in a table."""
+    st.title("Hospitals")
+
+    st.markdown("""
+    ## Explore Australian Hospitals 
+    
+    This section provides a comprehensive analysis of hospitals across different states. You can visualize the locations of hospitals on an interactive map, explore the distribution of private and public hospitals, and filter hospitals by state and operational status.""")
+
+    if st.button("Return to Home"):
+        st.session_state['page'] = 'home'
+
+    # Fetch hospital data from the database
+    hospital_df = run_query("hospitals")
+    hospital_df['latitude'] = pd.to_numeric(hospital_df['latitude'])
+    hospital_df['longitude'] = pd.to_numeric(hospital_df['longitude'])
+    hospital_df.dropna(subset=['latitude', 'longitude'], inplace=True)
+
+    # Display hospitals on a map
+    hospital_map = folium.Map(location=[-25, 135], zoom_start=5)
+    for _, row in hospital_df.iterrows():
+        folium.Marker(
+            [row['latitude'], row['longitude']],
+            popup=row['name']
+        ).add_to(hospital_map)
+    folium_static(hospital_map)
+
+    # Create a bar chart for the number of private and public hospitals per state
+    state_sector_counts = hospital_df.groupby(['state', 'sector']).size().reset_index(name='Number of Hospitals')
+    private_hospitals = state_sector_counts[state_sector_counts['sector'] == 'Private']
+    public_hospitals = state_sector_counts[state_sector_counts['sector'] == 'Public']
+    state_counts = pd.merge(private_hospitals, public_hospitals, on='state', suffixes=('_private', '_public'), how='outer').fillna(0)
+
+    fig_hist = px.bar(state_counts, x='state', y=['Number of Hospitals_private', 'Number of Hospitals_public'], barmode='group',
+                      title="Number of Private and Public Hospitals per State", labels={'value': 'Number of Hospitals', 'variable': 'Hospital Type'})
+    fig_hist.update_layout(xaxis_title="State", yaxis_title="Count")
+    st.plotly_chart(fig_hist)   
+
+    
+    excel_file = 'data/Admitted Patients.xlsx'
+    xls = pd.ExcelFile(excel_file)
+
+    # Load and clean the data for Table 2.9
+    table_2_9_cleaned = pd.read_excel(xls, sheet_name='Table 2.9', header=2)
+    table_2_9_cleaned = table_2_9_cleaned.drop(columns=['Average since 2018–19', 'Since 2021–22'])
+
+    # Retain only the rows related to public and private hospitals, up to the "All hospitals" row
+    public_hospitals = table_2_9_cleaned.iloc[[1, 2, 3]].copy()
+    private_hospitals = table_2_9_cleaned.iloc[[4, 5, 6]].copy()
+
+    # Convert the data to long format for easier plotting
+    public_hospitals_long = public_hospitals.melt(id_vars=['Unnamed: 0'], var_name='Year', value_name='Average Length of Stay')
+    private_hospitals_long = private_hospitals.melt(id_vars=['Unnamed: 0'], var_name='Year', value_name='Average Length of Stay')
+
+    # Rename the 'Unnamed: 0' column to 'Hospital Type'
+    public_hospitals_long = public_hospitals_long.rename(columns={'Unnamed: 0': 'Hospital Type'})
+    private_hospitals_long = private_hospitals_long.rename(columns={'Unnamed: 0': 'Hospital Type'})
+
+    # Plot for public hospitals using Plotly
+    st.markdown("### Average Length of Stay in Australian Hospitals")
+    fig_public = px.bar(public_hospitals_long, x='Year', y='Average Length of Stay', color='Hospital Type',
+                        title='Average Length of Stay for Public Hospitals')
+    fig_public.update_layout(xaxis_title="Year", yaxis_title="Average Length of Stay (Days)")
+    st.plotly_chart(fig_public)
+
+    fig_private = px.bar(private_hospitals_long, x='Year', y='Average Length of Stay', color='Hospital Type',
+                         title='Average Length of Stay for Private Hospitals')
+    fig_private.update_layout(xaxis_title="Year", yaxis_title="Average Length of Stay (Days)")
+    st.plotly_chart(fig_private)
+
+
+    # # Load the Excel file for further analysis
+    excel_file = 'data/Admitted Patients.xlsx'
+    # Add population data for each state
+    population_data = {
+        "New South Wales": 7317500,
+        "Victoria": 5640900,
+        "Queensland": 4599400,
+        "Western Australia": 2366900,
+        "South Australia": 1659800,
+        "Tasmania": 511000,
+        "Australian Capital Territory": 366900,
+        "Northern Territory": 231200
+    }
+
+    # Filter hospitals based on selected state and open/closed status
+    selected_state_hospital = st.selectbox("Select State", hospital_df['state'].unique())
+    selected_status = st.selectbox("Select Open/Closed", hospital_df['open_closed'].unique())
+    st.markdown(f"### Hospitals in {selected_state_hospital}")
+    
+    filtered_df = hospital_df[(hospital_df['state'] == selected_state_hospital) & (hospital_df['open_closed'] == selected_status)]
+    
+    # Display population and hospital statistics
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        population = population_data.get(selected_state_hospital, "N/A")
+        st.metric(label="Population", value=f"{population:,}" if population != "N/A" else population)
+
+    with col2:
+        total_hospitals = len(filtered_df)
+        st.metric(label="Total Number of Hospitals", value=total_hospitals)
+
+    with col3:
+        # Use float division to calculate the ratio
+        ratio = (total_hospitals / population) * 1000 if population != "N/A" else "N/A"
+        st.metric(label="Hospitals per 1,000 Population", value=f"{ratio:.2f}" if ratio != "N/A" else ratio)
+
+    # Plot the map and pie chart
+    col1, col2 = st.columns(2)
+
+    with col1:  
+        if not filtered_df.empty:
+            fig_map = px.scatter_mapbox(
+                filtered_df,
+                lat="latitude",
+                lon="longitude",
+                hover_name="name",
+                color="sector",
+                zoom=4,
+                height=500,
+                color_discrete_map={'Public': 'blue', 'Private': 'light blue'}
+            )
+            fig_map.update_layout(mapbox_style="open-street-map")
+            fig_map.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
+            st.plotly_chart(fig_map)
+        else:
+            st.write("No hospitals found with the selected criteria.")
+
+    with col2:
+        sector_counts = filtered_df['sector'].value_counts().reset_index()
+        sector_counts.columns = ['Sector', 'Count']
+
+        fig_pie = px.pie(sector_counts, names='Sector', values='Count', title=f"Total number of hospitals in {selected_state_hospital}")
+        st.plotly_chart(fig_pie)
+
+    display_proximity()
+
+
+def display_proximity():
+    """Nearest hospitals, hospitals within a radius and regional totals of a measure."""
+    st.markdown("### Hospitals Near a Location")
+    st.markdown("Find the hospitals around a point and total any measure over them, by radius, network or grid cell.")
+
+    index = spatial.get_index()
+    if len(index) == 0:
+        st.write("No hospital coordinates available.")
+        return
+    hospitals = index.hospitals
+
+    names = np.sort(hospitals['name'].dropna().unique())
+    origin = st.selectbox("Centre on", ["Custom coordinates"] + list(names), index=1, key="proximity_origin")
+    if origin == "Custom coordinates":
+        col1, col2 = st.columns(2)
+        with col1:
+            latitude = st.number_input("Latitude", -90.0, 90.0, -33.87, format="%.4f", key="proximity_latitude")
+        with col2:
+            longitude = st.number_input("Longitude", -180.0, 180.0, 151.21, format="%.4f", key="proximity_longitude")
+    else:
+        centre = hospitals[hospitals['name'] == origin].iloc[0]
+        latitude, longitude = float(centre['latitude']), float(centre['longitude'])
+
+    col1, col2 = st.columns(2)
+    with col1:
+        radius = st.slider("Radius (km)", 5, 500, 50, step=5, key="proximity_radius")
+    with col2:
+        k = st.number_input("Nearest hospitals", 1, 50, 5, key="proximity_k")
+
+    # Optional measure to total over the hospitals found, e.g. available beds
+    df_measures = run_query("measures_catalogue")
+    measure = st.selectbox("Measure to aggregate", ["None"] + list(np.sort(df_measures['measurename'].dropna().unique())),
+                           key="proximity_measure")
+    values = None
+    if measure != "None":
+        reported = df_measures[df_measures['measurename'] == measure]['reportedmeasurename'].dropna().unique()
+        reported_measure = st.selectbox("Reported measure", np.sort(reported), key="proximity_reported_measure")
+        values = run_query("measure_latest_values", measure=measure, reported_measure=reported_measure)
+
+    start = time.perf_counter()
+    nearby = index.within(latitude, longitude, radius)
+    nearest = index.nearest(latitude, longitude, k=int(k))
+    elapsed = (time.perf_counter() - start) * 1000
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric(label=f"Hospitals within {radius} km", value=len(nearby))
+    with col2:
+        if values is not None:
+            total = nearby.merge(values, left_on='code', right_on='reportingunitcode')['value'].sum()
+            st.metric(label=f"Total {reported_measure} within {radius} km", value=f"{total:,.0f}")
+    st.caption(f"Answered in {elapsed:.1f} ms over {len(index)} hospitals")
+
+    if not nearby.empty:
+        fig_map = px.scatter_mapbox(nearby, lat="latitude", lon="longitude", hover_name="name",
+                                    hover_data={'distance_km': ':.1f', 'latitude': False, 'longitude': False},
+                                    color="sector", zoom=7, height=450,
+                                    center={"lat": latitude, "lon": longitude})
+        fig_map.update_layout(mapbox_style="open-street-map", margin={"r": 0, "t": 0, "l": 0, "b": 0})
+        st.plotly_chart(fig_map)
+
+    st.markdown(f"#### {len(nearest)} Nearest Hospitals")
+    st.dataframe(nearest[['name', 'sector', 'state', 'lhn', 'distance_km']].round({'distance_km': 1}),
+                 use_container_width=True)
+
+    if values is not None:
+        st.markdown("#### Regional Totals")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            by = st.selectbox("Group by", ["lhn", "phn", "state", "grid"], key="proximity_by")
+        with col2:
+            agg = st.selectbox("Aggregate", ["sum", "mean", "max"], key="proximity_agg")
+        with col3:
+            cell_degrees = st.number_input("Grid cell (degrees)", 0.1, 10.0, 1.0, step=0.1, key="proximity_cell",
+                                           disabled=by != "grid")
+        totals = index.aggregate(values, by=by, cell_degrees=cell_degrees, agg=agg)
+        st.dataframe(totals, use_container_width=True)
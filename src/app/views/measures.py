@@ -0,0 +1,180 @@
+import streamlit as st
+import plotly.express as px
+import pandas as pd
+import numpy as np
+import plotly.graph_objs as go 
+from backend import run_query
+from paged_table import paged_table
+
+
+def display_measures():
+    st.title("Measures")
+    st.markdown("### Explore Healthcare Metrics by State and Hospital")
+    st.markdown("""
+    This section of the dashboard allows you to explore detailed metrics for various healthcare measures across different states in Australia.""")
+    
+    df_measures = run_query("measures_catalogue")
+    selected_measure = st.selectbox("Select Measure", np.sort(df_measures['measurename'].unique()))
+    df_reported_measures = df_measures[df_measures['measurename'] == selected_measure]
+    selected_reported_measure = st.selectbox("Select Reported Measure", np.sort(df_reported_measures['reportedmeasurename'].unique()))
+
+    # Fetch the list of states
+    df_states = run_query("states")
+    state_list = df_states['state'].unique()
+
+    selected_state = st.selectbox("Select State", np.sort(state_list))
+
+    df_value = run_query("measure_values_state", measure=selected_measure,
+                         reported_measure=selected_reported_measure, state=selected_state)
+
+    national = False
+    if df_value.empty:
+        st.write("No data found for the selected state. Displaying national data.")
+        national = True
+
+        df_value = run_query("measure_values_national", measure=selected_measure,
+                             reported_measure=selected_reported_measure)
+
+    # Filter out NaN values
+    df_value = df_value.dropna()
+
+    if not df_value.empty:
+        # Aggregate data by reporting date
+        df_value_aggregated = df_value.groupby('reportingstartdate').agg({'value': 'mean'}).reset_index()
+
+        # Time Series Plot
+        st.markdown("### Time Series of Selected Measure")
+        st.markdown("This plot shows the time series of the selected measure over time, along with the national average for comparison.")
+        fig = px.line(df_value_aggregated, x='reportingstartdate', y='value', title=f'{selected_measure} - {selected_reported_measure} Over Time')
+
+        # Fetch and plot national average
+        df_national_avg = run_query("national_average", measure=selected_measure,
+                                    reported_measure=selected_reported_measure)
+
+        if not df_national_avg.empty:
+            df_national_avg = df_national_avg.groupby('reportingstartdate').agg({'value': 'mean'}).reset_index()
+            fig.add_trace(go.Scatter(x=df_national_avg['reportingstartdate'], y=df_national_avg['value'], mode='lines', name='National Average'))
+
+        st.plotly_chart(fig)
+
+        # Map of Hospitals
+        st.markdown("### Hospital Locations")
+        fig_map = px.scatter_mapbox(
+            df_value, lat='latitude', lon='longitude', hover_name='hospital_name',
+            hover_data={'latitude': False, 'longitude': False, 'value': True},
+            title=f'Hospitals in {selected_state} Reporting {selected_measure}',
+            mapbox_style="open-street-map", zoom=5,
+            color_discrete_sequence=["darkblue"]
+        )
+        st.plotly_chart(fig_map)
+
+        # Plot Selection
+        st.markdown("### Choose Plots to Display")
+        plot_options = st.multiselect(
+            "Select the plots you want to see:",
+            ["Time Series Decomposition", "Forecasting", "Distribution of Values", "Value Distribution by Hospital", "Heatmap of Values Over Time", "Ranking of Hospitals", "Correlation Analysis", "Flagged Anomalies"]
+        )
+
+        # Time Series Decomposition
+        if "Time Series Decomposition" in plot_options:
+            st.markdown("### Time Series Decomposition")
+            st.markdown("This section decomposes the time series into trend, seasonal, and residual components to analyze the underlying patterns in the data.")
+            if len(df_value_aggregated) >= 24:  # Check if there are enough observations
+                from statsmodels.tsa.seasonal import seasonal_decompose
+                decomposition = seasonal_decompose(df_value_aggregated.set_index('reportingstartdate')['value'], model='additive', period=12)
+                fig_trend = px.line(decomposition.trend.dropna(), title='Trend Component')
+                fig_seasonal = px.line(decomposition.seasonal.dropna(), title='Seasonal Component')
+                fig_residual = px.line(decomposition.resid.dropna(), title='Residual Component')
+                st.plotly_chart(fig_trend)
+                st.plotly_chart(fig_seasonal)
+                st.plotly_chart(fig_residual)
+            else:
+                st.write("Not enough data for time series decomposition. At least 24 observations are required.")
+
+        # Forecasting
+        if "Forecasting" in plot_options:
+            st.markdown("### Forecasting")
+            st.markdown("This section provides a forecast of the selected measure for the upcoming months based on historical data.")
+            forecast_horizon = st.slider("Select Forecast Horizon (Months)", 1, 24, 12, key="forecast_horizon")
+            if len(df_value_aggregated) >= 12:
+                from statsmodels.tsa.holtwinters import ExponentialSmoothing
+                model = ExponentialSmoothing(df_value_aggregated['value'], trend='add', seasonal=None).fit()
+                forecast = model.forecast(forecast_horizon)
+                fig_forecast = px.line(df_value_aggregated, x='reportingstartdate', y='value', title='Forecasting')
+                fig_forecast.add_trace(go.Scatter(x=pd.date_range(df_value_aggregated['reportingstartdate'].iloc[-1], periods=forecast_horizon, freq='M'), y=forecast, mode='lines', name='Forecast'))
+                st.plotly_chart(fig_forecast)
+            else:
+                st.write("Not enough data for forecasting. At least 12 observations are required.")
+
+        # Histogram: Distribution of Values
+        if "Distribution of Values" in plot_options:
+            st.markdown("### Distribution of Values")
+            st.markdown("This histogram shows the distribution of values for the selected measure across hospitals in the selected state.")
+            fig_hist = px.histogram(df_value, x='value', nbins=20, title=f'Distribution of {selected_measure} - {selected_reported_measure}')
+            st.plotly_chart(fig_hist)
+
+        # Box Plot: Value Distribution by Hospital
+        if "Value Distribution by Hospital" in plot_options:
+            st.markdown("### Value Distribution by Hospital")
+            st.markdown("This box plot shows the distribution of the selected measure across different hospitals in the selected state.")
+            fig_box = px.box(df_value, x='hospital_name', y='value', title=f'{selected_measure} - {selected_reported_measure} Distribution by Hospital')
+            st.plotly_chart(fig_box)
+
+        # Heatmap: Value Over Time by Hospital
+        if "Heatmap of Values Over Time" in plot_options:
+            st.markdown("### Heatmap of Values Over Time")
+            st.markdown("This heatmap shows the variation of the selected measure across different hospitals over time.")
+            fig_heatmap = px.density_heatmap(df_value, x='hospital_name', y='reportingstartdate', z='value', title=f'Heatmap of {selected_measure} - {selected_reported_measure} Over Time by Hospital')
+            st.plotly_chart(fig_heatmap)
+
+        # Hospital Rankings
+        if "Ranking of Hospitals" in plot_options:
+            st.markdown("### Ranking of Hospitals")
+            st.markdown("This bar chart ranks hospitals based on the average value of the selected measure.")
+            col1, col2 = st.columns(2)
+            with col1:
+                scope = st.radio("Rank within", [selected_state, "All states"], horizontal=True, key="ranking_scope")
+            with col2:
+                k = st.slider("Top hospitals", 5, 100, 20, step=5, key="ranking_k")
+            df_ranked = run_query("top_hospitals", measure=selected_measure, reported_measure=selected_reported_measure,
+                                  state=selected_state, national=scope == "All states", k=k)
+            if not df_ranked.empty:
+                fig_bar = px.bar(df_ranked, x='hospital_name', y='value', hover_data=['rank', 'state', 'percentile'],
+                                 title=f'Ranking of Hospitals by {selected_measure} - {selected_reported_measure}')
+                st.plotly_chart(fig_bar)
+            else:
+                st.write("No ranking available for the selected measure.")
+
+        # Scatter Plot for Correlation Analysis
+        if "Correlation Analysis" in plot_options:
+            st.markdown("### Correlation Analysis")
+            st.markdown("This scatter plot shows the correlation between the selected measure and another measure of your choice.")
+            another_metric = st.selectbox("Select Another Metric for Correlation", np.sort(df_measures['measurename'].unique()))
+            df_another_metric = run_query("metric_by_state", measure=another_metric, state=selected_state)
+            if not df_another_metric.empty:
+                df_another_metric = df_another_metric.groupby('reportingstartdate').agg({'value': 'mean'}).reset_index()
+                df_correlation = df_value_aggregated.merge(df_another_metric, on='reportingstartdate', suffixes=(f'_{selected_measure}', f'_{another_metric}'))
+                fig_scatter = px.scatter(df_correlation, x=f'value_{selected_measure}', y=f'value_{another_metric}', title=f'Correlation Between {selected_measure} and {another_metric}')
+                st.plotly_chart(fig_scatter)
+
+        # Anomalies flagged by the ETL
+        if "Flagged Anomalies" in plot_options:
+            st.markdown("### Flagged Anomalies")
+            st.markdown("Values flagged during ingest as far from the hospital's recent median (robust z-score) or as sharp period-over-period changes.")
+            df_anomalies = run_query("measure_anomalies", measure=selected_measure,
+                                     reported_measure=selected_reported_measure, state=selected_state, national=national)
+            if not df_anomalies.empty:
+                st.dataframe(df_anomalies, use_container_width=True)
+            else:
+                st.write("No anomalies flagged for the selected measure.")
+        
+        # Display the Data Table
+        st.markdown("### Data Table")
+        st.markdown("This table displays the raw data for the selected measure, including the reporting date, value, and hospital name.")
+        paged_table("measures_table", selected_measure, selected_reported_measure, selected_state, national)
+
+    else:
+        st.write("No data found for the selected measure and reported measure.")
+
+    if st.button("Return to Home"):
+        st.session_state['page'] = 'home'
@@ -0,0 +1,64 @@
+import importlib
+import logging
+import threading
+import time
+
+# Page name -> (module, display function), imported on first navigation
+PAGES = {
+    "Home": ("views.home", "display_home_page"),
+    "Measures": ("views.measures", "display_measures"),
+    "Hospitals": ("views.hospitals", "display_hospitals"),
+    "Budget": ("views.budget", "display_budget"),
+    "Contact us": ("views.contact", "display_contactus"),
+    "Admin": ("views.admin", "display_admin")
+}
+
+# Queries every session runs first; preloaded into the result cache
+HOT_QUERIES = ["measures_catalogue", "states", "hospitals", "hospital_locations"]
+
+_started = False
+_lock = threading.Lock()
+
+
+def import_page(name):
+    """Imports a page module (once per process) and logs how long the import took."""
+    module_name, function_name = PAGES[name]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = (time.perf_counter() - start) * 1000
+    if elapsed > 1:
+        logging.info(f"Imported {module_name} in {elapsed:.0f} ms")
+    return getattr(module, function_name)
+
+
+def warm_up():
+    """Imports every page module and preloads the hot queries into the result cache."""
+    start = time.perf_counter()
+    for name in PAGES:
+        try:
+            import_page(name)
+        except Exception as e:
+            logging.error(f"Warm-up failed to import page {name}: {e}")
+
+    # No Streamlit session here: queries go to the backend directly, through the shared result cache
+    from backend import cached_query
+    from query_log import set_page
+    set_page("warm-up")
+    for query in HOT_QUERIES:
+        query_start = time.perf_counter()
+        try:
+            rows = len(cached_query(query))
+            logging.info(f"Preloaded {query} ({rows} rows) in {(time.perf_counter() - query_start) * 1000:.0f} ms")
+        except Exception as e:
+            logging.error(f"Warm-up failed to preload {query}: {e}")
+    logging.info(f"Warm-up finished in {time.perf_counter() - start:.1f} s")
+
+
+def start():
+    """Runs warm_up once per process in a background thread, so it never delays a page."""
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=warm_up, name="dashboard-warmup", daemon=True).start()
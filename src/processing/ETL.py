@@ -1,6 +1,15 @@
 import utilities.tables 
+import utilities.db
+import utilities.batching as batching
+import utilities.landing as landing
+import utilities.lake as lake
+import utilities.metrics as metrics
+import sampling_profiler as profiling
+import utilities.snapshot as snapshot
 import utilities.values as values
+import argparse
 import logging
+import time
 import utilities.tools as tools
 from tqdm import tqdm
 from setup import spark
@@ -9,16 +18,69 @@ utilities.tables.schema()
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+parser = argparse.ArgumentParser(description="AIHW MyHospitals ETL")
+parser.add_argument("--profile", metavar="DIR", help="write a sampling profile per batch to DIR (or set PROFILE_DIR)")
+parser.add_argument("--profile-interval-ms", type=float, help="sampling interval, default PROFILE_INTERVAL_MS or 5")
+parser.add_argument("--ingest", choices=["rabbitmq", "landing", "land"], default=landing.INGEST_MODE,
+                    help="how fetched data items reach Postgres, default ETL_INGEST_MODE or rabbitmq")
+args, _ = parser.parse_known_args()
+if args.profile:
+    profiling.enable(args.profile, args.profile_interval_ms)
+
+# Prometheus endpoint for the length of the run; the JSON summary is written at exit
+metrics.start()
+
 tools.map_hospitals(spark)
-datasets_csv = tools.download_datasetlist(spark)
+worklist = tools.download_datasetlist(spark)
+if worklist is None:
+    logging.error("Catalogue unavailable, fetching previously pending datasets only.")
+else:
+    # Revised datasets are re-exported once refetched; withdrawn ones leave the lake for good
+    lake.drop_datasets(worklist["changed"] + worklist["withdrawn"])
 
+# Pending = new and changed datasets from the catalogue diff, plus any left over from an interrupted run
 datasets_ids = tools.get_ids()
-batches = [datasets_ids[i:i+20] for i in range(0, len(datasets_ids), 20)]
-
-for batch in tqdm(batches, desc='Fetching data ...'):
-    values_csv = values.get_values(batch)
-    if values_csv:
-        logging.info("Processing batch...")
-        tools.send_to_rabbitmq(values_csv)
-        tools.consume_from_rabbitmq(spark, "values_queue", values.callback_values)
-        tools.update_stored(batch)
\ No newline at end of file
+metrics.pending_datasets.set(len(datasets_ids))
+# Batches are sized by expected payload rather than a fixed number of datasets
+planner = batching.planner_for(datasets_ids)
+# In landing mode a streaming query ingests the landed files while later batches are fetched
+stream = landing.start(spark) if args.ingest == "landing" else None
+
+
+def process_batch(batch):
+    sizes = {}
+    start = time.perf_counter()
+    metrics.inflight_batches.inc()
+    try:
+        if args.ingest in ("landing", "land"):
+            if stream is not None:
+                landing.ensure_running(stream)
+            # Datasets are marked stored by the stream once all their files are ingested
+            landing.land(values.get_values(batch, sizes))
+        # Chunks are published while the responses are still streaming in
+        elif tools.publish_chunks(values.get_values(batch, sizes)):
+            logging.info("Processing batch...")
+            # Returns once the queue is drained. Marks datasets stored once all their chunks are in Postgres;
+            # failures go to the retry queues instead
+            tools.consume_from_rabbitmq(spark, tools.VALUES_QUEUE, values.callback_values)
+            # Once their stored flags are written, the chunks of the completed datasets need no tracking
+            tools.flush_stored()
+            values.reassembly.prune()
+    finally:
+        metrics.inflight_batches.dec()
+    metrics.pending_datasets.dec(len(batch))
+    planner.observe(sizes, time.perf_counter() - start)
+    batching.record_sizes(sizes)
+
+
+with tqdm(total=len(datasets_ids), desc='Fetching data ...', unit='dataset') as progress:
+    for number, batch in enumerate(planner):
+        with profiling.profile("batch", number=number, first=batch[0], last=batch[-1]):
+            process_batch(batch)
+        progress.update(len(batch))
+
+if stream is not None:
+    landing.drain(stream)
+tools.flush_stored()
+snapshot.publish_snapshot()
+utilities.db.close_pool()
@@ -0,0 +1,315 @@
+"""Deterministic, AIHW-shaped scale-test data.
+
+Produces the three payloads the ETL reads from the MyHospitals API: the
+datasets catalogue CSV (download_datasetlist), the reporting unit mappings
+workbook (map_hospitals) and per-dataset data-items CSVs (callback_values).
+
+Every random draw is a counter-based hash of (seed, stream, dataset, hospital),
+so a data item has the same value whether it is generated alone, in a chunk
+or in one vectorized pass over millions of rows, and the same seed always
+yields the same bytes.
+
+Write the files with:
+
+    python3 -m benchmarks.aihw_data --datasets 20000 --hospitals 1000 --out /tmp/aihw
+
+or serve them to the ETL with --serve (see fake_aihw.py).
+"""
+import argparse
+import datetime
+import io
+import os
+import time
+import numpy as np
+import openpyxl
+import pandas as pd
+
+STATES = ["New South Wales", "Victoria", "Queensland", "Western Australia", "South Australia",
+          "Tasmania", "Australian Capital Territory", "Northern Territory"]
+MAPPING_HEADERS = ["Code", "Name", "Type", "Latitude", "Longitude", "Sector", "Open/Closed", "State",
+                   "Local Hospital Network (LHN)", "Primary Health Network area (PHN)"]
+DATA_ITEM_COLUMNS = ["DataSetId", "ReportingUnitCode", "ReportingUnitName", "Value", "Caveats"]
+DISTRIBUTIONS = ["lognormal", "normal", "uniform"]
+FIRST_DATASET_ID = 1
+
+# Independent random streams
+COVERAGE, NOISE, LEVEL, SCALE, MISSING, CAVEAT, OUTLIER, HOSPITAL = range(8)
+
+
+def mix(x):
+    """splitmix64 finalizer over uint64 arrays."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def uniform(seed, stream, *keys):
+    """Uniform [0, 1) draws keyed by (seed, stream, *keys); keys broadcast like NumPy arrays."""
+    with np.errstate(over="ignore"):
+        x = mix(np.asarray(seed, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(stream))
+        for key in keys:
+            x = mix(x ^ (np.asarray(key, dtype=np.int64).astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)))
+    return (x >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def standard_normal(seed, stream, *keys):
+    """Box-Muller over two keyed uniform streams."""
+    u1 = uniform(seed, stream, *keys)
+    u2 = uniform(seed, stream + 100, *keys)
+    return np.sqrt(-2.0 * np.log1p(-u1)) * np.cos(2.0 * np.pi * u2)
+
+
+class AihwData:
+    """A synthetic MyHospitals catalogue of n_datasets datasets over n_hospitals hospitals.
+
+    Datasets cycle through n_measures measures x reported_per_measure reported
+    measures and n_periods yearly reporting periods. Each dataset reports a
+    value for a coverage share of the hospitals plus the national ("NAT")
+    unit. A value is measure scale x hospital level x period noise, drawn from
+    distribution ("lognormal", "normal" or "uniform") with relative spread
+    `spread`; missing_share of values are suppressed (empty), caveat_share
+    carry a caveat and outlier_share are multiplied by outlier_factor.
+    """
+
+    def __init__(self, n_datasets=100, n_hospitals=200, n_measures=10, n_periods=10, coverage=0.6, seed=0,
+                 reported_per_measure=2, distribution="lognormal", spread=0.3, missing_share=0.0,
+                 caveat_share=0.0, outlier_share=0.0, outlier_factor=5.0):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution {distribution}")
+        self.n_datasets = n_datasets
+        self.n_hospitals = n_hospitals
+        self.n_measures = n_measures
+        self.n_periods = n_periods
+        self.coverage = coverage
+        self.seed = seed
+        self.reported_per_measure = reported_per_measure
+        self.distribution = distribution
+        self.spread = spread
+        self.missing_share = missing_share
+        self.caveat_share = caveat_share
+        self.outlier_share = outlier_share
+        self.outlier_factor = outlier_factor
+        self.hospital_codes = np.array([f"H{i:04d}" for i in range(1, n_hospitals + 1)])
+        self.hospital_names = np.array([f"Hospital {i}" for i in range(1, n_hospitals + 1)])
+        self.unit_codes = np.append(self.hospital_codes, "NAT")
+        self.unit_names = np.append(self.hospital_names, "Australia")
+
+    @property
+    def dataset_ids(self):
+        return np.arange(FIRST_DATASET_ID, FIRST_DATASET_ID + self.n_datasets)
+
+    def layout(self, dataset_ids):
+        """(measure, reported measure, period) indexes of each dataset."""
+        offset = np.asarray(dataset_ids, dtype=np.int64) - FIRST_DATASET_ID
+        pair = offset // self.n_periods
+        return pair // self.reported_per_measure % self.n_measures, pair % self.reported_per_measure, offset % self.n_periods
+
+    def catalogue(self):
+        """The datasets catalogue as a DataFrame with the API's column names."""
+        ids = self.dataset_ids
+        measure, reported, period = self.layout(ids)
+        measure, reported = measure + 1, reported + 1
+        years = 2024 - self.n_periods + period
+        starts = [datetime.date(int(y), 7, 1) for y in years]
+        return pd.DataFrame({
+            "DataSetId": ids,
+            "DataSetName": [f"Measure {m} reported {r} {y}-{y + 1}" for m, r, y in zip(measure, reported, years)],
+            "MeasureCode": [f"MYH-M{m:04d}" for m in measure],
+            "MeasureName": [f"Measure {m}" for m in measure],
+            "ReportedMeasureCode": [f"MYH-RM{m:04d}{r}" for m, r in zip(measure, reported)],
+            "ReportedMeasureName": [f"Reported measure {r} of measure {m}" for m, r in zip(measure, reported)],
+            "ReportingStartDate": [d.isoformat() for d in starts],
+            "ReportingEndDate": [datetime.date(d.year + 1, 6, 30).isoformat() for d in starts]
+        })
+
+    def catalogue_csv(self):
+        return self.catalogue().to_csv(index=False).encode("utf-8")
+
+    def hospitals(self):
+        index = np.arange(self.n_hospitals)
+        draw = [uniform(self.seed, HOSPITAL, index, field) for field in range(6)]
+        state = (draw[0] * len(STATES)).astype(int)
+        lhn = (draw[1] * 10).astype(int)
+        return pd.DataFrame({
+            "Code": self.hospital_codes,
+            "Name": self.hospital_names,
+            "Type": "Hospital",
+            "Latitude": np.round(-43.0 + 32.0 * draw[2], 6).astype(str),
+            "Longitude": np.round(113.0 + 40.0 * draw[3], 6).astype(str),
+            "Sector": np.where(draw[4] < 0.7, "Public", "Private"),
+            "Open/Closed": np.where(draw[5] < 0.95, "Open", "Closed"),
+            "State": np.array(STATES)[state],
+            "Local Hospital Network (LHN)": [f"LHN {s}-{l}" for s, l in zip(state, lhn)],
+            "Primary Health Network area (PHN)": [f"PHN {s}-{l // 2}" for s, l in zip(state, lhn)]
+        })[MAPPING_HEADERS]
+
+    def mappings_xlsx(self):
+        """The mappings workbook, with the title rows above the header like the real extract."""
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Reporting units")
+        sheet.append(["www.aihw.gov.au\nAustralian Institute of Health and Welfare"])
+        sheet.append(["MyHospitals mapping details"])
+        sheet.append([f"Data as of: synthetic, seed {self.seed}"])
+        sheet.append(MAPPING_HEADERS)
+        for row in self.hospitals().itertuples(index=False):
+            sheet.append(list(row))
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return buffer.getvalue()
+
+    def draw(self, stream, keys):
+        """Centred noise with unit variance: uniform, or normal (exponentiated later for lognormal)."""
+        if self.distribution == "uniform":
+            return (uniform(self.seed, stream, *keys) - 0.5) * np.sqrt(12.0)
+        return standard_normal(self.seed, stream, *keys)
+
+    def covered(self, dataset_ids):
+        """(datasets x hospitals) mask of the hospitals reporting each dataset."""
+        ids = np.asarray(dataset_ids, dtype=np.int64)[:, None]
+        return uniform(self.seed, COVERAGE, ids, np.arange(self.n_hospitals)[None, :]) < self.coverage
+
+    def row_counts(self, dataset_ids):
+        """Data items per dataset, without generating them: covered hospitals plus NAT."""
+        return self.covered(dataset_ids).sum(axis=1) + 1
+
+    def data_items_bulk(self, dataset_ids):
+        """Data items of many datasets in one vectorized pass, ordered by dataset then unit.
+
+        Memory is proportional to len(dataset_ids) x n_hospitals; generate very
+        large volumes in chunks of datasets (see iter_data_items).
+        """
+        ids = np.asarray(dataset_ids, dtype=np.int64)
+        hospitals = np.arange(self.n_hospitals)
+        measure, reported, _ = self.layout(ids)
+        pair = measure * self.reported_per_measure + reported
+        grid = (ids[:, None], hospitals[None, :])
+
+        # Scale per measure pair, level per (pair, hospital), noise per (dataset, hospital)
+        scale = np.exp(3.0 + standard_normal(self.seed, SCALE, pair))[:, None]
+        level = np.exp(0.5 * standard_normal(self.seed, LEVEL, pair[:, None], hospitals[None, :]))
+        noise = self.draw(NOISE, grid) * self.spread
+        if self.distribution == "lognormal":
+            values = scale * level * np.exp(noise)
+        else:
+            values = scale * level * (1.0 + noise)
+        outlier = uniform(self.seed, OUTLIER, *grid) < self.outlier_share
+        values = np.round(np.where(outlier, values * self.outlier_factor, values), 2)
+
+        covered = self.covered(ids)
+        missing = uniform(self.seed, MISSING, *grid) < self.missing_share
+        values = np.where(missing, np.nan, values)
+        reported_values = np.where(covered & ~missing, values, 0.0)
+        reported_count = (covered & ~missing).sum(axis=1)
+        national = np.round(np.divide(reported_values.sum(axis=1), reported_count,
+                                      out=scale[:, 0].copy(), where=reported_count > 0), 2)
+
+        rows, units = np.nonzero(covered)
+        counts = covered.sum(axis=1)
+        # Insert each dataset's NAT row after its hospitals
+        ends = np.cumsum(counts)
+        row_index = np.insert(rows, ends, np.arange(len(ids)))
+        unit_index = np.insert(units, ends, self.n_hospitals)
+        value = np.insert(values[rows, units], ends, national)
+        caveat = np.insert(uniform(self.seed, CAVEAT, ids[rows], units) < self.caveat_share, ends, False)
+
+        return pd.DataFrame({
+            "DataSetId": ids[row_index],
+            "ReportingUnitCode": pd.Categorical.from_codes(unit_index, self.unit_codes),
+            "ReportingUnitName": pd.Categorical.from_codes(unit_index, self.unit_names),
+            "Value": value,
+            "Caveats": pd.Categorical.from_codes(caveat.astype(np.int8), ["", "c"])
+        })[DATA_ITEM_COLUMNS]
+
+    def iter_data_items(self, dataset_ids=None, chunk_rows=2_000_000):
+        """Yields data-item frames of about chunk_rows rows, covering dataset_ids (default: all)."""
+        ids = self.dataset_ids if dataset_ids is None else np.asarray(dataset_ids, dtype=np.int64)
+        per_chunk = max(1, int(chunk_rows / (self.n_hospitals * self.coverage + 1)))
+        for i in range(0, len(ids), per_chunk):
+            yield self.data_items_bulk(ids[i:i + per_chunk])
+
+    def data_items(self, dataset_id):
+        """Data items of one dataset: the covered hospitals, then the national value."""
+        return self.data_items_bulk([dataset_id])
+
+    def data_items_csv(self, dataset_id):
+        return self.data_items(dataset_id).to_csv(index=False).encode("utf-8")
+
+    def expected_rows(self, dataset_ids):
+        """Data items the ETL should store for these datasets."""
+        return int(self.row_counts(dataset_ids).sum())
+
+    def write(self, directory, per_dataset=True, chunk_rows=2_000_000):
+        """Writes datasets.csv, mappings.xlsx and the data items under directory.
+
+        Data items go to data-items/<DataSetId>.csv, as the API serves them, or
+        with per_dataset=False to a single data-items.csv for bulk loading.
+        Returns the number of data items written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "datasets.csv"), "wb") as f:
+            f.write(self.catalogue_csv())
+        with open(os.path.join(directory, "mappings.xlsx"), "wb") as f:
+            f.write(self.mappings_xlsx())
+
+        rows = 0
+        if per_dataset:
+            os.makedirs(os.path.join(directory, "data-items"), exist_ok=True)
+        for number, chunk in enumerate(self.iter_data_items(chunk_rows=chunk_rows)):
+            rows += len(chunk)
+            if per_dataset:
+                for dataset_id, items in chunk.groupby("DataSetId", sort=False, observed=True):
+                    items.to_csv(os.path.join(directory, "data-items", f"{dataset_id}.csv"), index=False)
+            else:
+                chunk.to_csv(os.path.join(directory, "data-items.csv"), index=False, header=number == 0,
+                             mode="w" if number == 0 else "a")
+        return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate AIHW-shaped scale-test data")
+    parser.add_argument("--datasets", type=int, default=1000)
+    parser.add_argument("--hospitals", type=int, default=300)
+    parser.add_argument("--measures", type=int, default=50)
+    parser.add_argument("--periods", type=int, default=10)
+    parser.add_argument("--reported-per-measure", type=int, default=2)
+    parser.add_argument("--coverage", type=float, default=0.6)
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--spread", type=float, default=0.3)
+    parser.add_argument("--missing-share", type=float, default=0.0)
+    parser.add_argument("--caveat-share", type=float, default=0.0)
+    parser.add_argument("--outlier-share", type=float, default=0.0)
+    parser.add_argument("--outlier-factor", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="directory to write the files to")
+    parser.add_argument("--combined", action="store_true", help="write one data-items.csv instead of one file per dataset")
+    parser.add_argument("--serve", action="store_true", help="serve the data as a fake MyHospitals API")
+    parser.add_argument("--port", type=int, default=8900)
+    return parser.parse_args(argv)
+
+
+def from_args(args):
+    return AihwData(args.datasets, args.hospitals, args.measures, args.periods, args.coverage, args.seed,
+                    reported_per_measure=args.reported_per_measure, distribution=args.distribution,
+                    spread=args.spread, missing_share=args.missing_share, caveat_share=args.caveat_share,
+                    outlier_share=args.outlier_share, outlier_factor=args.outlier_factor)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    data = from_args(args)
+    if args.out:
+        start = time.perf_counter()
+        rows = data.write(args.out, per_dataset=not args.combined)
+        print(f"Wrote {args.datasets} datasets, {rows} data items to {args.out} in {time.perf_counter() - start:.1f}s")
+    if args.serve:
+        from benchmarks.fake_aihw import FakeAihwServer
+        server = FakeAihwServer(data, host="0.0.0.0", port=args.port)
+        print(f"Serving on {server.url} (AIHW_API_URL); Ctrl+C to stop")
+        try:
+            server.server.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Dashboard query benchmark at several data scales.
+
+For each scale the ETL tables are emptied, refilled with generated data
+(load_data.py) and every named dashboard query in src/app/queries.py is run
+over a fixed set of parameter combinations, including the national fallback
+of display_measures and the correlation query. Every combination records its
+latency distribution and an EXPLAIN (ANALYZE, BUFFERS) plan.
+
+Usage, from src/processing, against a scratch database (it is emptied):
+
+    POSTGRES_HOST=localhost POSTGRES_DB=query_bench \\
+        python3 -m benchmarks.dashboard_bench --scales 1,10,100 \\
+        --output query_report.json [--baseline previous_report.json]
+
+With --baseline, plan changes and p50 latency regressions beyond --tolerance
+are listed and the exit status is 1.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from benchmarks.aihw_data import AihwData
+from benchmarks.load_data import load, reset_tables
+import benchmarks.report as report
+
+APP_DIR = os.environ.get("DASHBOARD_APP_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "app"))
+PARAM = re.compile(r"(?<![:\w]):(\w+)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Dashboard query benchmark")
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated multiples of the base catalogue")
+    parser.add_argument("--measures", type=int, default=10, help="measures at scale 1")
+    parser.add_argument("--hospitals", type=int, default=300)
+    parser.add_argument("--periods", type=int, default=10)
+    parser.add_argument("--coverage", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per query and parameters")
+    parser.add_argument("--queries", help="comma-separated subset of query names")
+    parser.add_argument("--output", default="query_report.json")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative p50 growth counted as a regression")
+    return parser.parse_args(argv)
+
+
+def to_psycopg2(sql):
+    """:name parameters -> %(name)s, with literal % escaped."""
+    return PARAM.sub(r"%(\1)s", sql.replace("%", "%%"))
+
+
+def cases(data):
+    """Parameter combinations per query, labelled, mirroring what the dashboard pages send."""
+    catalogue = data.catalogue()
+    hospitals = data.hospitals()
+    state = hospitals['State'].value_counts().index[0]
+    first, last = catalogue.iloc[0], catalogue.iloc[-1]
+    middle_date = sorted(catalogue['ReportingStartDate'].unique())[data.n_periods // 2]
+    measures = {
+        "first": {"measure": first['MeasureName'], "reported_measure": first['ReportedMeasureName']},
+        "last": {"measure": last['MeasureName'], "reported_measure": last['ReportedMeasureName']}
+    }
+    scopes = {
+        "state": {"state": state, "national": False},
+        # display_measures falls back to national data when a state has none
+        "national": {"state": "None", "national": True}
+    }
+    first_page = {"first_page": True, "after_date": "0001-01-01", "after_hospital": "", "after_datasetid": 0,
+                  "after_unit": ""}
+    deep_page = {"first_page": False, "after_date": middle_date, "after_hospital": "Hospital 5", "after_datasetid": 0,
+                 "after_unit": ""}
+
+    selections = {f"{m}/{s}": {**measure, **scope} for m, measure in measures.items() for s, scope in scopes.items()}
+    result = {
+        "measures_catalogue": {"all": {}},
+        "states": {"all": {}},
+        "hospitals": {"all": {}},
+        "hospital_locations": {"all": {}},
+        "measure_values_state": {m: {**measure, "state": state} for m, measure in measures.items()},
+        "measure_values_national": {m: measure for m, measure in measures.items()},
+        "national_average": {m: measure for m, measure in measures.items()},
+        # Correlation Analysis
+        "metric_by_state": {m: {"measure": measure["measure"], "state": state} for m, measure in measures.items()},
+        "measure_latest_values": {m: measure for m, measure in measures.items()},
+        "measure_anomalies": selections,
+        "top_hospitals": {label: {**params, "k": 20} for label, params in selections.items()},
+        "measure_values_export": {label: {**params, "hospital_filter": ""} for label, params in selections.items()}
+    }
+    for name in ("measure_values_page", "measure_values_page_desc"):
+        result[name] = {}
+        for label, params in selections.items():
+            page = {**params, "hospital_filter": "", "page_size": 101}
+            result[name][f"{label}/first"] = {**page, **first_page}
+            result[name][f"{label}/deep"] = {**page, **deep_page}
+            result[name][f"{label}/filtered"] = {**page, **first_page, "hospital_filter": "Hospital 1"}
+    return result
+
+
+def plan_signature(plan):
+    """Node types, relations and indexes of a plan, depth first; changes when the plan shape does."""
+    parts = []
+
+    def walk(node):
+        parts.append(":".join(str(node[key]) for key in ("Node Type", "Relation Name", "Index Name") if key in node))
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan)
+    return hashlib.sha1(">".join(parts).encode("utf-8")).hexdigest()[:12], parts
+
+
+def run_case(cursor, sql, params, repeat):
+    cursor.execute(sql, params)
+    rows = len(cursor.fetchall())
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        samples.append(time.perf_counter() - start)
+
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql.rstrip().rstrip(';')}", params)
+    explained = cursor.fetchone()[0][0]
+    signature, nodes = plan_signature(explained["Plan"])
+    return {
+        "rows": rows,
+        **report.percentiles(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3) if samples else None,
+        "execution_ms": explained.get("Execution Time"),
+        "planning_ms": explained.get("Planning Time"),
+        "shared_hit_blocks": explained["Plan"].get("Shared Hit Blocks"),
+        "shared_read_blocks": explained["Plan"].get("Shared Read Blocks"),
+        "plan_signature": signature,
+        "plan_nodes": nodes,
+        "plan": explained
+    }
+
+
+def run(args):
+    sys.path.insert(0, APP_DIR)
+    from queries import QUERIES
+    import utilities.db as db
+    import utilities.rankings as rankings
+    import utilities.tables as tables
+
+    tables.schema()
+    selected = set(args.queries.split(",")) if args.queries else None
+    scales = {}
+    for scale in [int(s) for s in args.scales.split(",")]:
+        n_measures = args.measures * scale
+        data = AihwData(n_datasets=n_measures * 2 * args.periods, n_hospitals=args.hospitals, n_measures=n_measures,
+                        n_periods=args.periods, coverage=args.coverage, seed=args.seed)
+        reset_tables(db)
+        start = time.perf_counter()
+        info_rows = load(data, db, tables)
+        rankings.refresh_all()
+        load_seconds = time.perf_counter() - start
+        print(f"Scale {scale}x: {info_rows} info rows loaded in {load_seconds:.1f}s")
+
+        results = {}
+        with db.get_connection() as conn, conn.cursor() as cursor:
+            for name, combinations in cases(data).items():
+                if selected and name not in selected:
+                    continue
+                sql = to_psycopg2(QUERIES[name])
+                for label, params in combinations.items():
+                    results[f"{name}/{label}"] = result = run_case(cursor, sql, params, args.repeat)
+                    print(f"  {name}/{label:28} p50 {result['p50_ms']:>9} ms  p99 {result['p99_ms']:>9} ms  "
+                          f"{result['rows']:>7} rows  plan {result['plan_signature']}")
+        scales[str(scale)] = {"info_rows": info_rows, "load_seconds": round(load_seconds, 1), "queries": results}
+
+    db.close_pool()
+    return {"benchmark": "dashboard_queries", "config": vars(args), "environment": report.environment(),
+            "scales": scales}
+
+
+def compare(result, baseline, tolerance=0.2):
+    """Plan changes and p50 regressions of result against a baseline report, as readable lines."""
+    findings = []
+    for scale, current in result["scales"].items():
+        before = baseline.get("scales", {}).get(scale, {}).get("queries", {})
+        for case, stats in current["queries"].items():
+            previous = before.get(case)
+            if not previous:
+                continue
+            if stats["plan_signature"] != previous["plan_signature"]:
+                findings.append(f"{scale}x {case}: plan changed {previous['plan_signature']} -> {stats['plan_signature']}")
+            if previous["p50_ms"] and stats["p50_ms"] > previous["p50_ms"] * (1 + tolerance):
+                findings.append(f"{scale}x {case}: p50 {stats['p50_ms']} ms, was {previous['p50_ms']}")
+    return findings
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    result = run(args)
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["regressions"] = compare(result, json.load(f), args.tolerance)
+    report.write_report(args.output, result)
+    for line in result.get("regressions", []):
+        print(f"REGRESSION {line}")
+    print(f"Report written to {args.output}")
+    return 1 if result.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
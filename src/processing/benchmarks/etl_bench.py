@@ -0,0 +1,195 @@
+"""End-to-end ETL throughput benchmark.
+
+Runs map_hospitals, download_datasetlist and, batch by batch, the streaming
+get_values producer, the RabbitMQ publish/consume path and
+insert_into_postgresql, the same way ETL.py does. The AIHW API is replaced by
+a local fake server (fake_aihw.py) and RabbitMQ by an in-process broker
+(local_broker.py); Postgres is real and taken from the POSTGRES_* variables,
+so point them at a scratch database. With --ingest landing, batches are
+landed as files in a temporary directory and ingested by the Structured
+Streaming job of utilities/landing.py instead.
+
+Usage, from src/processing:
+
+    POSTGRES_HOST=localhost POSTGRES_DB=etl_bench \\
+        python3 -m benchmarks.etl_bench --datasets 200 --hospitals 300 --reset \\
+        --output etl_report.json [--baseline previous_report.json]
+
+The JSON report holds rows/sec and p50/p99/max latency per stage and the peak
+RSS of the process tree (Spark JVM included). With --baseline, regressions
+beyond --tolerance are listed and the exit status is 1.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from benchmarks.aihw_data import AihwData
+from benchmarks.fake_aihw import FakeAihwServer
+import benchmarks.local_broker as local_broker
+from benchmarks.load_data import reset_tables
+import benchmarks.report as report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end ETL throughput benchmark")
+    parser.add_argument("--datasets", type=int, default=100, help="datasets in the fake catalogue")
+    parser.add_argument("--hospitals", type=int, default=200, help="hospitals in the fake mappings workbook")
+    parser.add_argument("--measures", type=int, default=10)
+    parser.add_argument("--periods", type=int, default=10, help="reporting periods per measure")
+    parser.add_argument("--coverage", type=float, default=0.6, help="share of hospitals reporting each dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="datasets fetched and published per batch; 0 sizes batches adaptively like ETL.py")
+    parser.add_argument("--ingest", choices=["rabbitmq", "landing"], default="rabbitmq",
+                        help="publish and consume through the broker, or land files for the streaming job")
+    parser.add_argument("--api-latency-ms", type=float, default=0, help="latency added to every fake API response")
+    parser.add_argument("--reset", action="store_true", help="empty the ETL tables first (scratch databases only)")
+    parser.add_argument("--output", default="etl_report.json")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change counted as a regression")
+    return parser.parse_args(argv)
+
+
+def spark_session():
+    from pyspark.sql import SparkSession
+    jar = os.environ.get("POSTGRES_JDBC_JAR", os.path.join(os.path.dirname(__file__), "..", "jars", "postgresql-42.7.3.jar"))
+    return SparkSession.builder \
+        .appName("etl-benchmark") \
+        .master(os.environ.get("SPARK_MASTER", "local[*]")) \
+        .config("spark.driver.extraClassPath", jar) \
+        .getOrCreate()
+
+
+def run(args):
+    data = AihwData(args.datasets, args.hospitals, args.measures, args.periods, args.coverage, args.seed)
+    timer = report.StageTimer()
+
+    with FakeAihwServer(data, latency_ms=args.api_latency_ms) as server:
+        # The ETL modules read these at import time
+        os.environ["AIHW_API_URL"] = server.url
+        os.environ.setdefault("LAKE_PATH", "")
+        os.environ.setdefault("SNAPSHOT_PATH", "")
+        if args.ingest == "landing":
+            os.environ["LANDING_PATH"] = tempfile.mkdtemp(prefix="etl-bench-landing-")
+        import utilities.anomalies as anomalies
+        import utilities.batching as batching
+        import utilities.db as db
+        import utilities.landing as landing
+        import utilities.metrics as metrics
+        import utilities.rankings as rankings
+        import utilities.tables as tables
+        import utilities.tools as tools
+        import utilities.values as values
+
+        tools.pika = local_broker
+        local_broker.broker.reset()
+        spark = spark_session()
+
+        tables.schema()
+        if args.reset:
+            reset_tables(db)
+
+        with report.RssSampler() as rss:
+            start = time.perf_counter()
+
+            with timer.stage("map_hospitals", rows=args.hospitals):
+                tools.map_hospitals(spark)
+            with timer.stage("download_datasetlist", rows=args.datasets):
+                worklist = tools.download_datasetlist(spark)
+            if worklist is None:
+                raise RuntimeError("download_datasetlist failed against the fake API")
+
+            # Stages called from inside callback_values; rows are those of the batch being consumed
+            batch = {"rows": 0}
+            batches = []
+            values.insert_into_postgresql = timer.wrap("insert_into_postgresql", values.insert_into_postgresql,
+                                                       rows=lambda *_: batch["rows"])
+            anomalies.detect_batch = timer.wrap("detect_anomalies", anomalies.detect_batch, rows=lambda *_: batch["rows"])
+            rankings.refresh = timer.wrap("refresh_rankings", rankings.refresh, rows=lambda *_: batch["rows"])
+
+            dataset_ids = tools.get_ids()
+            planner = batching.planner_for(dataset_ids, fixed_size=args.batch_size)
+            stream = landing.start(spark, trigger_seconds=1) if args.ingest == "landing" else None
+            for ids in planner:
+                sizes = {}
+                batch_start = time.perf_counter()
+                if stream is not None:
+                    # The stream ingests earlier batches while this one is fetched
+                    with timer.stage("fetch_land", rows=len(ids)):
+                        landing.land(values.get_values(ids, sizes))
+                    published = False
+                else:
+                    # Fetching and publishing overlap: chunks go out while responses stream in
+                    with timer.stage("fetch_publish", rows=len(ids)):
+                        published = tools.publish_chunks(values.get_values(ids, sizes))
+                batch["rows"] = sum(size[1] for size in sizes.values())
+                if published:
+                    with timer.stage("consume", rows=batch["rows"]):
+                        tools.consume_from_rabbitmq(spark, tools.VALUES_QUEUE, values.callback_values)
+                planner.observe(sizes, time.perf_counter() - batch_start)
+                batching.record_sizes(sizes)
+                batches.append({"datasets": len(ids), "bytes": sum(size[0] for size in sizes.values()),
+                                "seconds": round(time.perf_counter() - batch_start, 3)})
+            if stream is not None:
+                with timer.stage("drain_landing"):
+                    landing.drain(stream)
+            with timer.stage("flush_stored"):
+                tools.flush_stored()
+
+            elapsed = time.perf_counter() - start
+
+        with db.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM info WHERE datasetid = ANY(%s);", (dataset_ids,))
+            stored_rows = cursor.fetchone()[0]
+
+        result = {
+            "benchmark": "etl",
+            "config": vars(args),
+            "environment": report.environment(),
+            "stages": timer.summary(),
+            "batches": batches,
+            # The ETL's own per-stage counters (utilities/metrics.py), for comparison with production dumps
+            "etl_metrics": metrics.summary(),
+            "total": {
+                "seconds": round(elapsed, 3),
+                "datasets": len(dataset_ids),
+                "rows_expected": data.expected_rows(dataset_ids),
+                "rows_stored": stored_rows,
+                "rows_per_sec": round(stored_rows / elapsed, 1) if elapsed else None
+            },
+            "peak_rss_bytes": rss.peak,
+            "python_peak_rss_bytes": report.python_peak_rss(),
+            "fake_api": {"requests": server.requests, "bytes": server.bytes_sent},
+            "broker": {"messages": local_broker.broker.published, "bytes": local_broker.broker.published_bytes}
+        }
+        db.close_pool()
+    return result
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    result = run(args)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["regressions"] = report.compare(result, json.load(f), args.tolerance)
+
+    report.write_report(args.output, result)
+    total = result["total"]
+    print(f"{total['rows_stored']}/{total['rows_expected']} rows in {total['seconds']}s "
+          f"({total['rows_per_sec']} rows/s), peak RSS {result['peak_rss_bytes'] / 2**20:.0f} MiB")
+    for stage, stats in result["stages"].items():
+        print(f"  {stage:24} {stats['calls']:6} calls  p50 {stats['p50_ms']} ms  p99 {stats['p99_ms']} ms  "
+              f"{stats['rows_per_sec'] or '-'} rows/s")
+    for line in result.get("regressions", []):
+        print(f"REGRESSION {line}")
+    print(f"Report written to {args.output}")
+    return 1 if result.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Local stand-in for the MyHospitals API, serving AihwData over HTTP.
+
+Point the ETL at it with AIHW_API_URL=<server.url> (see utilities/tools.py).
+"""
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DATA_ITEMS_PATH = re.compile(r"^/api/v1/datasets/(\d+)/data-items/?$")
+
+
+class FakeAihwServer:
+    """Serves the catalogue, the mappings workbook and data items of an AihwData.
+
+    latency_ms is added to every response to model the round trip to the real API.
+    """
+
+    def __init__(self, data, host="127.0.0.1", port=0, latency_ms=0):
+        self.data = data
+        self.latency_ms = latency_ms
+        self.requests = 0
+        self.bytes_sent = 0
+        # Static payloads are built once, like a CDN would serve them
+        self.catalogue = data.catalogue_csv()
+        self.dataset_ids = set(data.catalogue()["DataSetId"].astype(int))
+        self.mappings = data.mappings_xlsx()
+        self.server = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if fake.latency_ms:
+                    time.sleep(fake.latency_ms / 1000)
+                path = self.path.split("?")[0]
+                match = DATA_ITEMS_PATH.match(path)
+                if path.rstrip("/") == "/api/v1/datasets":
+                    body, content_type = fake.catalogue, "text/csv"
+                elif path.rstrip("/") == "/api/v1/reporting-units-downloads/mappings":
+                    body, content_type = fake.mappings, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                elif match and int(match.group(1)) in fake.dataset_ids:
+                    body, content_type = fake.data.data_items_csv(int(match.group(1))), "text/csv"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                fake.requests += 1
+                fake.bytes_sent += len(body)
+
+            def log_message(self, format, *args):
+                logging.debug(format % args)
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-aihw", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,94 @@
+"""Bulk-loads AihwData straight into Postgres with COPY, bypassing the ETL.
+
+Used to build large databases quickly for query benchmarks; the rows are
+the ones the ETL would have stored for the same data.
+"""
+import io
+import logging
+import time
+import pandas as pd
+
+# Tables emptied by reset_tables, when they exist
+RESET_TABLES = ["info", "info_compact", "reporting_units", "datasets", "measurements", "reported_measurements",
+                "hospitals", "anomalies", "hospital_rankings"]
+
+# Mapping workbook headers -> hospitals columns (same as utilities.tools.HOSPITAL_COLUMNS)
+HOSPITAL_COLUMNS = {
+    "Code": "code",
+    "Name": "name",
+    "Type": "type",
+    "Latitude": "latitude",
+    "Longitude": "longitude",
+    "Sector": "sector",
+    "Open/Closed": "open_closed",
+    "State": "state",
+    "Local Hospital Network (LHN)": "lhn",
+    "Primary Health Network area (PHN)": "phn"
+}
+
+
+def reset_tables(db):
+    """Empties the ETL tables. Only ever point this at a scratch database."""
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        existing = []
+        for table in RESET_TABLES:
+            cursor.execute("SELECT to_regclass(%s);", (table,))
+            if cursor.fetchone()[0] is not None:
+                existing.append(table)
+        # info is a view over info_compact in the partitioned layout
+        cursor.execute("SELECT relname FROM pg_class WHERE relname = ANY(%s) AND relkind IN ('r', 'p');", (existing,))
+        truncatable = [row[0] for row in cursor.fetchall()]
+        if truncatable:
+            cursor.execute(f"TRUNCATE {', '.join(truncatable)} RESTART IDENTITY;")
+        db.bump_data_version(cursor)
+
+
+def copy_frame(cursor, table, frame):
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def load(data, db, tables, chunk_rows=1_000_000):
+    """Loads the hospitals, catalogue and every data item of data; returns the info rows written."""
+    start = time.perf_counter()
+    catalogue = data.catalogue()
+    catalogue.columns = [column.lower() for column in catalogue.columns]
+    tables.ensure_info_partitions(catalogue['datasetid'].max())
+    partitioned = tables.INFO_LAYOUT == "partitioned"
+
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        hospitals = data.hospitals().rename(columns=HOSPITAL_COLUMNS)
+        copy_frame(cursor, "hospitals", hospitals)
+        copy_frame(cursor, "measurements", catalogue[['measurecode', 'measurename']].drop_duplicates())
+        copy_frame(cursor, "reported_measurements",
+                   catalogue[['reportedmeasurecode', 'reportedmeasurename']].drop_duplicates())
+        copy_frame(cursor, "datasets", catalogue[['datasetid', 'reportingstartdate', 'reportedmeasurecode',
+                                                  'measurecode', 'datasetname']].assign(stored=True))
+
+        units = None
+        if partitioned:
+            codes = pd.DataFrame({"reportingunitcode": list(hospitals['code']) + ["NAT"]})
+            copy_frame(cursor, "reporting_units", codes)
+            cursor.execute("SELECT reportingunitcode, unit_id FROM reporting_units;")
+            units = dict(cursor.fetchall())
+
+        rows = 0
+        for info in data.iter_data_items(chunk_rows=chunk_rows):
+            info.columns = [column.lower() for column in info.columns]
+            if partitioned:
+                info = info.assign(unit_id=info['reportingunitcode'].map(units))
+                copy_frame(cursor, "info_compact", info[['datasetid', 'unit_id', 'value', 'caveats']])
+            else:
+                info = info.assign(id=info['datasetid'].astype(str) + info['reportingunitcode'])
+                copy_frame(cursor, "info", info[['datasetid', 'reportingunitcode', 'value', 'caveats', 'id']])
+            rows += len(info)
+        db.bump_data_version(cursor)
+
+    # Fresh statistics, as autovacuum would eventually produce
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("ANALYZE;")
+
+    logging.info(f"Loaded {rows} info rows for {len(catalogue)} datasets in {time.perf_counter() - start:.1f}s")
+    return rows
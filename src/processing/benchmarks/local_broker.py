@@ -0,0 +1,150 @@
+"""In-process stand-in for the parts of pika the ETL uses.
+
+Install it with `tools.pika = local_broker`: publish_chunks and
+consume_from_rabbitmq then publish to and drain in-memory queues. consume()
+behaves like pika's BlockingChannel.consume, down to the (None, None, None)
+yielded after inactivity_timeout, so the consumer returns exactly when it
+would against RabbitMQ and a benchmark times the production path. Queues
+declared with x-message-ttl and x-dead-letter-routing-key hand their expired
+messages back when the target queue is next read, which is enough for the
+ETL's retry queues.
+"""
+import threading
+import time
+from collections import deque, namedtuple
+
+Method = namedtuple("Method", ["delivery_tag", "routing_key"])
+DeclareOk = namedtuple("DeclareOk", ["queue", "message_count", "consumer_count"])
+Frame = namedtuple("Frame", ["method"])
+
+
+class BasicProperties:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+        self.headers = kwargs.get("headers")
+
+
+class ConnectionParameters:
+    def __init__(self, host="localhost", **kwargs):
+        self.host = host
+
+
+class ChannelClosedByBroker(Exception):
+    pass
+
+
+class Broker:
+    """Named in-memory queues shared by every connection of the process."""
+
+    def __init__(self):
+        self.queues = {}
+        self.arguments = {}
+        self.lock = threading.Lock()
+        self.published = 0
+        self.published_bytes = 0
+        self.acked = 0
+
+    def declare(self, name, passive=False, arguments=None):
+        with self.lock:
+            if name not in self.queues:
+                if passive:
+                    raise ChannelClosedByBroker(f"NOT_FOUND - no queue '{name}'")
+                self.queues[name] = deque()
+                self.arguments[name] = arguments or {}
+            return len(self.queues[name])
+
+    def publish(self, name, body, properties):
+        with self.lock:
+            self.queues[name].append((body, properties, time.monotonic()))
+            self.published += 1
+            self.published_bytes += len(body)
+
+    def expire_into(self, name):
+        """Moves expired messages of the queues dead-lettering into name back to it."""
+        now = time.monotonic()
+        for source, arguments in self.arguments.items():
+            if arguments.get("x-dead-letter-routing-key") != name or "x-message-ttl" not in arguments:
+                continue
+            queue = self.queues[source]
+            while queue and now - queue[0][2] >= arguments["x-message-ttl"] / 1000:
+                self.queues[name].append(queue.popleft())
+
+    def pop(self, name):
+        with self.lock:
+            if name in self.queues:
+                self.expire_into(name)
+            queue = self.queues.get(name)
+            return queue.popleft()[:2] if queue else None
+
+    def reset(self):
+        with self.lock:
+            self.queues.clear()
+            self.arguments.clear()
+            self.published = self.published_bytes = self.acked = 0
+
+
+broker = Broker()
+
+
+class Channel:
+    def __init__(self):
+        self.delivery_tag = 0
+
+    def queue_declare(self, queue, passive=False, durable=False, arguments=None):
+        return Frame(DeclareOk(queue, broker.declare(queue, passive=passive, arguments=arguments), 0))
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        broker.publish(routing_key, body, properties or BasicProperties())
+
+    def basic_get(self, queue, auto_ack=False):
+        message = broker.pop(queue)
+        if message is None:
+            return None, None, None
+        self.delivery_tag += 1
+        return Method(self.delivery_tag, queue), message[1], message[0]
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        broker.acked += 1
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        pass
+
+    def basic_qos(self, prefetch_count=0, **kwargs):
+        pass
+
+    def consume(self, queue, auto_ack=False, inactivity_timeout=None):
+        """Yields (method, properties, body) per message, and (None, None, None) after inactivity_timeout idle seconds."""
+        idle_since = time.monotonic()
+        while True:
+            message = broker.pop(queue)
+            if message is None:
+                if inactivity_timeout is not None and time.monotonic() - idle_since >= inactivity_timeout:
+                    yield None, None, None
+                    idle_since = time.monotonic()
+                else:
+                    time.sleep(0.01)
+                continue
+            body, properties = message
+            self.delivery_tag += 1
+            yield Method(self.delivery_tag, queue), properties, body
+            idle_since = time.monotonic()
+
+    def cancel(self):
+        return 0
+
+    def close(self):
+        pass
+
+
+class BlockingConnection:
+    def __init__(self, parameters=None):
+        self.parameters = parameters
+        self.is_open = True
+
+    def channel(self):
+        return Channel()
+
+    def close(self):
+        self.is_open = False
@@ -0,0 +1,150 @@
+"""Timing, memory and report helpers shared by the benchmarks."""
+import json
+import os
+import platform
+import resource
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+import numpy as np
+
+
+def percentiles(samples):
+    """p50/p99/max of a list of seconds, in milliseconds."""
+    if not samples:
+        return {"p50_ms": None, "p99_ms": None, "max_ms": None}
+    ms = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3)
+    }
+
+
+class StageTimer:
+    """Collects the latency of every call and the rows handled per stage."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.rows = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds, rows=0):
+        with self.lock:
+            self.samples[stage].append(seconds)
+            self.rows[stage] += rows
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, rows)
+
+    def wrap(self, stage, function, rows=None):
+        """Times every call of function; rows(result, *args) gives the rows it handled."""
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            self.record(stage, time.perf_counter() - start, rows(result, *args) if rows else 0)
+            return result
+        return timed
+
+    def summary(self):
+        stages = {}
+        for stage, samples in self.samples.items():
+            total = sum(samples)
+            stages[stage] = {
+                "calls": len(samples),
+                "rows": self.rows[stage],
+                "seconds": round(total, 3),
+                "rows_per_sec": round(self.rows[stage] / total, 1) if total and self.rows[stage] else None,
+                **percentiles(samples)
+            }
+        return stages
+
+
+def tree_rss(pid):
+    """Resident memory of a process and all its descendants (e.g. the Spark JVM), in bytes."""
+    total = 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+                    break
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                for child in f.read().split():
+                    total += tree_rss(int(child))
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        pass
+    return total
+
+
+class RssSampler:
+    """Samples the resident memory of this process tree in the background and keeps the peak."""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="rss-sampler", daemon=True)
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.peak = max(self.peak, tree_rss(os.getpid()))
+            self.stopped.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+def python_peak_rss():
+    """Peak resident memory of the Python process alone, in bytes (Linux reports KiB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "commit": commit, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def write_report(path, report):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def compare(report, baseline, tolerance=0.2):
+    """Regressions of report against a baseline report, as human-readable lines.
+
+    A stage regresses when its throughput drops or its p99 grows by more than
+    tolerance; the run regresses when its peak RSS grows by more than tolerance.
+    """
+    regressions = []
+    for stage, current in report["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before:
+            continue
+        if before.get("rows_per_sec") and current.get("rows_per_sec") is not None \
+                and current["rows_per_sec"] < before["rows_per_sec"] * (1 - tolerance):
+            regressions.append(f"{stage}: {current['rows_per_sec']} rows/s, was {before['rows_per_sec']}")
+        if before.get("p99_ms") and current.get("p99_ms") is not None \
+                and current["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{stage}: p99 {current['p99_ms']} ms, was {before['p99_ms']}")
+    if baseline.get("peak_rss_bytes") and report.get("peak_rss_bytes", 0) > baseline["peak_rss_bytes"] * (1 + tolerance):
+        regressions.append(f"peak RSS {report['peak_rss_bytes']} bytes, was {baseline['peak_rss_bytes']}")
+    return regressions
@@ -0,0 +1,32 @@
+"""Runs the landing-zone stream on its own (see utilities/landing.py).
+
+Ingests the files landed by ETL.py --ingest land, continuously, or with --once
+everything landed so far (e.g. what an interrupted run left behind) before
+exiting. It resumes from LANDING_CHECKPOINT, which it shares with
+ETL.py --ingest landing: do not run both at once.
+
+Usage: python3 ingest_landing.py [--once] [--trigger-seconds N]
+"""
+import argparse
+import logging
+import utilities.db as db
+import utilities.landing as landing
+import utilities.metrics as metrics
+import utilities.tools as tools
+from setup import spark
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+parser = argparse.ArgumentParser(description="Ingest the landing zone into Postgres with Spark Structured Streaming")
+parser.add_argument("--once", action="store_true", help="ingest the files landed so far, then exit")
+parser.add_argument("--trigger-seconds", type=int, default=landing.TRIGGER_SECONDS,
+                    help="seconds between micro-batches, default ETL_TRIGGER_SECONDS or 10")
+args = parser.parse_args()
+
+metrics.start()
+query = landing.start(spark, args.trigger_seconds, once=args.once)
+try:
+    query.awaitTermination()
+finally:
+    tools.flush_stored()
+    db.close_pool()
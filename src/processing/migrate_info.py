@@ -0,0 +1,12 @@
+"""Migrates the info table to the partitioned layout (see utilities/tables.py).
+
+Usage: INFO_LAYOUT=partitioned python3 migrate_info.py [--drop-legacy]
+"""
+import sys
+import utilities.tables as tables
+
+if tables.INFO_LAYOUT != "partitioned":
+    sys.exit("Set INFO_LAYOUT=partitioned to migrate the info table.")
+
+tables.migrate_info_layout(drop_legacy="--drop-legacy" in sys.argv[1:])
+tables.schema()
@@ -0,0 +1,11 @@
+"""Rebuilds every hospital ranking (see utilities/rankings.py), e.g. after upgrading an existing database.
+
+Usage: python3 refresh_rankings.py
+"""
+import utilities.db as db
+import utilities.rankings as rankings
+import utilities.tables as tables
+
+tables.schema()
+print(f"Ranked {rankings.refresh_all()} hospital summaries.")
+db.close_pool()
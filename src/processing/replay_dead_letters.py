@@ -0,0 +1,23 @@
+"""Lists or replays the batches dead-lettered by the ETL (see utilities/tools.py).
+
+Replayed messages go back onto values_queue with a fresh retry budget and are
+stored by the next ETL run's consumer.
+
+Usage: python3 replay_dead_letters.py [--list] [--limit N]
+"""
+import argparse
+import utilities.tools as tools
+
+parser = argparse.ArgumentParser(description="Inspect or replay the values_queue dead-letter queue")
+parser.add_argument("--list", action="store_true", help="print the dead-lettered messages without moving them")
+parser.add_argument("--limit", type=int, help="replay (or list) at most this many messages")
+args = parser.parse_args()
+
+if args.list:
+    messages = tools.list_dead_letters(args.limit or 100)
+    for message in messages:
+        print(f"{message.get('failed_at')}  attempts {message.get('attempts')}  {message['bytes']} bytes  "
+              f"datasets {message.get('dataset_ids')}\n    {message.get('last_error')}")
+    print(f"{len(messages)} dead-lettered message(s) listed.")
+else:
+    print(f"Replayed {tools.replay_dead_letters(args.limit)} dead-lettered message(s) onto {tools.VALUES_QUEUE}.")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The ETL imports its modules as utilities.*, relative to src/processing
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# Shared modules, for checkouts where src/shared is not pip-installed
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", "..", "shared"))
@@ -0,0 +1,49 @@
+import datetime
+
+import pandas as pd
+import pytest
+import utilities.anomalies as anomalies
+
+
+def series(unit, values, measure="M1", first_dataset=1):
+    return pd.DataFrame({
+        "reportingunitcode": unit, "measurecode": measure, "reportedmeasurecode": "R1",
+        "reportingstartdate": [datetime.date(2010 + i, 7, 1) for i in range(len(values))],
+        "datasetid": range(first_dataset, first_dataset + len(values)),
+        "value": values
+    })
+
+
+def test_baseline_comes_from_earlier_periods_only():
+    scored = anomalies.score(series("H1", [10.0, 11.0, 9.0, 10.0, 50.0]), window=8, min_periods=4)
+
+    assert scored["baseline"].iloc[:4].isna().all()
+    assert scored["baseline"].iloc[4] == 10.0
+    assert scored["robust_z"].iloc[4] > anomalies.Z_THRESHOLD
+
+
+def test_a_spike_is_flagged_as_outlier_and_jump():
+    flagged = anomalies.flag(anomalies.score(series("H1", [10.0, 11.0, 9.0, 10.0, 50.0]), min_periods=4))
+
+    assert flagged["datasetid"].tolist() == [5]
+    assert flagged["reason"].tolist() == ["outlier,jump"]
+
+
+def test_series_are_scored_apart():
+    both = pd.concat([series("H1", [10.0, 11.0, 9.0, 10.0, 50.0]),
+                      series("H2", [100.0, 101.0, 99.0, 100.0, 101.0], first_dataset=1)])
+    flagged = anomalies.flag(anomalies.score(both, min_periods=4))
+
+    assert flagged["reportingunitcode"].tolist() == ["H1"]
+
+
+def test_only_the_batch_datasets_are_flagged():
+    scored = anomalies.score(series("H1", [10.0, 11.0, 9.0, 10.0, 50.0, 10.0]), min_periods=4)
+
+    assert anomalies.flag(scored, dataset_ids=[5, 6])["datasetid"].tolist() == [5]
+    assert anomalies.flag(scored, dataset_ids=[6]).empty
+
+
+@pytest.mark.parametrize("values", [[10.0, 30.0], [0.0, 0.0, 0.0, 0.0, 0.0]])
+def test_no_flags_without_a_baseline_or_spread(values):
+    assert anomalies.flag(anomalies.score(series("H1", values), min_periods=4)).empty
@@ -0,0 +1,63 @@
+import pytest
+import utilities.batching as batching
+from utilities.batching import BatchPlanner
+
+MIB = 2**20
+
+
+def test_batches_fill_up_to_the_target():
+    planner = BatchPlanner([1, 2, 3, 4, 5], sizes={i: (3 * MIB, 100) for i in range(1, 6)}, target_bytes=7 * MIB)
+    assert list(planner) == [[1, 2], [3, 4], [5]]
+
+
+def test_a_dataset_over_the_target_gets_a_batch_of_its_own():
+    sizes = {1: (MIB, 10), 2: (100 * MIB, 10), 3: (MIB, 10)}
+    planner = BatchPlanner([1, 2, 3], sizes=sizes, target_bytes=8 * MIB)
+    assert list(planner) == [[1], [2], [3]]
+
+
+def test_row_and_id_caps(monkeypatch):
+    monkeypatch.setattr(batching, "MAX_ROWS", 250)
+    planner = BatchPlanner([1, 2, 3], sizes={i: (10, 100) for i in (1, 2, 3)})
+    assert list(planner) == [[1, 2], [3]]
+
+    monkeypatch.setattr(batching, "MAX_IDS", 2)
+    assert list(BatchPlanner([1, 2, 3], sizes={i: (10, 1) for i in (1, 2, 3)})) == [[1, 2], [3]]
+
+
+def test_estimates_fall_back_to_the_group_then_the_run_average():
+    planner = BatchPlanner([1, 2, 3], sizes={1: (100, 1)}, groups={2: ("R1", "M1"), 3: ("R2", "M2")},
+                           group_sizes={("R1", "M1"): (200, 2)})
+    assert planner.estimate(1) == (100, 1)
+    assert planner.estimate(2) == (200, 2)
+    assert planner.estimate(3) == (batching.DEFAULT_DATASET_BYTES,
+                                   batching.DEFAULT_DATASET_BYTES / batching.DEFAULT_ROW_BYTES)
+    planner.observe({4: (400, 4), 5: (600, 6)}, seconds=0)
+    assert planner.estimate(3) == (500, 5)
+
+
+def test_target_keeps_its_direction_while_throughput_improves():
+    planner = BatchPlanner([], target_bytes=8 * MIB)
+    planner.observe({1: (8 * MIB, 1)}, seconds=2)
+    assert planner.target_bytes == pytest.approx(10 * MIB)
+    planner.observe({2: (10 * MIB, 1)}, seconds=2)
+    assert planner.target_bytes == pytest.approx(12.5 * MIB)
+    # Slower than the previous batch: the target turns back
+    planner.observe({3: (MIB, 1)}, seconds=2)
+    assert planner.target_bytes == pytest.approx(10 * MIB)
+
+
+def test_target_stays_within_its_bounds():
+    planner = BatchPlanner([], target_bytes=batching.MIN_TARGET_BYTES)
+    planner.observe({1: (MIB, 1)}, seconds=batching.MAX_BATCH_SECONDS + 1)
+    assert planner.target_bytes == batching.MIN_TARGET_BYTES
+
+    planner = BatchPlanner([], target_bytes=10 * batching.MAX_BYTES)
+    assert planner.target_bytes == batching.MAX_BYTES
+
+
+def test_fixed_size_batches_ignore_payloads():
+    planner = BatchPlanner([1, 2, 3, 4, 5], sizes={1: (100 * MIB, 1)}, fixed_size=2)
+    assert list(planner) == [[1, 2], [3, 4], [5]]
+    planner.observe({1: (MIB, 1)}, seconds=1)
+    assert planner.target_bytes == batching.TARGET_BYTES
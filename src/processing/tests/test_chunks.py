@@ -0,0 +1,100 @@
+import json
+
+import pytest
+from utilities.chunks import DoneChunks, Reassembly
+
+
+def headers(seq, dataset_ids, complete=None, batch="b1"):
+    return {"batch": batch, "seq": seq, "dataset_ids": dataset_ids, "complete": complete or {}}
+
+
+def test_dataset_completes_once_all_its_chunks_are_stored():
+    reassembly = Reassembly()
+    # Dataset 7 spans chunks 0-2; chunk 2 also holds all of dataset 8
+    assert reassembly.chunk_stored(headers(2, [7, 8], {"7": 0, "8": 2})) == [8]
+    assert reassembly.chunk_stored(headers(0, [7])) == []
+    assert reassembly.chunk_stored(headers(1, [7])) == [7]
+
+
+def test_batches_are_tracked_apart():
+    reassembly = Reassembly()
+    assert reassembly.chunk_stored(headers(1, [7], {"7": 0}, batch="b1")) == []
+    assert reassembly.chunk_stored(headers(0, [9], batch="b2")) == []
+    assert reassembly.chunk_stored(headers(0, [7], batch="b1")) == [7]
+
+
+@pytest.fixture
+def done(tmp_path):
+    def land(name, chunk_headers):
+        (tmp_path / f"{name}.json").write_text(json.dumps(chunk_headers))
+        return name
+
+    return DoneChunks(str(tmp_path)), land, tmp_path
+
+
+def test_each_sidecar_is_read_once(done, monkeypatch):
+    chunks, land, _ = done
+    reads = []
+    read = chunks.read
+    monkeypatch.setattr(chunks, "read", lambda batch, name: reads.append(name) or read(batch, name))
+
+    assert chunks.ingested([land("b1-000000", headers(0, [7]))]) == []
+    assert chunks.ingested([land("b1-000001", headers(1, [7], {"7": 0}))]) == [7]
+    # A replayed chunk completes nothing new
+    assert chunks.ingested(["b1-000001"]) == []
+    assert reads == ["b1-000000", "b1-000001"]
+
+
+def test_restart_rebuilds_a_batch_from_its_sidecars(done, tmp_path):
+    chunks, land, _ = done
+    land("b1-000000", headers(0, [7]))
+    land("b1-000001", headers(1, [7, 8], {"8": 1}))
+    restarted = DoneChunks(str(tmp_path))
+
+    assert restarted.ingested([land("b1-000002", headers(2, [7], {"7": 0}))]) == [8, 7]
+
+
+def test_prune_keeps_sidecars_datasets_still_wait_on(done):
+    chunks, land, tmp_path = done
+    chunks.ingested([land("b1-000000", headers(0, [6, 7], {"6": 0}))])
+    chunks.ingested([land("b1-000002", headers(2, [9], {"9": 2}))])
+
+    assert chunks.prune() == 1
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["b1-000000.json"]
+
+    assert chunks.ingested([land("b1-000001", headers(1, [7], {"7": 0}))]) == [7]
+    assert chunks.prune() == 2
+    assert list(tmp_path.iterdir()) == []
+    assert chunks.chunks == {} and chunks.reassembly.stored == {}
+
+
+def test_pruned_batch_is_reloaded_from_what_is_left(done):
+    chunks, land, _ = done
+    chunks.ingested([land("b1-000000", headers(0, [6], {"6": 0}))])
+    chunks.prune()
+    chunks.ingested([land("b1-000002", headers(2, [7], {"7": 1}))])
+
+    assert chunks.ingested([land("b1-000001", headers(1, [7]))]) == [7]
+
+
+def test_prune_drops_the_chunks_of_complete_datasets():
+    reassembly = Reassembly()
+    reassembly.chunk_stored(headers(0, [6, 7], {"6": 0}))
+    reassembly.chunk_stored(headers(2, [9], {"9": 2}))
+
+    # Chunk 0 still holds rows of dataset 7, which waits on chunk 1
+    assert reassembly.prune() == 1
+    assert reassembly.stored == {"b1": {0: {6, 7}}}
+
+    assert reassembly.chunk_stored(headers(1, [7], {"7": 0})) == [7]
+    assert reassembly.prune() == 2
+    assert reassembly.stored == {} and reassembly.waiting == {} and reassembly.complete == {}
+
+
+def test_prune_keeps_the_chunks_of_a_dataset_still_waiting():
+    reassembly = Reassembly()
+    reassembly.chunk_stored(headers(2, [7], {"7": 0}))
+    reassembly.chunk_stored(headers(0, [7]))
+
+    assert reassembly.prune() == 0
+    assert reassembly.chunk_stored(headers(1, [7])) == [7]
@@ -0,0 +1,39 @@
+import io
+
+import openpyxl
+import pytest
+
+pytest.importorskip("pika")
+pytest.importorskip("pyspark")
+tools = pytest.importorskip("utilities.tools")
+
+
+def workbook(*rows):
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.append(["Reporting units mappings"])
+    sheet.append(list(tools.HOSPITAL_COLUMNS))
+    for row in rows:
+        sheet.append(row)
+    sheet.append([None])
+    sheet.append(["Footnote: codes are AIHW reporting units"])
+    content = io.BytesIO()
+    book.save(content)
+    return content.getvalue()
+
+
+def test_blank_cells_are_null():
+    content = workbook(["H0001", "Ararat Hospital", "Hospital", -37.28, 142.93, "Public", "Open", "Vic", "", None])
+
+    [record] = tools.parse_hospital_mappings(content)
+
+    assert record[:-1] == ("H0001", "Ararat Hospital", "Hospital", -37.28, 142.93, "Public", "Open", "Vic",
+                           None, None)
+
+
+def test_rows_stop_at_the_footnotes():
+    content = workbook(["H0001", "Ararat Hospital"], ["H0002", " Bairnsdale Hospital "])
+
+    records = list(tools.parse_hospital_mappings(content))
+
+    assert [record[:2] for record in records] == [("H0001", "Ararat Hospital"), ("H0002", "Bairnsdale Hospital")]
@@ -0,0 +1,76 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import utilities.lake as lake
+
+
+@pytest.fixture
+def lake_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(lake, "LAKE_PATH", str(tmp_path))
+    metadata = pd.DataFrame({"datasetid": [5, 6], "measurecode": ["M1", "M1"], "reportedmeasurecode": ["R1", "R1"],
+                             "reportingstartdate": ["2020-07-01", "2020-07-01"]})
+    monkeypatch.setattr(lake, "dataset_metadata", lambda ids: metadata[metadata["datasetid"].isin(ids)])
+    return tmp_path
+
+
+def items(dataset_id, codes, value=1.0):
+    return pd.DataFrame({"datasetid": dataset_id, "reportingunitcode": codes, "value": value, "caveats": None})
+
+
+def lake_rows():
+    manifest = lake.read_manifest()
+    frames = []
+    for partition, entry in manifest["partitions"].items():
+        for name, file in entry["files"].items():
+            table = pq.read_table(f"{lake.facts_path()}/{partition}/{name}", schema=lake.LAKE_SCHEMA)
+            assert table.num_rows == file["rows"]
+            frames.append(table.to_pandas())
+    if not frames:
+        return pd.DataFrame(columns=lake.LAKE_SCHEMA.names)
+    return pd.concat(frames).sort_values(["datasetid", "reportingunitcode"]).reset_index(drop=True)
+
+
+def test_dataset_exported_in_two_chunks_keeps_both(lake_path):
+    lake.export_batch(items(5, ["H1", "H2"]))
+    lake.export_batch(items(5, ["H3", "H4"]))
+
+    assert lake_rows()["reportingunitcode"].tolist() == ["H1", "H2", "H3", "H4"]
+
+
+def test_chunk_exported_twice_is_counted_once(lake_path):
+    lake.export_batch(items(5, ["H1", "H2"]))
+    lake.export_batch(items(5, ["H3", "H4"]))
+    lake.export_batch(items(5, ["H3", "H4"], value=2.0))
+
+    rows = lake_rows()
+    assert rows["reportingunitcode"].tolist() == ["H1", "H2", "H3", "H4"]
+    assert rows["value"].tolist() == [1.0, 1.0, 2.0, 2.0]
+
+
+def test_export_leaves_other_datasets_alone(lake_path):
+    lake.export_batch(pd.concat([items(5, ["H1"]), items(6, ["H1", "H2"])]))
+    lake.export_batch(items(5, ["H1", "H2"], value=3.0))
+
+    rows = lake_rows()
+    assert rows[rows["datasetid"] == 6]["value"].tolist() == [1.0, 1.0]
+    assert rows[rows["datasetid"] == 5]["value"].tolist() == [3.0, 3.0]
+
+
+def test_drop_datasets_clears_every_chunk(lake_path):
+    lake.export_batch(items(5, ["H1", "H2"]))
+    lake.export_batch(pd.concat([items(5, ["H3"]), items(6, ["H1"])]))
+    lake.drop_datasets([5])
+
+    assert lake_rows()["datasetid"].tolist() == [6]
+
+
+def test_compaction_keeps_every_row(lake_path, monkeypatch):
+    monkeypatch.setattr(lake, "LAKE_COMPACT_FILES", 3)
+    for chunk in range(5):
+        lake.export_batch(items(5, [f"H{chunk}a", f"H{chunk}b"]))
+
+    manifest = lake.read_manifest()
+    (partition,) = manifest["partitions"].values()
+    assert len(partition["files"]) < 3
+    assert len(lake_rows()) == 10
+    assert manifest["version"] == 5
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+import benchmarks.local_broker as local_broker
+
+
+@pytest.fixture
+def channel():
+    local_broker.broker.reset()
+    return local_broker.BlockingConnection(local_broker.ConnectionParameters("localhost")).channel()
+
+
+def test_consume_yields_messages_then_none_when_idle(channel):
+    channel.queue_declare(queue="q")
+    for body in (b"a", b"b"):
+        channel.basic_publish(exchange="", routing_key="q", body=body)
+
+    messages = channel.consume("q", inactivity_timeout=0.05)
+    bodies = [next(messages)[2], next(messages)[2]]
+    start = time.monotonic()
+    idle = next(messages)
+
+    assert bodies == [b"a", b"b"]
+    assert idle == (None, None, None)
+    assert time.monotonic() - start >= 0.05
+
+
+def test_passive_declare_counts_ready_messages(channel):
+    with pytest.raises(local_broker.ChannelClosedByBroker):
+        channel.queue_declare(queue="missing", passive=True)
+    channel.queue_declare(queue="q")
+    channel.basic_publish(exchange="", routing_key="q", body=b"a")
+    channel.basic_publish(exchange="", routing_key="q", body=b"b")
+    method, _, _ = next(channel.consume("q"))
+
+    assert channel.queue_declare(queue="q", passive=True).method.message_count == 1
+    channel.basic_ack(method.delivery_tag)
+    assert local_broker.broker.acked == 1
+
+
+def test_expired_retry_messages_return_to_their_queue(channel):
+    channel.queue_declare(queue="q")
+    channel.queue_declare(queue="q.retry", arguments={"x-message-ttl": 50, "x-dead-letter-exchange": "",
+                                                      "x-dead-letter-routing-key": "q"})
+    channel.basic_publish(exchange="", routing_key="q.retry", body=b"again",
+                          properties=local_broker.BasicProperties(headers={"attempts": 1}))
+
+    assert channel.basic_get("q") == (None, None, None)
+    time.sleep(0.06)
+    method, properties, body = channel.basic_get("q")
+    assert body == b"again"
+    assert properties.headers == {"attempts": 1}
@@ -0,0 +1,55 @@
+import pytest
+import utilities.metrics as metrics
+
+
+@pytest.fixture(autouse=True)
+def empty_metrics():
+    for metric in metrics.registry.metrics:
+        metric.values.clear()
+
+
+def test_summary_totals_each_stage():
+    with metrics.timed("parse", rows=10, nbytes=400):
+        pass
+    metrics.stage_retries.inc(stage="parse")
+    with pytest.raises(ValueError):
+        with metrics.timed("parse"):
+            raise ValueError("bad chunk")
+
+    parse = metrics.summary()["parse"]
+    assert (parse["calls"], parse["rows"], parse["bytes"], parse["failures"], parse["retries"]) == (2, 10, 400, 1, 1)
+
+
+def test_summary_reads_every_metric_under_its_lock(monkeypatch):
+    with metrics.timed("fetch", rows=1):
+        pass
+    locked = []
+    for metric in (metrics.stage_seconds, metrics.stage_rows, metrics.stage_bytes, metrics.stage_failures,
+                   metrics.stage_retries):
+        monkeypatch.setattr(metric, "values", LockedValues(metric, locked))
+
+    assert metrics.summary()["fetch"]["rows"] == 1
+    assert all(locked)
+
+
+class LockedValues(dict):
+    """A metric's values that record whether its lock was held on every read."""
+
+    def __init__(self, metric, locked):
+        super().__init__(metric.values)
+        self.metric, self.locked = metric, locked
+
+    def check(self):
+        self.locked.append(self.metric.lock.locked())
+
+    def __iter__(self):
+        self.check()
+        return super().__iter__()
+
+    def items(self):
+        self.check()
+        return super().items()
+
+    def get(self, *args):
+        self.check()
+        return super().get(*args)
@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+
+import pytest
+import utilities.db as db
+import utilities.rankings as rankings
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rowcount = 0
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        if self.database.fail:
+            raise RuntimeError("connection lost")
+        self.database.statements.append((sql, params))
+        self.rows = self.database.results.pop(0) if sql in (rankings.FOLD_SQL, rankings.RETRACT_SQL) else []
+        self.rowcount = len(params[0]) if sql == rankings.RANK_SQL else 0
+
+    def fetchall(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.statements = []
+        self.results = []
+        self.connections = 0
+        self.fail = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def executed(self):
+        return [sql for sql, _ in self.statements]
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+
+    @contextmanager
+    def get_connection():
+        database.connections += 1
+        yield database
+
+    monkeypatch.setattr(db, "get_connection", get_connection)
+    return database
+
+
+def test_refresh_ranks_only_the_pairs_the_fold_touched(database):
+    database.results = [[("M1", "R1"), ("M2", "R2"), ("M1", "R1")]]
+    assert rankings.refresh([7, 8]) == 2
+    assert database.connections == 1
+    assert database.statements == [(rankings.FOLD_SQL, ([7, 8],)),
+                                   (rankings.RANK_SQL, (["M1", "M2"], ["R1", "R2"]))]
+
+
+def test_refresh_of_folded_datasets_ranks_nothing(database):
+    database.results = [[]]
+    assert rankings.refresh([7]) == 0
+    assert database.executed() == [rankings.FOLD_SQL]
+
+
+def test_refresh_without_datasets_does_not_connect(database):
+    assert rankings.refresh([]) == 0
+    assert database.connections == 0
+
+
+def test_refresh_logs_failures(database):
+    database.fail = True
+    assert rankings.refresh([7]) == 0
+
+
+def test_retract_rebuilds_the_pairs_of_the_datasets_taken_out(database):
+    database.results = [[("M1", "R1")]]
+    assert rankings.retract([7]) == 1
+    assert database.connections == 1
+    executed = database.executed()
+    assert executed[0] == rankings.RETRACT_SQL
+    assert executed[1].strip().startswith("DELETE FROM hospital_rankings")
+    assert executed[2:] == [rankings.REBUILD_SQL, rankings.RANK_SQL]
+    assert all(params == (["M1"], ["R1"]) for _, params in database.statements[1:])
+
+
+def test_retract_of_unranked_datasets_rebuilds_nothing(database):
+    database.results = [[]]
+    assert rankings.retract([7]) == 0
+    assert database.executed() == [rankings.RETRACT_SQL]
@@ -0,0 +1,42 @@
+import json
+import time
+
+import pytest
+import sampling_profiler as profiling
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    monkeypatch.setitem(profiling._settings, "directory", str(tmp_path))
+    monkeypatch.setitem(profiling._settings, "interval", 0.001)
+    return tmp_path
+
+
+def test_regions_ending_in_the_same_second_keep_their_own_files(directory, monkeypatch):
+    monkeypatch.setattr(profiling.time, "strftime", lambda fmt: "20260101T000000")
+    for _ in range(3):
+        with profiling.profile("page", page="Home"):
+            time.sleep(0.01)
+
+    assert len(list(directory.glob("page_page-Home_*.collapsed"))) == 3
+    assert len(list(directory.glob("page_page-Home_*.json"))) == 3
+
+
+def test_profile_records_the_region_parameters(directory):
+    @profiling.profiled(params=lambda rows: {"rows": rows})
+    def work(rows):
+        time.sleep(0.05)
+        return rows
+
+    assert work(5) == 5
+    [sidecar] = directory.glob("work_rows-5_*.json")
+    summary = json.loads(sidecar.read_text())
+    assert summary["params"] == {"rows": 5}
+    assert summary["samples"] > 0
+
+
+def test_disabled_profiling_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setitem(profiling._settings, "directory", "")
+    with profiling.profile("page"):
+        pass
+    assert list(tmp_path.iterdir()) == []
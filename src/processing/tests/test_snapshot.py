@@ -0,0 +1,150 @@
+import datetime
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import utilities.db as db
+import utilities.lake as lake
+import utilities.snapshot as snapshot
+
+Column = namedtuple("Column", "name type_code")
+# reportingunitcode VARCHAR, robust_z FLOAT, national_rank INT, detected_at TIMESTAMP
+COLUMNS = [Column("reportingunitcode", 1043), Column("robust_z", 701), Column("national_rank", 23),
+           Column("detected_at", 1114)]
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(lake, "LAKE_PATH", str(tmp_path / "lake"))
+    monkeypatch.setattr(snapshot, "SNAPSHOT_PATH", str(tmp_path / "snapshots"))
+    metadata = pd.DataFrame({"datasetid": [5, 6], "measurecode": ["M1", "M2"], "reportedmeasurecode": "R1",
+                             "reportingstartdate": ["2020-07-01", "2021-07-01"]})
+    monkeypatch.setattr(lake, "dataset_metadata", lambda ids: metadata[metadata["datasetid"].isin(ids)])
+
+    exported = []
+
+    def export_query(sql, path):
+        exported.append(sql)
+        pq.write_table(pa.table({"datasetid": pa.array([], pa.int32())}), path)
+
+    monkeypatch.setattr(snapshot, "export_query", export_query)
+    return exported
+
+
+class ServerCursor:
+    """Named psycopg2 cursor: columns are described once the first rows are fetched."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.description = None
+
+    def execute(self, sql):
+        pass
+
+    def fetchmany(self, size):
+        self.description = COLUMNS
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def result(monkeypatch):
+    rows = []
+
+    class Connection:
+        def cursor(self, name=None):
+            return ServerCursor(rows)
+
+    @contextmanager
+    def get_connection():
+        yield Connection()
+
+    monkeypatch.setattr(db, "get_connection", get_connection)
+    return rows
+
+
+def test_empty_result_keeps_the_column_types(result, tmp_path):
+    path = str(tmp_path / "anomalies.parquet")
+    snapshot.export_query("SELECT ...", path)
+
+    assert pq.read_schema(path).types == [pa.string(), pa.float64(), pa.int32(), pa.timestamp("us")]
+    # The dashboard's queries bind to those types
+    assert duckdb.sql(f"SELECT abs(robust_z) FROM '{path}' WHERE national_rank <= CAST(5 AS INTEGER)").fetchall() == []
+
+
+def test_chunks_after_an_all_null_first_chunk(result, tmp_path):
+    result.extend([(None, None, None, None),
+                   ("H1", 4.2, 1, datetime.datetime(2024, 7, 1, 12, 30))])
+    path = str(tmp_path / "anomalies.parquet")
+    snapshot.export_query("SELECT ...", path, chunk_rows=1)
+
+    table = pq.read_table(path)
+    assert table.schema.types == [pa.string(), pa.float64(), pa.int32(), pa.timestamp("us")]
+    assert table.to_pylist()[1] == {"reportingunitcode": "H1", "robust_z": 4.2, "national_rank": 1,
+                                    "detected_at": datetime.datetime(2024, 7, 1, 12, 30)}
+
+
+def items(dataset_id, codes):
+    return pd.DataFrame({"datasetid": dataset_id, "reportingunitcode": codes, "value": 1.0, "caveats": None})
+
+
+def info_files():
+    version = snapshot.current_version()
+    return sorted(os.listdir(os.path.join(snapshot.SNAPSHOT_PATH, version, "info")))
+
+
+def test_missing_from_lake_lists_uncovered_datasets():
+    manifest = {"partitions": {"p": {"files": {"a": {"datasetids": [1, 2]}, "b": {"datasetids": [4]}}}}}
+
+    assert snapshot.missing_from_lake(manifest, {1, 2, 3, 4, 5}) == [3, 5]
+    assert snapshot.missing_from_lake(manifest, {1, 4}) == []
+
+
+def test_snapshot_links_the_lake_when_it_covers_every_stored_dataset(paths, monkeypatch):
+    lake.export_batch(pd.concat([items(5, ["H1", "H2"]), items(6, ["H1"])]))
+    monkeypatch.setattr(snapshot, "stored_dataset_ids", lambda: {5, 6})
+
+    snapshot.publish_snapshot()
+
+    assert snapshot.INFO_SQL not in paths
+    assert info_files() == ["000000.parquet", "000001.parquet"]
+
+
+def test_snapshot_reads_info_from_postgres_when_the_lake_is_incomplete(paths, monkeypatch):
+    lake.export_batch(items(5, ["H1", "H2"]))
+    monkeypatch.setattr(snapshot, "stored_dataset_ids", lambda: {5, 6})
+
+    snapshot.publish_snapshot()
+
+    assert snapshot.INFO_SQL in paths
+    assert info_files() == ["000000.parquet"]
+
+
+def test_publishes_within_one_second_get_their_own_version(paths, monkeypatch):
+    monkeypatch.setattr(snapshot, "stored_dataset_ids", set)
+    first, second = snapshot.publish_snapshot(), snapshot.publish_snapshot()
+
+    assert first != second and snapshot.current_version() == second
+    assert os.path.isdir(os.path.join(snapshot.SNAPSHOT_PATH, first))
+
+
+def test_an_existing_version_is_never_overwritten(paths, monkeypatch):
+    monkeypatch.setattr(snapshot, "new_version", lambda: "20260101T000000.000000")
+    snapshot.publish_snapshot()
+    paths.clear()
+
+    with pytest.raises(FileExistsError):
+        snapshot.publish_snapshot()
+    assert paths == []
+    assert snapshot.current_version() == "20260101T000000.000000"
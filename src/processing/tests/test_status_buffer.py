@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+
+import pytest
+import utilities.db as db
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        if self.database.fail:
+            raise RuntimeError("connection lost")
+        if sql.startswith("UPDATE datasets"):
+            self.database.updates.append(list(params[0]))
+            self.rowcount = len(params[0])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.updates = []
+        self.fail = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+
+    @contextmanager
+    def get_connection():
+        yield database
+
+    monkeypatch.setattr(db, "get_connection", get_connection)
+    return database
+
+
+def test_writes_once_flush_size_ids_are_buffered(database):
+    buffer = db.StatusBuffer(flush_size=3, flush_seconds=60)
+    assert buffer.add([1, 2]) == 0
+    assert database.updates == []
+
+    assert buffer.add([3]) == 3
+    assert database.updates == [[1, 2, 3]]
+
+
+def test_writes_once_the_oldest_id_has_waited(database, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(db.time, "monotonic", lambda: now[0])
+    buffer = db.StatusBuffer(flush_size=100, flush_seconds=30)
+    buffer.add([1])
+    now[0] += 29
+    buffer.add([2])
+    assert database.updates == []
+
+    now[0] += 1
+    buffer.add([3])
+    assert database.updates == [[1, 2, 3]]
+
+
+def test_empty_adds_never_write(database):
+    buffer = db.StatusBuffer(flush_size=1, flush_seconds=0)
+    assert buffer.add([]) == 0
+    assert buffer.flush() == 0
+    assert database.updates == []
+
+
+def test_failed_write_keeps_ids_for_the_next_flush(database):
+    buffer = db.StatusBuffer(flush_size=2, flush_seconds=60)
+    database.fail = True
+    assert buffer.add([1, 2]) == 0
+
+    database.fail = False
+    assert buffer.add([3]) == 3
+    assert database.updates == [[1, 2, 3]]
@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+
+import pytest
+import utilities.db as db
+import utilities.tables as tables
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, sql, params=None):
+        self.statements.append(" ".join(sql.split()))
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    connections = []
+
+    @contextmanager
+    def get_connection():
+        connections.append(FakeConnection())
+        yield connections[-1]
+
+    monkeypatch.setattr(db, "get_connection", get_connection)
+    monkeypatch.setattr(tables, "INFO_LAYOUT", "partitioned")
+    monkeypatch.setattr(tables, "INFO_PARTITION_SIZE", 1000)
+    return connections
+
+
+def test_partitions_are_created_quietly_in_one_transaction(connections, capsys):
+    tables.ensure_info_partitions(2500)
+
+    [connection] = connections
+    assert connection.statements == [
+        f"CREATE TABLE IF NOT EXISTS info_compact_{lower}_{lower + 1000} "
+        f"PARTITION OF info_compact FOR VALUES FROM ({lower}) TO ({lower + 1000});"
+        for lower in (0, 1000, 2000)]
+    assert capsys.readouterr().out == ""
+
+
+def test_legacy_layout_has_no_partitions(connections, monkeypatch):
+    monkeypatch.setattr(tables, "INFO_LAYOUT", "legacy")
+    tables.ensure_info_partitions(2500)
+    assert connections == []
@@ -0,0 +1,102 @@
+"""Picks Spark JDBC settings for the current cluster (see utilities/jdbc.py).
+
+Writes --rows synthetic info rows into a scratch table with every candidate
+number of write partitions and batch size, reads them back with every
+candidate number of read partitions, and saves the fastest settings to
+JDBC_TUNING_FILE, where the ETL picks them up on its next start.
+
+Usage: python3 tune_jdbc.py [--rows 500000] [--repeat 2]
+"""
+import argparse
+import json
+import time
+import utilities.db as db
+import utilities.jdbc as jdbc
+from setup import spark
+
+SCRATCH_TABLE = "jdbc_tune_scratch"
+
+parser = argparse.ArgumentParser(description="Tune the Spark JDBC settings of the ETL")
+parser.add_argument("--rows", type=int, default=500000, help="rows written and read per trial")
+parser.add_argument("--repeat", type=int, default=2, help="runs per candidate; the fastest counts")
+parser.add_argument("--batch-sizes", default="1000,10000,50000")
+parser.add_argument("--output", default=jdbc.TUNING_FILE)
+args = parser.parse_args()
+
+cores = spark.sparkContext.defaultParallelism
+candidates = sorted({1, 2} | {2 ** i for i in range(1, 8) if 2 ** i <= 2 * cores} | {cores})
+batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+
+def execute(sql):
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(sql)
+
+
+def timed(run):
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+# Shaped like info, primary key included, so index maintenance is part of the cost
+execute(f"""CREATE TABLE IF NOT EXISTS {SCRATCH_TABLE} (
+    datasetid INT, reportingunitcode VARCHAR, value FLOAT, caveats TEXT, id VARCHAR PRIMARY KEY);""")
+jdbc.PARTITION_KEYS[SCRATCH_TABLE] = "datasetid"
+frame = spark.range(args.rows).selectExpr(
+    "CAST(id % 2000 AS INT) AS datasetid",
+    "concat('H', CAST(id % 900 AS STRING)) AS reportingunitcode",
+    "rand(0) * 100 AS value",
+    "CAST(NULL AS STRING) AS caveats",
+    "CAST(id AS STRING) AS id").persist()
+frame.count()
+
+trials = []
+
+
+def write_trial(options):
+    def run():
+        execute(f"TRUNCATE {SCRATCH_TABLE};")
+        jdbc.write(frame, SCRATCH_TABLE, options)
+    seconds = timed(run)
+    trials.append({"operation": "write", **options, "seconds": round(seconds, 3),
+                   "rows_per_sec": round(args.rows / seconds)})
+    print(f"write  partitions {options['write_partitions']:>3}  batch {options['batch_size']:>6}  "
+          f"rewrite {options['rewrite_batched_inserts']!s:5}  {seconds:7.2f}s  {args.rows / seconds:>10,.0f} rows/s")
+    return seconds
+
+
+try:
+    best = dict(jdbc.settings)
+    fastest = None
+    for partitions in candidates:
+        for batch_size in batch_sizes:
+            options = {**best, "write_partitions": partitions, "batch_size": batch_size, "rewrite_batched_inserts": True}
+            seconds = write_trial(options)
+            if fastest is None or seconds < fastest:
+                fastest, best = seconds, options
+    # Baseline without batched-insert rewriting, for the record
+    write_trial({**best, "rewrite_batched_inserts": False})
+
+    fastest = None
+    for partitions in candidates:
+        options = {**best, "read_partitions": partitions}
+        seconds = timed(lambda: jdbc.reader(spark, SCRATCH_TABLE, options=options).selectExpr("sum(value)").collect())
+        trials.append({"operation": "read", **options, "seconds": round(seconds, 3),
+                       "rows_per_sec": round(args.rows / seconds)})
+        print(f"read   partitions {partitions:>3}  {seconds:7.2f}s  {args.rows / seconds:>10,.0f} rows/s")
+        if fastest is None or seconds < fastest:
+            fastest, best = seconds, options
+finally:
+    execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE};")
+    frame.unpersist()
+
+with open(args.output, "w") as f:
+    json.dump({"settings": best, "cores": cores, "rows": args.rows, "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "trials": trials}, f, indent=2)
+print(f"Settings {best} written to {args.output}")
+db.close_pool()
@@ -0,0 +1,124 @@
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+import utilities.db as db
+
+# Set ANOMALY_DETECTION=off to skip the stage
+ENABLED = os.environ.get("ANOMALY_DETECTION", "on") != "off"
+# Previous periods the baseline of a point is computed from
+WINDOW = int(os.environ.get("ANOMALY_WINDOW", "8"))
+MIN_PERIODS = int(os.environ.get("ANOMALY_MIN_PERIODS", "4"))
+# |robust z| from which a point is flagged
+Z_THRESHOLD = float(os.environ.get("ANOMALY_Z_THRESHOLD", "3.5"))
+# Relative period-over-period change from which a point is flagged (1.0 = 100%)
+CHANGE_THRESHOLD = float(os.environ.get("ANOMALY_CHANGE_THRESHOLD", "1.0"))
+
+# Smallest spread, relative to the baseline, a robust z is computed against;
+# keeps short, nearly flat windows from turning noise into outliers
+SPREAD_FLOOR = float(os.environ.get("ANOMALY_SPREAD_FLOOR", "0.05"))
+
+# A series is one measure of one reporting unit over time
+SERIES_KEYS = ['reportingunitcode', 'measurecode', 'reportedmeasurecode']
+# IQR of a normal distribution in standard deviations
+IQR_TO_SIGMA = 1.349
+
+# Whole history of every series touched by the batch
+SERIES_SQL = """
+    WITH batch AS (
+        SELECT DISTINCT info.reportingunitcode, ds.measurecode, ds.reportedmeasurecode
+        FROM info JOIN datasets ds ON ds.datasetid = info.datasetid
+        WHERE info.datasetid = ANY(%s)
+    )
+    SELECT info.reportingunitcode, ds.measurecode, ds.reportedmeasurecode,
+           ds.reportingstartdate, info.datasetid, info.value
+    FROM info
+    JOIN datasets ds ON ds.datasetid = info.datasetid
+    JOIN batch b ON b.reportingunitcode = info.reportingunitcode
+                AND b.measurecode = ds.measurecode
+                AND b.reportedmeasurecode = ds.reportedmeasurecode
+    WHERE info.value IS NOT NULL AND ds.withdrawn IS NOT TRUE;
+"""
+
+ANOMALY_COLUMNS = ['datasetid', 'reportingunitcode', 'measurecode', 'reportedmeasurecode', 'reportingstartdate',
+                   'value', 'baseline', 'robust_z', 'delta', 'pct_change', 'reason']
+
+
+def load_series(dataset_ids):
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(SERIES_SQL, (list(dataset_ids),))
+        rows = cursor.fetchall()
+    return pd.DataFrame(rows, columns=SERIES_KEYS + ['reportingstartdate', 'datasetid', 'value'])
+
+
+def score(series, window=WINDOW, min_periods=MIN_PERIODS):
+    """Adds baseline, robust_z, delta and pct_change to every point, all series at once.
+
+    The baseline of a point is the rolling median of the window periods before
+    it and its spread the rolling IQR (floored at SPREAD_FLOOR of the baseline),
+    so a point never masks itself. Every statistic is a grouped rolling or shift
+    operation over the whole frame.
+    """
+    df = series.sort_values(SERIES_KEYS + ['reportingstartdate', 'datasetid']).reset_index(drop=True)
+    df['value'] = df['value'].astype(float)
+    grouped = df.groupby(SERIES_KEYS, sort=False, dropna=False)['value']
+
+    rolling = grouped.rolling(window, min_periods=min_periods, closed='left')
+    levels = list(range(len(SERIES_KEYS)))
+    df['baseline'] = rolling.median().droplevel(levels)
+    spread = (rolling.quantile(0.75) - rolling.quantile(0.25)).droplevel(levels) / IQR_TO_SIGMA
+    spread = np.maximum(spread, df['baseline'].abs() * SPREAD_FLOOR)
+    df['robust_z'] = (df['value'] - df['baseline']) / spread.replace(0, np.nan)
+
+    previous = grouped.shift(1)
+    df['delta'] = df['value'] - previous
+    df['pct_change'] = df['delta'] / previous.abs().replace(0, np.nan)
+    return df
+
+
+def flag(scored, dataset_ids=None, z_threshold=Z_THRESHOLD, change_threshold=CHANGE_THRESHOLD):
+    """Points of the given datasets whose robust z or relative change crosses its threshold."""
+    if dataset_ids is not None:
+        scored = scored[scored['datasetid'].isin(dataset_ids)]
+    outlier = scored['robust_z'].abs() >= z_threshold
+    # Jumps only count once the series has a baseline
+    jump = (scored['pct_change'].abs() >= change_threshold) & scored['baseline'].notna()
+    reason = np.select([outlier & jump, outlier, jump], ["outlier,jump", "outlier", "jump"], default="")
+    return scored.assign(reason=reason)[outlier | jump][ANOMALY_COLUMNS]
+
+
+def store(flagged, dataset_ids):
+    """Replaces the anomalies of the batch's datasets in one transaction."""
+    rows = [tuple(None if pd.isna(v) else v.item() if isinstance(v, np.generic) else v for v in row)
+            for row in flagged.itertuples(index=False)]
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM anomalies WHERE datasetid = ANY(%s);", (list(dataset_ids),))
+        if rows:
+            execute_values(cursor, f"""
+                INSERT INTO anomalies ({', '.join(ANOMALY_COLUMNS)}) VALUES %s
+                ON CONFLICT (datasetid, reportingunitcode) DO UPDATE SET
+                    {', '.join(f'{c} = EXCLUDED.{c}' for c in ANOMALY_COLUMNS[2:])},
+                    detected_at = now();""", rows)
+
+
+def detect_batch(dataset_ids):
+    """Scores every series touched by a committed batch and stores its flagged points.
+
+    Failures are logged, never raised: the batch is already stored and must be acknowledged.
+    """
+    dataset_ids = [int(i) for i in dataset_ids]
+    if not ENABLED or not dataset_ids:
+        return 0
+    start = time.perf_counter()
+    try:
+        series = load_series(dataset_ids)
+        flagged = flag(score(series), dataset_ids) if not series.empty else pd.DataFrame(columns=ANOMALY_COLUMNS)
+        store(flagged, dataset_ids)
+    except Exception as e:
+        logging.error(f"Anomaly detection failed for datasets {dataset_ids[:5]}...: {e}")
+        return 0
+    logging.info(f"Flagged {len(flagged)} anomalies in {len(series)} points "
+                 f"({series.groupby(SERIES_KEYS, dropna=False).ngroups} series) in {time.perf_counter() - start:.2f}s")
+    return len(flagged)
@@ -0,0 +1,157 @@
+"""Adaptive batch planning for the fetch stage.
+
+AIHW datasets range from a handful of data items to hundreds of thousands, so
+a fixed number of datasets per batch either pays the per-batch overhead
+(broker round trip, Spark jobs) for a few kilobytes or turns one batch into
+minutes of work. BatchPlanner instead fills each batch up to a target payload
+in bytes, using the sizes observed for the same datasets on earlier runs
+(datasets.payload_bytes), else those of the same measure, else the run's
+average. After each batch the target moves a step up or down depending on
+whether the measured throughput improved, within hard caps.
+"""
+import logging
+import os
+from collections import deque
+from psycopg2.extras import execute_values
+import utilities.db as db
+import utilities.metrics as metrics
+
+# Fixed number of datasets per batch; 0 sizes batches adaptively
+FIXED_BATCH_SIZE = int(os.environ.get("ETL_BATCH_SIZE", "0"))
+# Payload bytes per batch the planner starts from, and the lower bound it tunes down to
+TARGET_BYTES = int(os.environ.get("ETL_BATCH_TARGET_BYTES", str(8 * 2**20)))
+MIN_TARGET_BYTES = int(os.environ.get("ETL_BATCH_MIN_BYTES", str(512 * 2**10)))
+# Hard cap on the estimated payload of a batch (messages themselves are cut at ETL_CHUNK_BYTES)
+MAX_BYTES = int(os.environ.get("ETL_BATCH_MAX_BYTES", str(64 * 2**20)))
+# Hard caps on the data items and datasets of a batch
+MAX_ROWS = int(os.environ.get("ETL_BATCH_MAX_ROWS", "500000"))
+MAX_IDS = int(os.environ.get("ETL_BATCH_MAX_IDS", "500"))
+# Batches slower than this shrink the target whatever their throughput
+MAX_BATCH_SECONDS = float(os.environ.get("ETL_BATCH_MAX_SECONDS", "300"))
+# Size assumed for a dataset when nothing comparable has been fetched yet
+DEFAULT_DATASET_BYTES = 64 * 2**10
+DEFAULT_ROW_BYTES = 80
+# Factor the target moves by after each batch
+STEP = 1.25
+
+GROUP_SIZES_SQL = """
+    SELECT reportedmeasurecode, measurecode, AVG(payload_bytes), AVG(payload_rows)
+    FROM datasets
+    WHERE payload_bytes IS NOT NULL
+    GROUP BY reportedmeasurecode, measurecode;
+"""
+
+
+class BatchPlanner:
+    """Splits pending DataSetIds into batches sized by estimated payload.
+
+    sizes maps DataSetIds to their last observed (bytes, rows), groups maps
+    them to their (reportedmeasurecode, measurecode) and group_sizes those
+    pairs to an average (bytes, rows). Iterating yields the batches; call
+    observe() after each one so the estimates and the target follow what was
+    actually fetched.
+    """
+
+    def __init__(self, dataset_ids, sizes=None, groups=None, group_sizes=None, target_bytes=TARGET_BYTES,
+                 fixed_size=FIXED_BATCH_SIZE):
+        self.pending = deque(dataset_ids)
+        self.sizes = dict(sizes or {})
+        self.groups = groups or {}
+        self.group_sizes = dict(group_sizes or {})
+        self.target_bytes = min(max(target_bytes, MIN_TARGET_BYTES), MAX_BYTES)
+        self.fixed_size = fixed_size
+        self.direction = 1
+        self.last_throughput = None
+        self.observed = [0, 0, 0]  # datasets, bytes, rows fetched this run
+        metrics.batch_target_bytes.set(self.target_bytes)
+
+    def estimate(self, dataset_id):
+        """Expected (bytes, rows) of one dataset."""
+        if dataset_id in self.sizes:
+            return self.sizes[dataset_id]
+        group = self.groups.get(dataset_id)
+        if group in self.group_sizes:
+            return self.group_sizes[group]
+        count, nbytes, rows = self.observed
+        if count:
+            return nbytes / count, rows / count
+        return DEFAULT_DATASET_BYTES, DEFAULT_DATASET_BYTES / DEFAULT_ROW_BYTES
+
+    def next_batch(self):
+        if self.fixed_size:
+            return [self.pending.popleft() for _ in range(min(self.fixed_size, len(self.pending)))]
+        batch, nbytes, rows = [], 0, 0
+        limit = min(self.target_bytes, MAX_BYTES)
+        while self.pending and len(batch) < MAX_IDS:
+            dataset_bytes, dataset_rows = self.estimate(self.pending[0])
+            if batch and (nbytes + dataset_bytes > limit or rows + dataset_rows > MAX_ROWS):
+                break
+            batch.append(self.pending.popleft())
+            nbytes += dataset_bytes
+            rows += dataset_rows
+        if nbytes > MAX_BYTES:
+            logging.warning(f"Dataset {batch[0]} alone is estimated at {nbytes / 2**20:.0f} MiB, over the batch cap")
+        return batch
+
+    def __iter__(self):
+        while self.pending:
+            yield self.next_batch()
+
+    def observe(self, sizes, seconds):
+        """Records the (bytes, rows) fetched per dataset in a batch and how long the batch took."""
+        for dataset_id, size in sizes.items():
+            self.sizes[dataset_id] = size
+            group = self.groups.get(dataset_id)
+            if group is not None:
+                previous = self.group_sizes.get(group, size)
+                self.group_sizes[group] = ((previous[0] + size[0]) / 2, (previous[1] + size[1]) / 2)
+            self.observed[0] += 1
+            self.observed[1] += size[0]
+            self.observed[2] += size[1]
+
+        nbytes = sum(size[0] for size in sizes.values())
+        if self.fixed_size or not nbytes or seconds <= 0:
+            return
+        throughput = nbytes / seconds
+        if seconds > MAX_BATCH_SECONDS:
+            self.direction = -1
+        elif self.last_throughput is not None and throughput < self.last_throughput:
+            self.direction = -self.direction
+        self.last_throughput = throughput
+        self.target_bytes = min(max(self.target_bytes * STEP ** self.direction, MIN_TARGET_BYTES), MAX_BYTES)
+        metrics.batch_target_bytes.set(self.target_bytes)
+
+
+def planner_for(dataset_ids, **kwargs):
+    """A BatchPlanner seeded with the payload sizes stored by earlier runs."""
+    sizes, groups, group_sizes = {}, {}, {}
+    try:
+        with db.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT datasetid, reportedmeasurecode, measurecode, payload_bytes, payload_rows
+                FROM datasets WHERE datasetid = ANY(%s);""", (list(dataset_ids),))
+            for dataset_id, reported, measure, nbytes, rows in cursor.fetchall():
+                groups[dataset_id] = (reported, measure)
+                if nbytes is not None:
+                    sizes[dataset_id] = (nbytes, rows or 0)
+            cursor.execute(GROUP_SIZES_SQL)
+            group_sizes = {(reported, measure): (float(nbytes), float(rows or 0))
+                           for reported, measure, nbytes, rows in cursor.fetchall()}
+    except Exception as e:
+        logging.error(f"Failed to load payload sizes, planning from defaults: {e}")
+    return BatchPlanner(dataset_ids, sizes, groups, group_sizes, **kwargs)
+
+
+def record_sizes(sizes):
+    """Stores the (bytes, rows) fetched per dataset, for the next run's planner."""
+    if not sizes:
+        return
+    try:
+        with db.get_connection() as conn, conn.cursor() as cursor:
+            execute_values(cursor, """
+                UPDATE datasets d SET payload_bytes = v.payload_bytes, payload_rows = v.payload_rows
+                FROM (VALUES %s) AS v(datasetid, payload_bytes, payload_rows)
+                WHERE d.datasetid = v.datasetid;""",
+                [(int(dataset_id), int(nbytes), int(rows)) for dataset_id, (nbytes, rows) in sizes.items()])
+    except Exception as e:
+        logging.error(f"Failed to record payload sizes: {e}")
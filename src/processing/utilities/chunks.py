@@ -0,0 +1,136 @@
+"""Completion tracking for the chunks values.get_values publishes or lands.
+
+A dataset may span several chunks, delivered out of order by retries or by
+the landing-zone stream. Reassembly reports it complete once all its chunks
+are stored. DoneChunks does the same for the landing zone, where the chunk
+headers live in JSON sidecars so that a restarted stream can pick up where
+the previous one stopped.
+"""
+import glob
+import json
+import os
+import threading
+
+
+class Reassembly:
+    """Tracks the stored chunks of each batch published by get_values.
+
+    A dataset may span several chunks, which retries can deliver out of order;
+    it is reported complete only once every chunk from its first to its last
+    has been stored. prune() drops the chunks of the datasets reported
+    complete, so a long run only holds the chunks still needed.
+    """
+
+    def __init__(self):
+        self.stored = {}    # batch -> {stored sequence number: dataset ids with rows in it}
+        self.waiting = {}   # batch -> {dataset id: (first seq, last seq)}
+        self.complete = {}  # batch -> dataset ids reported complete whose chunks are still held
+        self.lock = threading.Lock()
+
+    def chunk_stored(self, headers):
+        """Records a stored chunk; returns the datasets it completes."""
+        batch, seq = headers["batch"], int(headers["seq"])
+        completes = headers.get("complete") or {}
+        with self.lock:
+            stored = self.stored.setdefault(batch, {})
+            stored[seq] = {int(i) for i in headers.get("dataset_ids") or []} | {int(i) for i in completes}
+            waiting = self.waiting.setdefault(batch, {})
+            for dataset_id, first in completes.items():
+                waiting[int(dataset_id)] = (int(first), seq)
+            ready = [dataset_id for dataset_id, (first, last) in waiting.items()
+                     if all(s in stored for s in range(first, last + 1))]
+            for dataset_id in ready:
+                del waiting[dataset_id]
+            self.complete.setdefault(batch, set()).update(ready)
+            return ready
+
+    def prune(self):
+        """Drops the chunks whose datasets are all complete; call once those are marked stored.
+
+        A batch is forgotten once none of its chunks are left and no dataset
+        waits on it. Returns the number of chunks dropped.
+        """
+        dropped = 0
+        with self.lock:
+            for batch in list(self.stored):
+                stored, complete = self.stored[batch], self.complete.get(batch, set())
+                for seq, datasets in list(stored.items()):
+                    if datasets <= complete:
+                        del stored[seq]
+                        dropped += 1
+                if stored or self.waiting.get(batch):
+                    # Complete datasets with no chunk left need no tracking
+                    self.complete[batch] = complete & set().union(*stored.values())
+                else:
+                    del self.stored[batch]
+                    self.waiting.pop(batch, None)
+                    self.complete.pop(batch, None)
+        return dropped
+
+    def forget(self, batch):
+        with self.lock:
+            self.stored.pop(batch, None)
+            self.waiting.pop(batch, None)
+            self.complete.pop(batch, None)
+
+
+class DoneChunks:
+    """Completion state of the landed batches, backed by the sidecars in chunks/done.
+
+    The first time a process sees a batch (e.g. after a restart) its state is
+    rebuilt from the batch's done sidecars; from then on each ingested chunk's
+    sidecar is read once. prune() removes the sidecars of chunks whose datasets
+    are all complete, and forgets a batch once none of its sidecars are left.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.reassembly = Reassembly()
+        self.chunks = {}    # batch -> {chunk name: headers} of the done sidecars kept
+        self.complete = {}  # batch -> DataSetIds completed
+        self.lock = threading.Lock()
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.json")
+
+    def read(self, batch, name):
+        with open(self.path(name)) as f:
+            headers = json.load(f)
+        self.chunks[batch][name] = headers
+        ready = self.reassembly.chunk_stored(headers)
+        self.complete[batch].update(ready)
+        return ready
+
+    def ingested(self, names):
+        """Records chunks whose sidecars are in done; returns the datasets they complete."""
+        completed = []
+        with self.lock:
+            for name in names:
+                batch = name.rsplit("-", 1)[0]
+                if batch not in self.chunks:
+                    self.chunks[batch], self.complete[batch] = {}, set()
+                    for path in sorted(glob.glob(self.path(f"{glob.escape(batch)}-*"))):
+                        completed.extend(self.read(batch, os.path.splitext(os.path.basename(path))[0]))
+                elif name not in self.chunks[batch] and os.path.exists(self.path(name)):
+                    # A replayed chunk whose sidecar was already read or removed completes nothing new
+                    completed.extend(self.read(batch, name))
+        return list(dict.fromkeys(completed))
+
+    def prune(self):
+        """Removes the sidecars no dataset still waits on; call once their datasets are marked stored."""
+        removed = 0
+        with self.lock:
+            for batch in list(self.chunks):
+                for name, headers in list(self.chunks[batch].items()):
+                    datasets = set(headers.get("dataset_ids") or []) | {int(i) for i in headers.get("complete") or {}}
+                    if datasets <= self.complete[batch]:
+                        try:
+                            os.remove(self.path(name))
+                        except FileNotFoundError:
+                            pass
+                        del self.chunks[batch][name]
+                        removed += 1
+                if not self.chunks[batch]:
+                    del self.chunks[batch], self.complete[batch]
+                    self.reassembly.forget(batch)
+        return removed
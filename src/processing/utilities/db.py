@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from psycopg2.pool import ThreadedConnectionPool
+import utilities.metrics as metrics
+
+# Connection settings, overridable through the environment (see docker-compose.yml)
+POSTGRES_SETTINGS = {
+    "host": os.environ.get("POSTGRES_HOST", "postgres"),
+    "port": int(os.environ.get("POSTGRES_PORT", "5432")),
+    "dbname": os.environ.get("POSTGRES_DB", "mydatabase"),
+    "user": os.environ.get("POSTGRES_USER", "myuser"),
+    "password": os.environ.get("POSTGRES_PASSWORD", "mypassword")
+}
+
+POOL_MIN = int(os.environ.get("POSTGRES_POOL_MIN", "1"))
+POOL_MAX = int(os.environ.get("POSTGRES_POOL_MAX", "10"))
+
+# Number of dataset ids buffered before the stored flags are written
+STATUS_FLUSH_SIZE = int(os.environ.get("ETL_STATUS_FLUSH_SIZE", "200"))
+# Seconds the oldest buffered id may wait before the stored flags are written anyway
+STATUS_FLUSH_SECONDS = float(os.environ.get("ETL_STATUS_FLUSH_SECONDS", "30"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(POOL_MIN, POOL_MAX, **POSTGRES_SETTINGS)
+    return _pool
+
+
+@contextmanager
+def get_connection():
+    """Provide a transactional scope around a pooled psycopg2 connection."""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+
+def stream_query(sql, params=None, itersize=10000, name="etl_stream"):
+    """Yields the rows of a query through a server-side (named) cursor.
+
+    Only itersize rows are held in memory at a time, whatever the size of the result.
+    """
+    with get_connection() as conn:
+        with conn.cursor(name=name) as cursor:
+            cursor.itersize = itersize
+            cursor.execute(sql, params)
+            for row in cursor:
+                yield row
+
+
+def bump_data_version(cursor):
+    """Bumps the data version inside the caller's transaction, so it changes exactly when the data does."""
+    cursor.execute("UPDATE data_version SET version = version + 1, updated_at = now() WHERE id = 1;")
+
+
+def close_pool():
+    """Closes every pooled connection, e.g. at the end of an ETL run."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def jdbc_url():
+    s = POSTGRES_SETTINGS
+    return f"jdbc:postgresql://{s['host']}:{s['port']}/{s['dbname']}"
+
+
+def jdbc_properties():
+    return {
+        "user": POSTGRES_SETTINGS["user"],
+        "password": POSTGRES_SETTINGS["password"],
+        "driver": "org.postgresql.Driver"
+    }
+
+
+class StatusBuffer:
+    """Buffers stored = TRUE updates and writes them in one transaction per flush.
+
+    add() flushes once flush_size ids are buffered or the oldest of them has
+    waited flush_seconds.
+    """
+
+    def __init__(self, flush_size=STATUS_FLUSH_SIZE, flush_seconds=STATUS_FLUSH_SECONDS):
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.pending = []
+        self.oldest = None
+        self.lock = threading.Lock()
+
+    def add(self, dataset_ids):
+        with self.lock:
+            self.pending.extend(dataset_ids)
+            if not self.pending:
+                return 0
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+            if len(self.pending) < self.flush_size and time.monotonic() - self.oldest < self.flush_seconds:
+                return 0
+        return self.flush()
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending, self.oldest = self.pending, [], None
+        if not batch:
+            return 0
+        try:
+            with metrics.timed("status_update"), get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("UPDATE datasets SET stored = TRUE WHERE DataSetId = ANY(%s);", (batch,))
+                    updated = cursor.rowcount
+                    bump_data_version(cursor)
+            metrics.stage_rows.inc(updated, stage="status_update")
+            logging.info(f"Updated {updated} rows successfully.")
+            return updated
+        except Exception as e:
+            # Put the ids back so the next flush retries them
+            with self.lock:
+                self.pending = batch + self.pending
+                self.oldest = time.monotonic()
+            logging.error(f"An error occurred: {e}")
+            return 0
+
+
+status_buffer = StatusBuffer()
@@ -0,0 +1,185 @@
+"""Spark JDBC reads and writes against Postgres, partitioned and tuned.
+
+Reads of tables with an integer key are split into JDBC_READ_PARTITIONS range
+partitions on that key, so every worker core opens its own connection; writes
+are spread over JDBC_WRITE_PARTITIONS partitions and sent in batches of
+JDBC_BATCH_SIZE rows, which the driver rewrites into multi-row INSERTs
+(reWriteBatchedInserts). Settings picked by tune_jdbc.py are read from
+JDBC_TUNING_FILE; environment variables override them.
+
+Jobs run inside job_group() can be reported partition by partition:
+report() logs the duration and row count of every task, taken from the
+Spark UI's REST API, and feeds them to utilities.metrics.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+import requests
+import utilities.db as db
+import utilities.metrics as metrics
+
+# Settings written by tune_jdbc.py
+TUNING_FILE = os.environ.get("JDBC_TUNING_FILE", os.path.join(os.path.dirname(__file__), "..", "jdbc_tuning.json"))
+
+# Defaults sized for the two 2-core workers of docker-compose.yml
+DEFAULTS = {"read_partitions": 4, "write_partitions": 4, "batch_size": 10000, "fetch_size": 10000,
+            "rewrite_batched_inserts": True}
+ENV = {"read_partitions": "JDBC_READ_PARTITIONS", "write_partitions": "JDBC_WRITE_PARTITIONS",
+       "batch_size": "JDBC_BATCH_SIZE", "fetch_size": "JDBC_FETCH_SIZE",
+       "rewrite_batched_inserts": "JDBC_REWRITE_BATCHED_INSERTS"}
+
+# Integer column each table's reads are range-partitioned on; other tables are read in one partition
+PARTITION_KEYS = {"datasets": "datasetid", "info": "datasetid", "info_compact": "datasetid"}
+
+
+def load_settings():
+    settings = dict(DEFAULTS)
+    if os.path.exists(TUNING_FILE):
+        try:
+            with open(TUNING_FILE) as f:
+                settings.update({key: value for key, value in json.load(f).get("settings", {}).items() if key in DEFAULTS})
+        except (OSError, ValueError) as e:
+            logging.error(f"Ignoring JDBC tuning file {TUNING_FILE}: {e}")
+    for key, variable in ENV.items():
+        if variable in os.environ:
+            value = os.environ[variable]
+            settings[key] = value.lower() in ("1", "true", "yes") if key == "rewrite_batched_inserts" else int(value)
+    return settings
+
+
+settings = load_settings()
+
+
+def url(options=None):
+    options = options or settings
+    return f"{db.jdbc_url()}?reWriteBatchedInserts={'true' if options['rewrite_batched_inserts'] else 'false'}"
+
+
+def key_bounds(table, key):
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({key}), MAX({key}) FROM {table};")
+        return cursor.fetchone()
+
+
+def reader(spark, table, bounds=None, options=None):
+    """DataFrame over table, range-partitioned on its key when it has one.
+
+    bounds (lowest, highest key) narrows the partitions to the keys a caller
+    filters on; they are read from the table otherwise. Rows outside the
+    bounds are still read, by the first and last partitions.
+    """
+    options = options or settings
+    properties = db.jdbc_properties()
+    read = spark.read.format("jdbc") \
+        .option("url", url(options)) \
+        .option("dbtable", table) \
+        .option("user", properties["user"]) \
+        .option("password", properties["password"]) \
+        .option("driver", properties["driver"]) \
+        .option("fetchsize", options["fetch_size"])
+
+    key = PARTITION_KEYS.get(table)
+    if key and options["read_partitions"] > 1:
+        lower, upper = bounds or key_bounds(table, key)
+        if lower is not None and upper is not None and upper > lower:
+            read = read \
+                .option("partitionColumn", key) \
+                .option("lowerBound", int(lower)) \
+                .option("upperBound", int(upper) + 1) \
+                .option("numPartitions", min(options["read_partitions"], int(upper) - int(lower) + 1))
+    return read.load()
+
+
+def write(data_frame, table, options=None):
+    """Appends data_frame to table over write_partitions connections."""
+    options = options or settings
+    properties = db.jdbc_properties()
+    partitions = data_frame.rdd.getNumPartitions()
+    if partitions > options["write_partitions"]:
+        data_frame = data_frame.coalesce(options["write_partitions"])
+    elif partitions < options["write_partitions"]:
+        data_frame = data_frame.repartition(options["write_partitions"])
+
+    data_frame.write.format("jdbc") \
+        .option("url", url(options)) \
+        .option("dbtable", table) \
+        .option("user", properties["user"]) \
+        .option("password", properties["password"]) \
+        .option("driver", properties["driver"]) \
+        .option("batchsize", options["batch_size"]) \
+        .option("numPartitions", options["write_partitions"]) \
+        .mode("append") \
+        .save()
+
+
+@contextmanager
+def job_group(spark, description):
+    """Tags the Spark jobs run inside the block so that report() can find their tasks afterwards."""
+    context = spark.sparkContext
+    group = {"id": f"jdbc-{uuid.uuid4().hex[:12]}", "description": description, "seconds": None}
+    start = time.perf_counter()
+    context.setJobGroup(group["id"], description)
+    try:
+        yield group
+    finally:
+        group["seconds"] = time.perf_counter() - start
+        context.setLocalProperty("spark.jobGroup.id", None)
+        context.setLocalProperty("spark.job.description", None)
+
+
+def stage_tasks(spark, group_id):
+    """(stage id, stage name, tasks) of every stage the jobs of a group ran, from the Spark UI REST API.
+
+    A JDBC read or write stage runs one task per partition. Returns [] when
+    the UI is disabled or unreachable.
+    """
+    context = spark.sparkContext
+    if not context.uiWebUrl:
+        return []
+    tracker = context.statusTracker()
+    stages = []
+    try:
+        stage_ids = set()
+        for job_id in tracker.getJobIdsForGroup(group_id):
+            job = tracker.getJobInfo(job_id)
+            if job is not None:
+                stage_ids.update(job.stageIds)
+        for stage_id in sorted(stage_ids):
+            response = requests.get(f"{context.uiWebUrl}/api/v1/applications/{context.applicationId}"
+                                    f"/stages/{stage_id}", params={"details": "true"}, timeout=5)
+            if response.status_code == 404:
+                # Skipped stages (shuffle output reused) have no attempts
+                continue
+            response.raise_for_status()
+            for attempt in response.json():
+                stages.append((stage_id, attempt.get("name", ""), list((attempt.get("tasks") or {}).values())))
+    except Exception as e:
+        logging.debug(f"Per-partition timings unavailable: {e}")
+        return []
+    return stages
+
+
+def report(spark, group, table):
+    """Logs and records the duration and rows of every partition the group's JDBC stages ran.
+
+    Returns {"table", "seconds", "stages": [{"stage", "name", "partitions": [...]}]}.
+    """
+    stages = []
+    for stage_id, name, tasks in stage_tasks(spark, group["id"]):
+        partitions = []
+        for task in sorted(tasks, key=lambda task: task.get("index", 0)):
+            task_metrics = task.get("taskMetrics") or {}
+            rows = (task_metrics.get("outputMetrics") or {}).get("recordsWritten") or \
+                (task_metrics.get("inputMetrics") or {}).get("recordsRead") or 0
+            partitions.append({"partition": task.get("index"), "executor": task.get("executorId"),
+                               "seconds": task.get("duration", 0) / 1000, "rows": rows})
+            metrics.jdbc_partition_seconds.observe(task.get("duration", 0) / 1000, table=table)
+        stages.append({"stage": stage_id, "name": name, "partitions": partitions})
+        if partitions:
+            logging.info(f"JDBC {group['description']} stage {stage_id} ({name.split(' at ')[0]}): "
+                         f"{len(partitions)} partitions, slowest {max(p['seconds'] for p in partitions):.2f}s, "
+                         f"rows {[p['rows'] for p in partitions]}")
+    return {"table": table, "seconds": round(group["seconds"] or 0, 3), "stages": stages}
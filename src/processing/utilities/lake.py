@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import utilities.db as db
+
+# Root of the Parquet data lake; the export is disabled when LAKE_PATH is unset
+LAKE_PATH = os.environ.get("LAKE_PATH", "")
+# Compact a partition once it holds this many files
+LAKE_COMPACT_FILES = int(os.environ.get("LAKE_COMPACT_FILES", "16"))
+
+MANIFEST = "_manifest.json"
+
+LAKE_SCHEMA = pa.schema([
+    ("datasetid", pa.int32()),
+    ("reportingunitcode", pa.string()),
+    ("value", pa.float64()),
+    ("caveats", pa.string()),
+    ("reportedmeasurecode", pa.string()),
+    ("reportingstartdate", pa.date32())
+])
+
+_lock = threading.Lock()
+
+
+def enabled():
+    return bool(LAKE_PATH)
+
+
+def facts_path():
+    return os.path.join(LAKE_PATH, "info")
+
+
+def read_manifest():
+    """Returns the lake manifest.
+
+    partitions maps "measurecode=<code>/year=<yyyy>" to its files, and each file
+    to its row count, DataSetIds and reportingstartdate range, so readers can
+    prune partitions and files without opening them.
+    """
+    path = os.path.join(facts_path(), MANIFEST)
+    if not os.path.exists(path):
+        return {"version": 0, "updated": None, "partitions": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(manifest):
+    """Writes the manifest atomically so readers never see a partial file."""
+    manifest["version"] += 1
+    manifest["updated"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    path = os.path.join(facts_path(), MANIFEST)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def file_entry(table):
+    dates = table.column("reportingstartdate")
+    return {
+        "rows": table.num_rows,
+        "datasetids": sorted(set(table.column("datasetid").to_pylist())),
+        "min_date": str(pc.min(dates).as_py()),
+        "max_date": str(pc.max(dates).as_py())
+    }
+
+
+def remove_datasets(manifest, partition, dataset_ids):
+    """Removes the given DataSetIds from every file of a partition, rewriting files that hold other datasets too."""
+    files = manifest["partitions"].get(partition, {}).get("files", {})
+    directory = os.path.join(facts_path(), partition)
+    for name, entry in list(files.items()):
+        stale = set(entry["datasetids"]) & set(dataset_ids)
+        if not stale:
+            continue
+        path = os.path.join(directory, name)
+        if stale == set(entry["datasetids"]):
+            del files[name]
+            if os.path.exists(path):
+                os.remove(path)
+            continue
+        table = pq.read_table(path, schema=LAKE_SCHEMA)
+        mask = pc.invert(pc.is_in(table.column("datasetid"), value_set=pa.array(list(stale), pa.int32())))
+        table = table.filter(mask)
+        new_name = f"part-{uuid.uuid4().hex}.parquet"
+        pq.write_table(table, os.path.join(directory, new_name))
+        files[new_name] = file_entry(table)
+        del files[name]
+        os.remove(path)
+
+
+def row_keys(datasetids, codes):
+    """One "datasetid|reportingunitcode" string per row, the key rows are replaced on."""
+    return pc.binary_join_element_wise(pc.cast(datasetids, pa.string()), pc.fill_null(codes, ""), "|")
+
+
+def remove_rows(manifest, partition, table):
+    """Removes the rows of a partition that have the same key as a row of table, rewriting the files holding them."""
+    files = manifest["partitions"].get(partition, {}).get("files", {})
+    directory = os.path.join(facts_path(), partition)
+    dataset_ids = set(table.column("datasetid").to_pylist())
+    keys = row_keys(table.column("datasetid"), table.column("reportingunitcode")).unique()
+    for name, entry in list(files.items()):
+        if not set(entry["datasetids"]) & dataset_ids:
+            continue
+        path = os.path.join(directory, name)
+        existing = pq.read_table(path, schema=LAKE_SCHEMA)
+        mask = pc.is_in(row_keys(existing.column("datasetid"), existing.column("reportingunitcode")), value_set=keys)
+        if not pc.any(mask).as_py():
+            continue
+        del files[name]
+        os.remove(path)
+        kept = existing.filter(pc.invert(mask))
+        if kept.num_rows:
+            new_name = f"part-{uuid.uuid4().hex}.parquet"
+            pq.write_table(kept, os.path.join(directory, new_name))
+            files[new_name] = file_entry(kept)
+
+
+def compact(manifest, partition):
+    """Merges all files of a partition into one once it reaches LAKE_COMPACT_FILES files."""
+    files = manifest["partitions"][partition]["files"]
+    if len(files) < LAKE_COMPACT_FILES:
+        return
+    directory = os.path.join(facts_path(), partition)
+    table = pa.concat_tables([pq.read_table(os.path.join(directory, name), schema=LAKE_SCHEMA) for name in files])
+    table = table.sort_by([("reportingstartdate", "ascending"), ("datasetid", "ascending")])
+    new_name = f"part-{uuid.uuid4().hex}.parquet"
+    pq.write_table(table, os.path.join(directory, new_name))
+    for name in list(files):
+        os.remove(os.path.join(directory, name))
+    manifest["partitions"][partition]["files"] = {new_name: file_entry(table)}
+    logging.info(f"Compacted lake partition {partition}")
+
+
+def dataset_metadata(dataset_ids):
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT datasetid, measurecode, reportedmeasurecode, reportingstartdate
+            FROM datasets WHERE datasetid = ANY(%s);""", (list(dataset_ids),))
+        rows = cursor.fetchall()
+    return pd.DataFrame(rows, columns=["datasetid", "measurecode", "reportedmeasurecode", "reportingstartdate"])
+
+
+def export_batch(values):
+    """Writes a committed batch of info rows to the lake.
+
+    values is a pandas DataFrame with datasetid, reportingunitcode, value and
+    caveats. Each dataset goes to the measurecode=/year= partition of its
+    reporting period. Rows replace those already exported with the same
+    datasetid and reportingunitcode and leave the dataset's other rows in
+    place: a dataset stored over several chunks adds up, and a chunk stored
+    twice (a redelivered message, a replayed micro-batch) is counted once.
+    Revised and withdrawn datasets are cleared beforehand by drop_datasets.
+    """
+    if not enabled() or values.empty:
+        return
+
+    meta = dataset_metadata(values["datasetid"].unique().tolist())
+    facts = values.merge(meta, on="datasetid", how="inner")
+    facts["reportingstartdate"] = pd.to_datetime(facts["reportingstartdate"]).dt.date
+    facts["year"] = pd.to_datetime(facts["reportingstartdate"]).dt.year
+    facts["value"] = pd.to_numeric(facts["value"], errors="coerce")
+    facts["caveats"] = facts["caveats"].map(lambda v: None if pd.isna(v) else str(v))
+
+    with _lock:
+        os.makedirs(facts_path(), exist_ok=True)
+        manifest = read_manifest()
+        for (measurecode, year), group in facts.groupby(["measurecode", "year"]):
+            partition = f"measurecode={measurecode}/year={year}"
+            directory = os.path.join(facts_path(), partition)
+            os.makedirs(directory, exist_ok=True)
+            manifest["partitions"].setdefault(partition, {"measurecode": measurecode, "year": int(year), "files": {}})
+
+            table = pa.Table.from_pandas(group[LAKE_SCHEMA.names], schema=LAKE_SCHEMA, preserve_index=False)
+            remove_rows(manifest, partition, table)
+            name = f"part-{uuid.uuid4().hex}.parquet"
+            pq.write_table(table, os.path.join(directory, name))
+            manifest["partitions"][partition]["files"][name] = file_entry(table)
+            compact(manifest, partition)
+        write_manifest(manifest)
+
+
+def drop_datasets(dataset_ids):
+    """Removes withdrawn or revised datasets from every partition of the lake."""
+    if not enabled() or not dataset_ids:
+        return
+    with _lock:
+        if not os.path.exists(os.path.join(facts_path(), MANIFEST)):
+            return
+        manifest = read_manifest()
+        for partition in list(manifest["partitions"]):
+            remove_datasets(manifest, partition, dataset_ids)
+            if not manifest["partitions"][partition]["files"]:
+                del manifest["partitions"][partition]
+        write_manifest(manifest)
@@ -0,0 +1,208 @@
+"""File landing zone: ingestion through Spark Structured Streaming instead of RabbitMQ.
+
+With ETL_INGEST_MODE=landing (or land) the fetchers write every chunk of
+values.get_values to LANDING_PATH/incoming as a CSV file, under a hidden name
+first and renamed once complete, so the stream never reads a partial file.
+The chunk's headers (batch, seq, complete) go to a JSON sidecar in
+chunks/pending beforehand.
+
+start() runs a streaming query over incoming/ with an explicit schema. Every
+ETL_TRIGGER_SECONDS it takes the files landed since the previous micro-batch
+(at most ETL_LANDING_MAX_FILES) and hands them to store_micro_batch(), which
+writes them to info through values.store_values, moves their sidecars to
+chunks/done and marks the datasets whose chunks are all done stored, folding
+them into the rankings. Completion is tracked incrementally by
+chunks.DoneChunks, and done sidecars are removed once no dataset waits on
+them. Chunks holding rows of a dataset whose fetch failed keep theirs: the
+dataset is fetched again in a later batch.
+
+Offsets are checkpointed to LANDING_CHECKPOINT before a micro-batch runs and
+committed after it, so a restarted query resumes with the first uncommitted
+micro-batch and re-reads exactly its files. Replaying one is harmless: rows
+already in info are skipped by the anti-join of insert_into_postgresql, lake
+rows are replaced by key, the sidecar moves and stored flags are idempotent,
+sidecars are only removed once their datasets are flagged stored, and the
+rankings fold each dataset once. Skipping rows rather than updating them is
+intended: a revised dataset has its info rows deleted by
+tools.apply_catalogue_diff before it is fetched again, so a key already in
+info always holds the value being replayed. Ingested files are deleted
+(ETL_LANDING_CLEAN=delete), moved to archive/ (archive) or kept (off).
+"""
+import glob
+import json
+import logging
+import os
+import time
+import uuid
+from pyspark.sql.functions import col, input_file_name
+from pyspark.sql.types import DoubleType, IntegerType, StringType, StructField, StructType
+import utilities.chunks as chunks
+import utilities.metrics as metrics
+import utilities.tools as tools
+import utilities.values as values
+
+# rabbitmq: publish and consume batch by batch; landing: land files and ingest them with
+# the stream in the same process; land: only land them, for a separate ingest_landing.py
+INGEST_MODE = os.environ.get("ETL_INGEST_MODE", "rabbitmq")
+# Landing directory, shared by the driver and the Spark workers
+LANDING_PATH = os.environ.get("LANDING_PATH", "landing")
+# Streaming checkpoint (offsets and commits); keep it with the landing directory
+LANDING_CHECKPOINT = os.environ.get("LANDING_CHECKPOINT", os.path.join(LANDING_PATH, "checkpoint"))
+# Seconds between micro-batches
+TRIGGER_SECONDS = int(os.environ.get("ETL_TRIGGER_SECONDS", "10"))
+# Files per micro-batch; chunks are at most ETL_CHUNK_BYTES each
+MAX_FILES_PER_TRIGGER = int(os.environ.get("ETL_LANDING_MAX_FILES", "64"))
+# What happens to ingested files: delete, archive or off
+CLEAN_SOURCE = os.environ.get("ETL_LANDING_CLEAN", "delete")
+
+CORRUPT_COLUMN = "_corrupt_record"
+
+# Completion state of the batches this process has ingested chunks of
+done_chunks = chunks.DoneChunks(os.path.join(LANDING_PATH, "chunks", "done"))
+
+# Columns of the data-items CSV, in the API's order; the header of every file is checked against it
+DATA_ITEMS_SCHEMA = StructType([
+    StructField("datasetid", IntegerType()),
+    StructField("reportingunitcode", StringType()),
+    StructField("reportingunitname", StringType()),
+    StructField("value", DoubleType()),
+    StructField("caveats", StringType()),
+    StructField(CORRUPT_COLUMN, StringType())
+])
+
+
+def incoming_path():
+    return os.path.join(LANDING_PATH, "incoming")
+
+
+def chunks_path(state):
+    return os.path.join(LANDING_PATH, "chunks", state)
+
+
+def chunk_name(headers):
+    return f"{headers['batch']}-{int(headers['seq']):06d}"
+
+
+def write_atomic(path, data):
+    """Writes data under a hidden temporary name, which Spark's file source skips, then renames it into place."""
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def backlog():
+    """Chunks landed, by this process or another, and not ingested yet."""
+    return len(glob.glob(os.path.join(chunks_path("pending"), "*.json")))
+
+
+def chunks_ingested(names):
+    """Moves the sidecars of ingested chunks to done; returns the datasets they complete."""
+    for name in names:
+        pending = os.path.join(chunks_path("pending"), f"{name}.json")
+        if os.path.exists(pending):
+            os.replace(pending, os.path.join(chunks_path("done"), f"{name}.json"))
+    return done_chunks.ingested(names)
+
+
+def land(chunks):
+    """Writes the (body, headers) chunks of values.get_values to the landing zone.
+
+    Returns the number of chunks landed. A chunk without data lines (datasets
+    that came back empty) has nothing for the stream to read: it is marked
+    ingested on the spot.
+    """
+    for directory in (incoming_path(), chunks_path("pending"), chunks_path("done")):
+        os.makedirs(directory, exist_ok=True)
+    landed = 0
+    for body, headers in chunks:
+        name = chunk_name(headers)
+        with metrics.timed("land", nbytes=len(body)):
+            write_atomic(os.path.join(chunks_path("pending"), f"{name}.json"), json.dumps(headers).encode("utf-8"))
+            if body.strip().count(b"\n"):
+                write_atomic(os.path.join(incoming_path(), f"{name}.csv"), body)
+            else:
+                values.datasets_completed(chunks_ingested([name]))
+                tools.flush_stored()
+                done_chunks.prune()
+        landed += 1
+        metrics.landing_files.set(backlog())
+    return landed
+
+
+def store_micro_batch(data_frame, batch_id):
+    """foreachBatch sink: stores one micro-batch of landed files and marks completed datasets stored."""
+    start = time.perf_counter()
+    data_frame = data_frame.persist()
+    try:
+        files = [row[0] for row in data_frame.select("_file").distinct().collect()]
+        if not files:
+            return
+        corrupt = data_frame.filter(col(CORRUPT_COLUMN).isNotNull()).count()
+        if corrupt:
+            metrics.stage_failures.inc(stage="landing_parse")
+            logging.warning(f"Micro-batch {batch_id}: {corrupt} malformed data items, unparsable fields left null")
+
+        # Rows without a key cannot be stored; the others go in even if their value was malformed
+        items = data_frame \
+            .filter(col("datasetid").isNotNull() & col("reportingunitcode").isNotNull()) \
+            .select("datasetid", "reportingunitcode", "value", "caveats")
+        rows = items.count()
+        values.store_values(data_frame.sparkSession, items, rows)
+
+        names = [os.path.splitext(os.path.basename(path))[0] for path in files]
+        values.datasets_completed(chunks_ingested(names))
+        # One status transaction per micro-batch, so the stored flags keep up with the checkpoint;
+        # only then are the sidecars of the completed datasets dropped
+        tools.flush_stored()
+        done_chunks.prune()
+        metrics.landing_files.set(backlog())
+        logging.info(f"Micro-batch {batch_id}: {len(files)} files, {rows} data items "
+                     f"in {time.perf_counter() - start:.1f}s")
+    finally:
+        data_frame.unpersist()
+
+
+def start(spark, trigger_seconds=TRIGGER_SECONDS, once=False):
+    """Starts the streaming query over the landing zone and returns it.
+
+    With once, the query ingests what has landed so far and stops
+    (availableNow); otherwise it runs a micro-batch every trigger_seconds.
+    """
+    os.makedirs(incoming_path(), exist_ok=True)
+    read = spark.readStream \
+        .schema(DATA_ITEMS_SCHEMA) \
+        .option("header", True) \
+        .option("enforceSchema", False) \
+        .option("mode", "PERMISSIVE") \
+        .option("columnNameOfCorruptRecord", CORRUPT_COLUMN) \
+        .option("maxFilesPerTrigger", MAX_FILES_PER_TRIGGER)
+    if CLEAN_SOURCE in ("delete", "archive"):
+        read = read.option("cleanSource", CLEAN_SOURCE)
+    if CLEAN_SOURCE == "archive":
+        read = read.option("sourceArchiveDir", os.path.join(LANDING_PATH, "archive"))
+    stream = read.csv(incoming_path()).withColumn("_file", input_file_name())
+
+    write = stream.writeStream \
+        .queryName("landing_ingest") \
+        .foreachBatch(store_micro_batch) \
+        .option("checkpointLocation", LANDING_CHECKPOINT)
+    write = write.trigger(availableNow=True) if once else write.trigger(processingTime=f"{trigger_seconds} seconds")
+    query = write.start()
+    logging.info(f"Ingesting {incoming_path()} every {trigger_seconds}s, checkpoint {LANDING_CHECKPOINT}")
+    return query
+
+
+def ensure_running(query):
+    """Raises the error that stopped query, so fetchers do not keep landing files nobody ingests."""
+    if not query.isActive:
+        raise RuntimeError(f"Landing-zone stream stopped: {query.exception()}")
+
+
+def drain(query):
+    """Waits until every file landed so far has been ingested, then stops query."""
+    try:
+        query.processAllAvailable()
+    finally:
+        query.stop()
@@ -0,0 +1,240 @@
+"""Per-stage ETL metrics: counters, latency histograms and gauges.
+
+Stages are "fetch", "publish", "consume", "parse", "db_write" and
+"status_update" (plus "fetch_catalogue" and "fetch_mappings"). While the ETL
+runs, the metrics are served in the Prometheus text format on METRICS_PORT
+(/metrics, or /metrics.json); at exit they are dumped as JSON to
+ETL_METRICS_DUMP together with per-stage throughput.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Port of the metrics endpoint; 0 disables it
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9108"))
+# JSON dump written when the run ends; empty disables it
+METRICS_DUMP = os.environ.get("ETL_METRICS_DUMP", "etl_metrics.json")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        return tuple(sorted(labels.items()))
+
+    def keys(self):
+        with self.lock:
+            return list(self.values)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        with self.lock:
+            key = self.key(labels)
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, key, value) for key, value in self.values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        with self.lock:
+            counts, total, count = self.values.setdefault(self.key(labels), ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[self.key(labels)] = (counts, total + value, count + 1)
+
+    def samples(self):
+        with self.lock:
+            result = []
+            for key, (counts, total, count) in self.values.items():
+                for bound, bucket in zip(self.buckets, counts):
+                    result.append((f"{self.name}_bucket", key + (("le", repr(bound)),), bucket))
+                result.append((f"{self.name}_bucket", key + (("le", "+Inf"),), count))
+                result.append((f"{self.name}_sum", key, total))
+                result.append((f"{self.name}_count", key, count))
+            return result
+
+    def snapshot(self, **labels):
+        with self.lock:
+            counts, total, count = self.values.get(self.key(labels), ([0] * len(self.buckets), 0.0, 0))
+            return {"count": count, "sum": total, "buckets": dict(zip(map(str, self.buckets), counts))}
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def prometheus(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def as_dict(self):
+        result = {}
+        for metric in self.metrics:
+            if isinstance(metric, Histogram):
+                result[metric.name] = [{"labels": dict(key), **metric.snapshot(**dict(key))} for key in metric.keys()]
+            else:
+                result[metric.name] = [{"labels": dict(key), "value": value} for _, key, value in metric.samples()]
+        return result
+
+
+registry = Registry()
+
+stage_seconds = registry.add(Histogram("etl_stage_duration_seconds", "Latency of one call of an ETL stage"))
+stage_bytes = registry.add(Counter("etl_bytes_total", "Bytes handled per stage"))
+stage_rows = registry.add(Counter("etl_rows_total", "Rows handled per stage"))
+stage_messages = registry.add(Counter("etl_messages_total", "Broker messages published or consumed"))
+stage_retries = registry.add(Counter("etl_retries_total", "Retried attempts per stage"))
+stage_failures = registry.add(Counter("etl_failures_total", "Failed calls per stage"))
+stage_dead_letters = registry.add(Counter("etl_dead_letters_total", "Messages moved to a dead-letter queue"))
+queue_depth = registry.add(Gauge("etl_queue_depth", "Messages waiting in a broker queue"))
+inflight_batches = registry.add(Gauge("etl_inflight_batches", "Batches fetched but not yet stored"))
+pending_datasets = registry.add(Gauge("etl_pending_datasets", "Datasets left to fetch in this run"))
+jdbc_partition_seconds = registry.add(Histogram("etl_jdbc_partition_seconds", "Duration of one Spark JDBC partition task"))
+batch_target_bytes = registry.add(Gauge("etl_batch_target_bytes", "Payload bytes the batch planner currently aims for"))
+landing_files = registry.add(Gauge("etl_landing_files", "Data-item files landed but not yet ingested by the stream"))
+
+_started = {"at": None, "server": None}
+
+
+@contextmanager
+def timed(stage, rows=0, nbytes=0):
+    """Times one call of a stage; failures are counted and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        stage_failures.inc(stage=stage)
+        raise
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=stage)
+    if rows:
+        stage_rows.inc(rows, stage=stage)
+    if nbytes:
+        stage_bytes.inc(nbytes, stage=stage)
+
+
+def summary():
+    """Per-stage totals and throughput, for capacity planning; safe while stages are recorded."""
+    totals = {metric: {key: value for _, key, value in metric.samples()}
+              for metric in (stage_rows, stage_bytes, stage_failures, stage_retries)}
+    stages = {}
+    for key in stage_seconds.keys():
+        stage = dict(key)["stage"]
+        latency = stage_seconds.snapshot(stage=stage)
+        rows = totals[stage_rows].get(key, 0)
+        nbytes = totals[stage_bytes].get(key, 0)
+        stages[stage] = {
+            "calls": latency["count"],
+            "seconds": round(latency["sum"], 3),
+            "rows": rows,
+            "bytes": nbytes,
+            "failures": totals[stage_failures].get(key, 0),
+            "retries": totals[stage_retries].get(key, 0),
+            "rows_per_sec": round(rows / latency["sum"], 1) if latency["sum"] and rows else None,
+            "bytes_per_sec": round(nbytes / latency["sum"], 1) if latency["sum"] and nbytes else None
+        }
+    return stages
+
+
+def dump(path=None):
+    path = path or METRICS_DUMP
+    if not path:
+        return
+    elapsed = time.time() - _started["at"] if _started["at"] else None
+    with open(path, "w") as f:
+        json.dump({"run_seconds": round(elapsed, 3) if elapsed else None, "stages": summary(),
+                   "metrics": registry.as_dict()}, f, indent=2)
+    logging.info(f"ETL metrics written to {path}")
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body = json.dumps({"stages": summary(), "metrics": registry.as_dict()}).encode("utf-8")
+            content_type = "application/json"
+        elif self.path.startswith("/metrics"):
+            body = registry.prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port=None):
+    """Starts the metrics endpoint (once) and schedules the JSON dump for interpreter exit."""
+    if _started["at"] is not None:
+        return
+    _started["at"] = time.time()
+    atexit.register(dump)
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    except OSError as e:
+        logging.error(f"Metrics endpoint not started on port {port}: {e}")
+        return
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="etl-metrics", daemon=True).start()
+    _started["server"] = server
+    logging.info(f"Serving ETL metrics on :{port}/metrics")
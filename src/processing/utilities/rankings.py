@@ -0,0 +1,189 @@
+"""Per-hospital summaries of every measure pair, ranked within their state and nationally.
+
+The summaries are maintained incrementally. refresh() folds complete datasets
+into them once, recorded in the ranked_datasets ledger: their rows are added
+to the periods, value sums and latest values of the hospitals they cover, and
+only the pairs they belong to are re-ranked, from hospital_rankings alone.
+Neither step reads the rest of a pair's history. Datasets whose rows leave
+info (revised or withdrawn ones) are taken out again by retract(), which
+rebuilds the summaries of their pairs from the datasets still in the ledger.
+"""
+import logging
+import time
+import utilities.db as db
+
+# Summary rows of the datasets listed by {datasets}; rank 1 is the highest mean value
+SUMMARY_SQL = """
+    SELECT
+        ds.measurecode,
+        ds.reportedmeasurecode,
+        info.reportingunitcode,
+        h.state,
+        COUNT(*) AS periods,
+        SUM(info.value) AS value_sum,
+        (ARRAY_AGG(info.value ORDER BY ds.reportingstartdate DESC))[1] AS latest_value,
+        MAX(ds.reportingstartdate) AS latest_date
+    FROM info
+    JOIN ({datasets}) d ON d.datasetid = info.datasetid
+    JOIN datasets ds ON ds.datasetid = info.datasetid
+    JOIN hospitals h ON h.code = info.reportingunitcode
+    WHERE info.value IS NOT NULL AND ds.withdrawn IS NOT TRUE
+    GROUP BY ds.measurecode, ds.reportedmeasurecode, info.reportingunitcode, h.state"""
+
+# Adds the rows of datasets not yet in the ledger to the summaries; returns the pairs it touched
+FOLD_SQL = """
+    WITH fresh AS (
+        INSERT INTO ranked_datasets (datasetid)
+        SELECT DISTINCT unnest(%s::int[])
+        ON CONFLICT (datasetid) DO NOTHING
+        RETURNING datasetid
+    ),
+    totals AS ({summary})
+    INSERT INTO hospital_rankings AS r (
+        measurecode, reportedmeasurecode, reportingunitcode, state, periods, value_sum, mean_value,
+        latest_value, latest_date)
+    SELECT
+        measurecode, reportedmeasurecode, reportingunitcode, state, periods, value_sum, value_sum / periods,
+        latest_value, latest_date
+    FROM totals
+    ON CONFLICT (measurecode, reportedmeasurecode, reportingunitcode) DO UPDATE SET
+        state = EXCLUDED.state,
+        periods = r.periods + EXCLUDED.periods,
+        value_sum = r.value_sum + EXCLUDED.value_sum,
+        mean_value = (r.value_sum + EXCLUDED.value_sum) / (r.periods + EXCLUDED.periods),
+        latest_value = CASE WHEN EXCLUDED.latest_date >= r.latest_date THEN EXCLUDED.latest_value
+                            ELSE r.latest_value END,
+        latest_date = GREATEST(r.latest_date, EXCLUDED.latest_date)
+    RETURNING measurecode, reportedmeasurecode;
+""".format(summary=SUMMARY_SQL.format(datasets="SELECT datasetid FROM fresh"))
+
+# Takes datasets out of the ledger; returns the pairs whose summaries they were part of
+RETRACT_SQL = """
+    WITH gone AS (DELETE FROM ranked_datasets WHERE datasetid = ANY(%s) RETURNING datasetid)
+    SELECT DISTINCT ds.measurecode, ds.reportedmeasurecode
+    FROM gone
+    JOIN datasets ds ON ds.datasetid = gone.datasetid;
+"""
+
+# Summaries of the pairs given, rebuilt from the datasets left in the ledger
+REBUILD_SQL = """
+    INSERT INTO hospital_rankings (
+        measurecode, reportedmeasurecode, reportingunitcode, state, periods, value_sum, mean_value,
+        latest_value, latest_date)
+    WITH totals AS ({summary})
+    SELECT
+        measurecode, reportedmeasurecode, reportingunitcode, state, periods, value_sum, value_sum / periods,
+        latest_value, latest_date
+    FROM totals;
+""".format(summary=SUMMARY_SQL.format(datasets="""
+        SELECT l.datasetid
+        FROM ranked_datasets l
+        JOIN datasets pd ON pd.datasetid = l.datasetid
+        JOIN unnest(%s::varchar[], %s::varchar[]) AS p(measurecode, reportedmeasurecode)
+            ON p.measurecode = pd.measurecode AND p.reportedmeasurecode = pd.reportedmeasurecode"""))
+
+# Ranks of the pairs given, from their summaries; percentile is the share of hospitals below
+RANK_SQL = """
+    UPDATE hospital_rankings r SET
+        state_rank = ranked.state_rank,
+        state_percentile = ranked.state_percentile,
+        national_rank = ranked.national_rank,
+        national_percentile = ranked.national_percentile
+    FROM (
+        SELECT
+            measurecode, reportedmeasurecode, reportingunitcode,
+            RANK() OVER (PARTITION BY measurecode, reportedmeasurecode, state ORDER BY mean_value DESC) AS state_rank,
+            PERCENT_RANK() OVER (PARTITION BY measurecode, reportedmeasurecode, state ORDER BY mean_value)
+                AS state_percentile,
+            RANK() OVER (PARTITION BY measurecode, reportedmeasurecode ORDER BY mean_value DESC) AS national_rank,
+            PERCENT_RANK() OVER (PARTITION BY measurecode, reportedmeasurecode ORDER BY mean_value)
+                AS national_percentile
+        FROM hospital_rankings
+        JOIN unnest(%s::varchar[], %s::varchar[]) AS p(pair_measure, pair_reported)
+            ON measurecode = p.pair_measure AND reportedmeasurecode = p.pair_reported
+    ) ranked
+    WHERE r.measurecode = ranked.measurecode
+        AND r.reportedmeasurecode = ranked.reportedmeasurecode
+        AND r.reportingunitcode = ranked.reportingunitcode;
+"""
+
+# Every measure pair, for a rebuild from scratch
+ALL_PAIRS_SQL = "SELECT DISTINCT measurecode, reportedmeasurecode FROM datasets"
+
+
+def pair_arrays(pairs):
+    """(measure codes, reported measure codes) of the distinct pairs, as the unnest of RANK_SQL takes them."""
+    pairs = sorted(set(pairs))
+    return [pair[0] for pair in pairs], [pair[1] for pair in pairs]
+
+
+def rank(cursor, pairs):
+    if pairs:
+        cursor.execute(RANK_SQL, pair_arrays(pairs))
+        return cursor.rowcount
+    return 0
+
+
+def rebuild(cursor, pairs):
+    """Recomputes the summaries of pairs from the ledger and re-ranks them."""
+    if not pairs:
+        return 0
+    measures, reported = pair_arrays(pairs)
+    cursor.execute("""
+        DELETE FROM hospital_rankings r
+        USING unnest(%s::varchar[], %s::varchar[]) AS p(measurecode, reportedmeasurecode)
+        WHERE r.measurecode = p.measurecode AND r.reportedmeasurecode = p.reportedmeasurecode;""",
+        (measures, reported))
+    cursor.execute(REBUILD_SQL, (measures, reported))
+    return rank(cursor, pairs)
+
+
+def refresh(dataset_ids):
+    """Folds complete datasets into the rankings and re-ranks the pairs they belong to.
+
+    Pass only datasets whose rows are all in info: each is folded once, and
+    datasets already in the ledger are skipped, so replays are harmless. The
+    fold and the ranks commit in one transaction. Failures are logged, never
+    raised.
+    """
+    dataset_ids = [int(i) for i in dataset_ids]
+    if not dataset_ids:
+        return 0
+    start = time.perf_counter()
+    try:
+        with db.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(FOLD_SQL, (dataset_ids,))
+            ranked = rank(cursor, cursor.fetchall())
+    except Exception as e:
+        logging.error(f"Failed to refresh rankings for datasets {dataset_ids[:5]}...: {e}")
+        return 0
+    logging.info(f"Ranked {ranked} hospital summaries in {time.perf_counter() - start:.2f}s")
+    return ranked
+
+
+def retract(dataset_ids):
+    """Takes datasets whose rows left info (revised or withdrawn) out of the rankings.
+
+    The pairs they belong to are rebuilt from the datasets still in the
+    ledger; a revised dataset comes back through refresh() once refetched.
+    Failures are logged, never raised.
+    """
+    dataset_ids = [int(i) for i in dataset_ids]
+    if not dataset_ids:
+        return 0
+    try:
+        with db.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(RETRACT_SQL, (dataset_ids,))
+            return rebuild(cursor, cursor.fetchall())
+    except Exception as e:
+        logging.error(f"Failed to retract datasets {dataset_ids[:5]}... from the rankings: {e}")
+        return 0
+
+
+def refresh_all():
+    """Rebuilds every ranking from the stored datasets, e.g. to backfill the table on an existing database."""
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM ranked_datasets;")
+        cursor.execute("INSERT INTO ranked_datasets (datasetid) SELECT datasetid FROM datasets WHERE stored;")
+        cursor.execute(ALL_PAIRS_SQL)
+        return rebuild(cursor, cursor.fetchall())
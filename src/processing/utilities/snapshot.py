@@ -0,0 +1,185 @@
+import datetime
+import logging
+import os
+import shutil
+import pyarrow as pa
+import pyarrow.parquet as pq
+import utilities.db as db
+import utilities.lake as lake
+
+# Snapshots read by the dashboard's DuckDB backend; publishing is disabled when unset
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", "")
+# Older snapshots are kept so dashboard queries running against them can finish
+SNAPSHOT_KEEP = int(os.environ.get("SNAPSHOT_KEEP", "3"))
+
+CURRENT = "CURRENT"
+
+# Dimension tables copied whole into every snapshot
+SNAPSHOT_TABLES = {
+    "datasets": "SELECT reportingstartdate, reportedmeasurecode, datasetid, measurecode, datasetname, stored FROM datasets",
+    "measurements": "SELECT measurecode, measurename FROM measurements",
+    "reported_measurements": "SELECT reportedmeasurecode, reportedmeasurename FROM reported_measurements",
+    "hospitals": "SELECT code, name, type, latitude, longitude, sector, open_closed, state, lhn, phn FROM hospitals",
+    "anomalies": "SELECT datasetid, reportingunitcode, measurecode, reportedmeasurecode, reportingstartdate, "
+                 "value, baseline, robust_z, delta, pct_change, reason, detected_at FROM anomalies",
+    "hospital_rankings": "SELECT * FROM hospital_rankings"
+}
+
+INFO_SQL = "SELECT datasetid, reportingunitcode, value, caveats FROM info"
+
+# Stored datasets with data items; the lake stands in for info only if it holds all of them
+STORED_WITH_ROWS_SQL = """
+    SELECT d.datasetid FROM datasets d
+    WHERE d.stored AND EXISTS (SELECT 1 FROM info i WHERE i.datasetid = d.datasetid);
+"""
+
+
+def enabled():
+    return bool(SNAPSHOT_PATH)
+
+
+def current_version():
+    """Returns the name of the published snapshot, or None."""
+    path = os.path.join(SNAPSHOT_PATH, CURRENT)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read().strip() or None
+
+
+# Arrow types of the Postgres type OIDs the snapshot tables use; other types are written as strings
+ARROW_TYPES = {
+    16: pa.bool_(),                   # boolean
+    20: pa.int64(),                   # bigint
+    21: pa.int16(),                   # smallint
+    23: pa.int32(),                   # integer
+    700: pa.float32(),                # real
+    701: pa.float64(),                # double precision
+    1700: pa.float64(),               # numeric
+    1082: pa.date32(),                # date
+    1114: pa.timestamp("us"),         # timestamp
+    1184: pa.timestamp("us", "UTC"),  # timestamp with time zone
+}
+
+
+def arrow_schema(description):
+    """Arrow schema of a result from its Postgres column types, known before any row is read."""
+    return pa.schema([(column.name, ARROW_TYPES.get(column.type_code, pa.string())) for column in description])
+
+
+def arrow_table(rows, schema):
+    columns = []
+    for values, field in zip(zip(*rows), schema):
+        if pa.types.is_string(field.type):
+            values = [None if value is None else str(value) for value in values]
+        elif field.type == pa.float64():
+            # numeric comes back as Decimal
+            values = [None if value is None else float(value) for value in values]
+        columns.append(pa.array(values, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def export_query(sql, path, chunk_rows=100000):
+    """Streams a query into a Parquet file through a server-side cursor, chunk_rows at a time.
+
+    Every chunk, and an empty result, is written with the schema of the
+    query's column types, so the file's types never depend on the values read.
+    """
+    with db.get_connection() as conn, conn.cursor(name="snapshot_export") as cursor:
+        cursor.itersize = chunk_rows
+        cursor.execute(sql)
+        # A server-side cursor describes its columns once the first rows are fetched
+        rows = cursor.fetchmany(chunk_rows)
+        schema = arrow_schema(cursor.description)
+        with pq.ParquetWriter(path, schema) as writer:
+            while rows:
+                writer.write_table(arrow_table(rows, schema))
+                rows = cursor.fetchmany(chunk_rows)
+
+
+def stored_dataset_ids():
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(STORED_WITH_ROWS_SQL)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def missing_from_lake(manifest, dataset_ids):
+    """The DataSetIds of dataset_ids that no file of the lake manifest holds."""
+    in_lake = set()
+    for entry in manifest["partitions"].values():
+        for file in entry["files"].values():
+            in_lake.update(file["datasetids"])
+    return sorted(set(dataset_ids) - in_lake)
+
+
+def link_lake_files(directory, manifest):
+    """Hard-links the lake files of manifest into the snapshot.
+
+    Lake files are never modified in place, only replaced, so the links keep
+    the snapshot intact after later compactions.
+    """
+    count = 0
+    for partition, entry in manifest["partitions"].items():
+        for name in entry["files"]:
+            source = os.path.join(lake.facts_path(), partition, name)
+            os.link(source, os.path.join(directory, f"{count:06d}.parquet"))
+            count += 1
+    return count
+
+
+def new_version():
+    """Name of a new snapshot: UTC time down to the microsecond, so names sort by age."""
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S.%f")
+
+
+def publish_snapshot():
+    """Publishes a new Parquet snapshot of the schema for the dashboard.
+
+    The snapshot is built in a fresh directory and made visible by atomically
+    replacing the CURRENT pointer, so readers switch from one complete
+    snapshot to the next.
+    """
+    if not enabled():
+        return None
+
+    version = new_version()
+    directory = os.path.join(SNAPSHOT_PATH, version)
+    # Never reuse a directory: CURRENT may point at it
+    os.makedirs(SNAPSHOT_PATH, exist_ok=True)
+    os.mkdir(directory)
+    os.mkdir(os.path.join(directory, "info"))
+
+    try:
+        for table, sql in SNAPSHOT_TABLES.items():
+            export_query(sql, os.path.join(directory, f"{table}.parquet"))
+
+        # The lake only holds what was exported since LAKE_PATH was set; info comes from
+        # Postgres unless it covers every stored dataset
+        linked = 0
+        if lake.enabled() and os.path.exists(os.path.join(lake.facts_path(), lake.MANIFEST)):
+            with lake._lock:
+                manifest = lake.read_manifest()
+                missing = missing_from_lake(manifest, stored_dataset_ids())
+                if missing:
+                    logging.warning(f"Lake lacks {len(missing)} stored datasets (e.g. {missing[:5]}), "
+                                    f"snapshot {version} reads info from Postgres")
+                else:
+                    linked = link_lake_files(os.path.join(directory, "info"), manifest)
+        if not linked:
+            export_query(INFO_SQL, os.path.join(directory, "info", "000000.parquet"))
+    except Exception as e:
+        logging.error(f"Failed to build snapshot {version}: {e}")
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    pointer = os.path.join(SNAPSHOT_PATH, CURRENT)
+    with open(f"{pointer}.tmp", "w") as f:
+        f.write(version)
+    os.replace(f"{pointer}.tmp", pointer)
+    logging.info(f"Published snapshot {version}")
+
+    snapshots = sorted(name for name in os.listdir(SNAPSHOT_PATH)
+                       if os.path.isdir(os.path.join(SNAPSHOT_PATH, name)))
+    for name in snapshots[:-SNAPSHOT_KEEP]:
+        shutil.rmtree(os.path.join(SNAPSHOT_PATH, name), ignore_errors=True)
+    return version
@@ -1,150 +1,199 @@
+import hashlib
+import io
 import logging
+import openpyxl
+import os
 import pandas as pd
 import pika
 import time
 from tqdm import tqdm
 import requests
 from pyspark.sql import DataFrame
-from pyspark.sql.functions import col, to_date
-import psycopg2
+from pyspark.sql.functions import broadcast, col, to_date
+from psycopg2.extras import execute_values
+import utilities.db as db
+import utilities.jdbc as jdbc
+import utilities.metrics as metrics
+import sampling_profiler as profiling
+import utilities.tables as tables
+import utilities.rankings as rankings
+
+# AIHW MyHospitals API and broker, overridable to point the ETL at local stand-ins (see benchmarks/)
+AIHW_API_URL = os.environ.get("AIHW_API_URL", "https://myhospitalsapi.aihw.gov.au/api/v1").rstrip("/")
+RABBITMQ_HOST = os.environ.get("RABBITMQ_HOST", "rabbitmq")
 
 
 def update_stored(batch):
-    conn_details = {
-        "host": "postgres",
-        "dbname": "mydatabase",
-        "user": "myuser",
-        "password": "mypassword"
-    }
+    """Marks a batch of datasets as stored.
+
+    Updates are buffered in utilities.db.status_buffer and written in one
+    transaction every ETL_STATUS_FLUSH_SIZE ids or ETL_STATUS_FLUSH_SECONDS;
+    consume_from_rabbitmq flushes before acknowledging the last message of
+    the queue, and flush_stored() writes the remainder at the end of a run.
+    """
+    return db.status_buffer.add(batch)
+
+
+def flush_stored():
+    """Writes any buffered stored = TRUE updates."""
+    return db.status_buffer.flush()
+
 
-    conn = psycopg2.connect(**conn_details)
-    cursor = conn.cursor()
+# Mapping workbook header -> hospitals table column
+HOSPITAL_COLUMNS = {
+    "Code": "code",
+    "Name": "name",
+    "Type": "type",
+    "Latitude": "latitude",
+    "Longitude": "longitude",
+    "Sector": "sector",
+    "Open/Closed": "open_closed",
+    "State": "state",
+    "Local Hospital Network (LHN)": "lhn",
+    "Primary Health Network area (PHN)": "phn"
+}
 
-    # Prepare the SQL query
-    # This uses a parameterized query to avoid SQL injection risks
-    sql = "UPDATE datasets SET stored = TRUE WHERE DataSetId = ANY(%s);"
 
+def parse_hospital_mappings(content):
+    """Streams the mappings workbook in openpyxl read-only mode.
+
+    Yields one tuple per hospital in HOSPITAL_COLUMNS order, with the row hash
+    appended. Title rows above the "Code" header and footnotes below the last
+    hospital are skipped.
+    """
+    workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
     try:
-        # Execute the SQL command
-        cursor.execute(sql, (batch,))
-        conn.commit()  # Commit the changes to the database
-        print(f"Updated {cursor.rowcount} rows successfully.")
-    except Exception as e:
-        # Handle exceptions and rollback changes in case of error
-        conn.rollback()
-        print(f"An error occurred: {e}")
+        rows = workbook.active.iter_rows(values_only=True)
+        positions = None
+        for row in rows:
+            if row and row[0] == "Code":
+                positions = [row.index(header) for header in HOSPITAL_COLUMNS]
+                break
+        if positions is None:
+            raise ValueError("Header row not found in hospital mappings workbook")
+
+        for row in rows:
+            if not row or row[0] is None:
+                break
+            record = []
+            for column, position in zip(HOSPITAL_COLUMNS.values(), positions):
+                value = row[position] if position < len(row) else None
+                if column in ("latitude", "longitude"):
+                    value = float(value) if value not in (None, "") else None
+                elif value is not None:
+                    # Blank cells stay NULL, as they were when the workbook went through pandas
+                    value = str(value).strip() or None
+                record.append(value)
+            row_hash = hashlib.sha256("\x1f".join(map(str, record)).encode("utf-8")).hexdigest()
+            yield tuple(record) + (row_hash,)
     finally:
-        # Close the cursor and connection to release database resources
-        cursor.close()
-        conn.close()
+        workbook.close()
+
 
 def map_hospitals(spark_session):
+    """Refreshes the hospitals table from the AIHW mappings workbook.
+
+    Only hospitals whose row hash differs from the stored one (new hospitals,
+    closures, LHN/PHN changes, ...) are upserted, in a single batched statement.
+    spark_session is unused and kept for compatibility with ETL.py.
+    """
     print('Fetching Hospitals data...')
     
-    url = "https://myhospitalsapi.aihw.gov.au/api/v1/reporting-units-downloads/mappings"
+    url = f"{AIHW_API_URL}/reporting-units-downloads/mappings"
     headers = {
         'Authorization': 'Bearer YOUR_ACCESS_TOKEN',
         'User-Agent': 'MyApp/1.0',
         'accept': 'application/json'
     }
 
-    response = requests.get(url, headers=headers)
-    filename = 'hospital_mapping.xlsx'
-
-    with open(filename, 'wb') as file:
-        file.write(response.content)
+    with metrics.timed("fetch_mappings"):
+        response = requests.get(url, headers=headers)
+        response.raise_for_status()
+    metrics.stage_bytes.inc(len(response.content), stage="fetch_mappings")
 
-    df = pd.read_excel(filename, engine='openpyxl', skiprows=3)
+    try:
+        with db.get_connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT code, row_hash FROM hospitals;")
+            stored = dict(cursor.fetchall())
 
-    sdf = spark_session.createDataFrame(df)   
-    sdf = sdf.withColumnRenamed("Open/Closed", "Open_Closed") \
-               .withColumnRenamed("Local Hospital Network (LHN)", "LHN") \
-               .withColumnRenamed("Primary Health Network area (PHN)", "PHN")
-    for column in sdf.columns:
-        sdf = sdf.withColumnRenamed(column, column.lower())
-    
-    insert_into_postgresql(spark_session, sdf, "hospitals")
-    print("Hospital mapping inserted successfully into the PostgreSQL database")
+            # Keyed by code so a hospital listed twice cannot hit ON CONFLICT twice in one statement
+            changed = list({record[0]: record for record in parse_hospital_mappings(response.content)
+                            if stored.get(record[0]) != record[-1]}.values())
 
+            if changed:
+                columns = list(HOSPITAL_COLUMNS.values()) + ["row_hash"]
+                updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns[1:])
+                execute_values(cursor,
+                               f"INSERT INTO hospitals ({', '.join(columns)}) VALUES %s "
+                               f"ON CONFLICT (code) DO UPDATE SET {updates};",
+                               changed, page_size=len(changed))
+                db.bump_data_version(cursor)
+        print(f"Hospital mapping refreshed: {len(changed)} hospitals inserted or updated")
+    except Exception as e:
+        logging.error(f"Failed to refresh hospital mapping: {e}")
+        raise
 
-def get_ids():
-    """Fetches all DataSetIds from the datasets table where stored is False."""
-    
-    # Connection details (replace with your database specifics)
-    conn_details = {
-        "host": "postgres",
-        "dbname": "mydatabase",
-        "user": "myuser",
-        "password": "mypassword"
-    }
 
-    # Connect to the PostgreSQL database
-    conn = psycopg2.connect(**conn_details)
-    cursor = conn.cursor()
+def iter_ids(itersize=1000):
+    """Streams the DataSetIds still to be fetched through a server-side cursor."""
+    sql = "SELECT DataSetId FROM datasets WHERE stored = FALSE AND withdrawn IS NOT TRUE ORDER BY DataSetId;"
+    for row in db.stream_query(sql, itersize=itersize, name="pending_ids"):
+        yield row[0]
 
-    # SQL query to select DataSetIds where stored is False
-    sql = "SELECT DataSetId FROM datasets WHERE stored = FALSE;"
 
+def get_ids():
+    """Fetches all DataSetIds from the datasets table where stored is False."""
     try:
-        # Execute the query
-        cursor.execute(sql)
-        # Fetch all rows of the result
-        rows = cursor.fetchall()
-        # Extract DataSetIds from the rows
-        dataset_ids = [row[0] for row in rows]
-        return dataset_ids
+        return list(iter_ids())
     except Exception as e:
         print(f"An error occurred: {e}")
         return []  # Return an empty list in case of error
-    finally:
-        # Close the cursor and the connection
-        cursor.close()
-        conn.close()
-
 
 
+@profiling.profiled(params=lambda spark, data_frame, table_name: {"table": table_name})
 def insert_into_postgresql(spark,data_frame, table_name):
-    url = "jdbc:postgresql://postgres:5432/mydatabase"
-    properties = {
-        "user": "myuser",
-        "password": "mypassword",
-        "driver": "org.postgresql.Driver"
-    }
+    """Appends the rows of data_frame whose key is not in table_name yet.
 
-    ids ={"hospitals" : 'code',
-          "measurements" : 'measurecode',
-          "reported_measurements" : 'reportedmeasurecode',
-          "datasets" : 'datasetid',
-          "info" : "id" }
+    Existing rows are never updated. For info that is what replays need: revised
+    datasets lose their rows in apply_catalogue_diff before they are refetched.
+
+    Reads and writes go through utilities.jdbc: partitioned in parallel,
+    batched, and reported partition by partition.
+    """
+    ids ={"hospitals" : ['code'],
+          "measurements" : ['measurecode'],
+          "reported_measurements" : ['reportedmeasurecode'],
+          "datasets" : ['datasetid'],
+          "info" : ['id'],
+          "info_compact" : ['datasetid', 'unit_id'] }
 
-    # Read existing data from the table
     try:
-        existing_df = spark.read.format("jdbc") \
-            .option("url", url) \
-            .option("dbtable", table_name) \
-            .option("user", properties["user"]) \
-            .option("password", properties["password"]) \
-            .option("driver", properties["driver"]) \
-            .load()
-
-        # Assuming 'id' is the primary key column in your DataFrame and the PostgreSQL table
-        if ids[table_name] in data_frame.columns:
-            # Perform a left anti join to find new records
-            new_records_df = data_frame.join(existing_df, data_frame[ids[table_name]] == existing_df[ids[table_name]], "left_anti")
-            
-            if new_records_df.count() > 0:
-                # Insert new unique records
-                new_records_df.write.format("jdbc") \
-                    .option("url", url) \
-                    .option("dbtable", table_name) \
-                    .option("user", properties["user"]) \
-                    .option("password", properties["password"]) \
-                    .option("driver", properties["driver"]) \
-                    .mode("append") \
-                    .save()
-                logging.info(f"Data successfully inserted into {table_name}.")
-            else:
-                logging.info("No new unique records to insert.")
+        # Assuming the primary key columns are in your DataFrame and the PostgreSQL table
+        if all(key in data_frame.columns for key in ids[table_name]):
+            with jdbc.job_group(spark, f"insert {table_name}") as group:
+                if table_name in ("info", "info_compact"):
+                    # Only compare against the datasets in this batch; the filter is pushed
+                    # down to Postgres and prunes info_compact partitions, and the read is
+                    # range-partitioned over the batch's ids only
+                    batch_ids = [row[0] for row in data_frame.select('datasetid').distinct().collect()]
+                    existing_df = jdbc.reader(spark, table_name, bounds=(min(batch_ids, default=None),
+                                                                         max(batch_ids, default=None)))
+                    existing_df = existing_df.filter(col('datasetid').isin(batch_ids))
+                else:
+                    existing_df = jdbc.reader(spark, table_name)
+
+                # Perform a left anti join to find new records; kept for the write after counting
+                new_records_df = data_frame.join(existing_df, on=ids[table_name], how="left_anti").persist()
+                try:
+                    if new_records_df.count() > 0:
+                        # Insert new unique records
+                        jdbc.write(new_records_df, table_name)
+                        logging.info(f"Data successfully inserted into {table_name}.")
+                    else:
+                        logging.info("No new unique records to insert.")
+                finally:
+                    new_records_df.unpersist()
+            jdbc.report(spark, group, table_name)
         else:
             logging.error("Primary key not in DataFrame columns.")
             logging.error(table_name)
@@ -153,67 +202,334 @@ def insert_into_postgresql(spark,data_frame, table_name):
         logging.error(f"Failed to interact with PostgreSQL: {e}")
         raise
 
-def send_to_rabbitmq(concatenated_csv):
-    connection_attempts = 0
+
+# Queue the fetched batches go through, and where its failed messages wait or end up
+VALUES_QUEUE = "values_queue"
+DEAD_LETTER_QUEUE = f"{VALUES_QUEUE}.dead"
+# Delay in seconds before each retry of a failed message; one retry queue per entry,
+# so the number of entries caps the attempts before a message is dead-lettered
+RETRY_DELAYS = [int(delay) for delay in os.environ.get("ETL_RETRY_DELAYS", "30,120,600").split(",") if delay]
+
+
+# Seconds without a message after which consume_from_rabbitmq gives up on an empty queue
+CONSUME_IDLE_SECONDS = float(os.environ.get("ETL_CONSUME_IDLE_SECONDS", "5"))
+
+
+def retry_queue(attempt):
+    return f"{VALUES_QUEUE}.retry.{attempt}"
+
+
+def declare_values_topology(channel):
+    """Declares values_queue, its retry queues and its dead-letter queue.
+
+    A retry queue has no consumer: its messages expire after the queue's delay
+    and are dead-lettered by the broker back onto values_queue. Returns the
+    declare reply of values_queue.
+    """
+    declared = channel.queue_declare(queue=VALUES_QUEUE)
+    for attempt, delay in enumerate(RETRY_DELAYS, start=1):
+        channel.queue_declare(queue=retry_queue(attempt), arguments={
+            "x-message-ttl": delay * 1000,
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": VALUES_QUEUE
+        })
+    channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True)
+    return declared
+
+
+def publish_chunks(chunks):
+    """Publishes (body, headers) chunks to values_queue over one connection, each as soon as it is produced.
+
+    A failed publish reconnects and retries up to 5 times; after that the
+    remaining chunks are not produced, so their datasets stay pending.
+    Returns the number of chunks published.
+    """
+    connection = channel = None
+    published = 0
     max_attempts = 5
-    while connection_attempts < max_attempts:
-        try:
-            connection = pika.BlockingConnection(pika.ConnectionParameters('rabbitmq'))
-            channel = connection.channel()
-            channel.queue_declare(queue='values_queue')
-            channel.basic_publish(exchange='', routing_key='values_queue', body=concatenated_csv)
-        
-            logging.info("Data sent to RabbitMQ.")
+    try:
+        for body, headers in chunks:
+            properties = pika.BasicProperties(headers={**headers, "attempts": 0})
+            connection_attempts = 0
+            while True:
+                try:
+                    with metrics.timed("publish", nbytes=len(body)):
+                        if channel is None:
+                            connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
+                            channel = connection.channel()
+                            declared = declare_values_topology(channel)
+                            metrics.queue_depth.set(declared.method.message_count, queue=VALUES_QUEUE)
+                        channel.basic_publish(exchange='', routing_key=VALUES_QUEUE, body=body, properties=properties)
+                    metrics.stage_messages.inc(stage="publish")
+                    metrics.queue_depth.inc(queue=VALUES_QUEUE)
+                    published += 1
+                    break
+                except Exception as e:
+                    logging.error(f"Failed to send CSV files to RabbitMQ: {e}")
+                    if connection is not None and connection.is_open:
+                        connection.close()
+                    connection = channel = None
+                    connection_attempts += 1
+                    if connection_attempts >= max_attempts:
+                        logging.error("Exceeded maximum attempts to connect to RabbitMQ.")
+                        return published
+                    metrics.stage_retries.inc(stage="publish")
+                    time.sleep(5)
+        logging.info(f"{published} chunks sent to RabbitMQ.")
+        return published
+    finally:
+        if connection is not None and connection.is_open:
             connection.close()
-            return
-        except Exception as e:
-            logging.error(f"Failed to send CSV files to RabbitMQ: {e}")
-            connection_attempts += 1
-            time.sleep(5)
-    logging.error("Exceeded maximum attempts to connect to RabbitMQ.")
-    
-def consume_from_rabbitmq(spark_session, queue_name, callback_function):
+
+
+def send_to_rabbitmq(concatenated_csv, dataset_ids=None):
+    """Publishes a whole batch as one message; the consumer marks dataset_ids stored once it is in Postgres."""
+    return publish_chunks([(concatenated_csv.encode('utf-8'), {"dataset_ids": list(dataset_ids or [])})])
+
+
+def retry_or_dead_letter(channel, body, properties, error):
+    """Republishes a failed message to the next retry queue, or to the dead-letter queue once retries run out."""
+    headers = dict(properties.headers or {})
+    attempt = int(headers.get("attempts", 0)) + 1
+    headers.update({"attempts": attempt, "last_error": str(error)[:1000],
+                    "failed_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+    if attempt <= len(RETRY_DELAYS):
+        target = retry_queue(attempt)
+        metrics.stage_retries.inc(stage="consume")
+        logging.warning(f"Message for datasets {headers.get('dataset_ids')} failed (attempt {attempt}), "
+                        f"retrying in {RETRY_DELAYS[attempt - 1]}s: {error}")
+    else:
+        target = DEAD_LETTER_QUEUE
+        metrics.stage_dead_letters.inc(queue=VALUES_QUEUE)
+        logging.error(f"Message for datasets {headers.get('dataset_ids')} dead-lettered after {attempt - 1} retries: {error}")
+    channel.basic_publish(exchange='', routing_key=target, body=body,
+                          properties=pika.BasicProperties(headers=headers, delivery_mode=2))
+
+
+def consume_from_rabbitmq(spark_session, queue_name, callback_function, idle_seconds=None):
+    """Drains queue_name into callback_function, acknowledging each message once handled, then returns.
+
+    Returns once the queue is empty after a message, or when nothing has
+    arrived for idle_seconds (ETL_CONSUME_IDLE_SECONDS). Messages still
+    waiting in a retry queue come back onto queue_name later and are
+    consumed with the next batch or by the next run.
+
+    A message whose callback raises is acknowledged only after it has been
+    republished to a retry queue or, after the last retry, to the dead-letter
+    queue, so a failing batch neither blocks the queue nor gets lost.
+    """
+    idle_seconds = CONSUME_IDLE_SECONDS if idle_seconds is None else idle_seconds
     try:
         # Setup the connection to RabbitMQ
-        connection = pika.BlockingConnection(pika.ConnectionParameters('rabbitmq'))
+        connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
         channel = connection.channel()
         
         # Make sure the queue exists
-        channel.queue_declare(queue=queue_name, passive=True)
+        declared = channel.queue_declare(queue=queue_name, passive=True)
+        metrics.queue_depth.set(declared.method.message_count, queue=queue_name)
+        channel.basic_qos(prefetch_count=1)
 
-        # Define the callback function that handles incoming messages
-        def on_message_callback(ch, method, properties, body):
-            callback_function(spark_session, ch, method, properties, body)
-        
-        # Set up basic consume
-        channel.basic_consume(queue=queue_name, on_message_callback=on_message_callback, auto_ack=True)
-        
-        # Start consuming messages from the queue
-        logging.info(f'[*] Waiting for messages on queue "{queue_name}". To exit press CTRL+C')
-        channel.start_consuming()
+        logging.info(f'[*] Consuming messages on queue "{queue_name}".')
+        for method, properties, body in channel.consume(queue_name, auto_ack=False, inactivity_timeout=idle_seconds):
+            if method is None:
+                logging.info(f"No message on {queue_name} for {idle_seconds}s, stopping consumption.")
+                flush_stored()
+                break
+            metrics.stage_messages.inc(stage="consume")
+            try:
+                with metrics.timed("consume", nbytes=len(body)):
+                    callback_function(spark_session, channel, method, properties, body)
+            except Exception as e:
+                retry_or_dead_letter(channel, body, properties, e)
+            # Ready messages only: with a prefetch of 1 the broker holds back the next one until this ack
+            remaining = channel.queue_declare(queue=queue_name, passive=True).method.message_count
+            if remaining == 0:
+                # The stored flags of the drained queue are written before its last message is gone
+                flush_stored()
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            metrics.queue_depth.set(remaining, queue=queue_name)
+            if remaining == 0:
+                break
+        channel.cancel()
 
     except KeyboardInterrupt:
         # Handle KeyboardInterrupt gracefully
         logging.info("KeyboardInterrupt detected. Stopping consumption.")
-        channel.stop_consuming()
     except Exception as e:
         # Log any exceptions that occur
         logging.error(f"Failed to consume messages from RabbitMQ: {e}")
     finally:
         # Always close the connection when done or if an error occurs
-        if 'connection' in locals():
+        if 'connection' in locals() and connection.is_open:
             connection.close()
 
+
+def replay_dead_letters(limit=None):
+    """Moves dead-lettered messages back onto values_queue with a fresh retry budget; returns how many."""
+    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
+    try:
+        channel = connection.channel()
+        declare_values_topology(channel)
+        replayed = 0
+        while limit is None or replayed < limit:
+            method, properties, body = channel.basic_get(queue=DEAD_LETTER_QUEUE, auto_ack=False)
+            if method is None:
+                break
+            headers = dict(properties.headers or {})
+            headers.update({"attempts": 0, "replayed_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+            channel.basic_publish(exchange='', routing_key=VALUES_QUEUE, body=body,
+                                  properties=pika.BasicProperties(headers=headers))
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            replayed += 1
+        return replayed
+    finally:
+        connection.close()
+
+
+def list_dead_letters(limit=100):
+    """Headers of up to limit dead-lettered messages, left in the queue."""
+    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
+    try:
+        channel = connection.channel()
+        declare_values_topology(channel)
+        messages = []
+        while len(messages) < limit:
+            method, properties, body = channel.basic_get(queue=DEAD_LETTER_QUEUE, auto_ack=False)
+            if method is None:
+                break
+            messages.append({**(properties.headers or {}), "bytes": len(body)})
+        # Unacknowledged messages return to the queue when the connection closes
+        return messages
+    finally:
+        connection.close()
+
+def encode_units(spark_session, values):
+    """Replaces reportingunitcode with its unit_id from the reporting_units dictionary.
+
+    Codes not seen before are added to reporting_units first.
+    """
+    codes = [row[0] for row in values.select('reportingunitcode').distinct().collect() if row[0] is not None]
+
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        execute_values(cursor,
+                       "INSERT INTO reporting_units (reportingunitcode) VALUES %s ON CONFLICT (reportingunitcode) DO NOTHING;",
+                       [(code,) for code in codes])
+        cursor.execute("SELECT reportingunitcode, unit_id FROM reporting_units WHERE reportingunitcode = ANY(%s);", (codes,))
+        mapping = cursor.fetchall()
+
+    units = spark_session.createDataFrame(mapping, 'reportingunitcode STRING, unit_id INT')
+    return values.join(broadcast(units), on='reportingunitcode').select('datasetid', 'unit_id', 'value', 'caveats')
+
+
+def hash_catalogue_rows(df):
+    """Returns a sha256 hex digest per catalogue row, over every column of the CSV."""
+    joined = df.astype(str).agg('\x1f'.join, axis=1)
+    return joined.map(lambda row: hashlib.sha256(row.encode('utf-8')).hexdigest())
+
+
+def diff_catalogue(df):
+    """Compares the hashed catalogue with the datasets table.
+
+    Returns a work list with the new, changed and withdrawn DataSetIds.
+    Rows stored before hashing was introduced (row_hash is NULL) are
+    backfilled rather than reported as changed.
+    """
+    with db.get_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT datasetid, row_hash, withdrawn FROM datasets;")
+        stored = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+    catalogue = dict(zip(df['datasetid'].astype(int), df['row_hash']))
+
+    worklist = {"new": [], "changed": [], "backfill": [], "withdrawn": []}
+    for dataset_id, row_hash in catalogue.items():
+        if dataset_id not in stored:
+            worklist["new"].append(dataset_id)
+            continue
+        stored_hash, withdrawn = stored[dataset_id]
+        if stored_hash is None and not withdrawn:
+            worklist["backfill"].append(dataset_id)
+        elif stored_hash != row_hash or withdrawn:
+            worklist["changed"].append(dataset_id)
+
+    worklist["withdrawn"] = [dataset_id for dataset_id, (_, withdrawn) in stored.items()
+                             if dataset_id not in catalogue and not withdrawn]
+    return worklist
+
+
+def apply_catalogue_diff(df, worklist):
+    """Applies the changed, backfilled and withdrawn entries of a work list to the datasets table.
+
+    Changed datasets get their catalogue fields refreshed, their stale info rows
+    removed and stored reset to FALSE so the fetch stage picks them up again.
+    Withdrawn datasets are flagged and their info rows removed. New datasets are
+    left to insert_into_postgresql.
+    """
+    # Both leave the rankings first, while the datasets table still has the pairs they were ranked under;
+    # changed datasets are folded back in once refetched
+    rankings.retract(worklist["changed"] + worklist["withdrawn"])
+
+    columns = ['datasetid', 'reportingstartdate', 'reportedmeasurecode', 'measurecode', 'datasetname', 'row_hash']
+    indexed = df.set_index(df['datasetid'].astype(int))
+
+    def rows_for(ids):
+        return [(int(i),) + tuple(None if pd.isna(v) else v for v in indexed.loc[i, columns[1:]])
+                for i in ids]
+
+    try:
+        with db.get_connection() as conn, conn.cursor() as cursor:
+            if worklist["changed"]:
+                execute_values(cursor, """
+                    UPDATE datasets d SET
+                        reportingstartdate = v.reportingstartdate::DATE,
+                        reportedmeasurecode = v.reportedmeasurecode,
+                        measurecode = v.measurecode,
+                        datasetname = v.datasetname,
+                        row_hash = v.row_hash,
+                        stored = FALSE,
+                        withdrawn = FALSE
+                    FROM (VALUES %s) AS v(datasetid, reportingstartdate, reportedmeasurecode, measurecode, datasetname, row_hash)
+                    WHERE d.datasetid = v.datasetid;""", rows_for(worklist["changed"]))
+                cursor.execute(f"DELETE FROM {tables.info_table()} WHERE datasetid = ANY(%s);", (worklist["changed"],))
+                cursor.execute("DELETE FROM anomalies WHERE datasetid = ANY(%s);", (worklist["changed"],))
+
+            if worklist["backfill"]:
+                execute_values(cursor, """
+                    UPDATE datasets d SET row_hash = v.row_hash
+                    FROM (VALUES %s) AS v(datasetid, row_hash)
+                    WHERE d.datasetid = v.datasetid;""",
+                    [(int(i), indexed.loc[i, 'row_hash']) for i in worklist["backfill"]])
+
+            if worklist["withdrawn"]:
+                cursor.execute("UPDATE datasets SET withdrawn = TRUE, stored = FALSE WHERE datasetid = ANY(%s);",
+                               (worklist["withdrawn"],))
+                cursor.execute(f"DELETE FROM {tables.info_table()} WHERE datasetid = ANY(%s);", (worklist["withdrawn"],))
+                cursor.execute("DELETE FROM anomalies WHERE datasetid = ANY(%s);", (worklist["withdrawn"],))
+
+            if worklist["changed"] or worklist["withdrawn"]:
+                db.bump_data_version(cursor)
+    except Exception as e:
+        logging.error(f"Failed to apply catalogue changes: {e}")
+        raise
+
+
 def download_datasetlist(spark_session):
-    url = "https://myhospitalsapi.aihw.gov.au/api/v1/datasets/"
+    """Downloads the datasets catalogue and diffs it against the datasets table.
+
+    Returns a work list {"new", "changed", "backfill", "withdrawn"} of DataSetIds,
+    or None if the catalogue could not be fetched.
+    """
+    url = f"{AIHW_API_URL}/datasets/"
     headers = {
         'Authorization': 'Bearer YOUR_ACCESS_TOKEN',  
         'User-Agent': 'MyApp/1.0',
         'accept': 'text/csv'
     }
     
+    response = None
     try:
-        response = requests.get(url, headers=headers)
+        with metrics.timed("fetch_catalogue"):
+            response = requests.get(url, headers=headers)
+        metrics.stage_bytes.inc(len(response.content), stage="fetch_catalogue")
         if response.status_code == 200:
             file_path = 'datasets.csv'
             with open(file_path, 'wb') as f:
@@ -221,25 +537,36 @@ def download_datasetlist(spark_session):
             logging.info("List of available data retrieved")
 
             df = pd.read_csv(file_path)
-            
-            sdf = spark_session.createDataFrame(df)
+            metrics.stage_rows.inc(len(df), stage="fetch_catalogue")
+            df.columns = [column.lower() for column in df.columns]
+            df['row_hash'] = hash_catalogue_rows(df)
 
-            for column in sdf.columns:
+            worklist = diff_catalogue(df)
+            logging.info(f"Catalogue diff: {len(worklist['new'])} new, {len(worklist['changed'])} changed, "
+                         f"{len(worklist['withdrawn'])} withdrawn")
+            apply_catalogue_diff(df, worklist)
+            tables.ensure_info_partitions(df['datasetid'].max())
 
-                sdf = sdf.withColumnRenamed(column, column.lower())
+            sdf = spark_session.createDataFrame(df)
         
             reportedmeasurements = sdf.select('reportedmeasurecode', 'reportedmeasurename').dropDuplicates()
             measurements = sdf.select('measurecode', 'measurename').dropDuplicates()
-            values = sdf.select('reportingstartdate', 'reportedmeasurecode', 'datasetid', 'measurecode', 'datasetname')
+            values = sdf.select('reportingstartdate', 'reportedmeasurecode', 'datasetid', 'measurecode', 'datasetname', 'row_hash')
             values = values.withColumn("reportingstartdate", to_date(col("reportingstartdate"), "yyyy-MM-dd"))
         
             insert_into_postgresql(spark_session, reportedmeasurements, "reported_measurements")
             insert_into_postgresql(spark_session, measurements, "measurements")
             insert_into_postgresql(spark_session, values, "datasets")
 
+            return worklist
+
         else:
+            metrics.stage_failures.inc(stage="fetch_catalogue")
             logging.error(f"Failed to fetch data. Status code: {response.status_code}")
             return None
     except Exception as e:
+        # timed has counted a failed request; failures after it are counted here
+        if response is not None:
+            metrics.stage_failures.inc(stage="fetch_catalogue")
         logging.error(f"Exception occurred while fetching datasets list: {e}")
         return None
@@ -1,41 +1,159 @@
 import logging
+import os
+import time
+import uuid
 import requests
 from tqdm import tqdm
-from utilities.tools import insert_into_postgresql
+from utilities.tools import AIHW_API_URL, encode_units, insert_into_postgresql, update_stored
+import utilities.tables as tables
+from utilities.chunks import Reassembly
+import utilities.lake as lake
+import utilities.anomalies as anomalies
+import utilities.rankings as rankings
+import utilities.metrics as metrics
+import sampling_profiler as profiling
 import io
 from pyspark.sql.functions import concat, col
 
-def get_values(dataset_ids):
-    base_url = "https://myhospitalsapi.aihw.gov.au/api/v1/datasets/"
+# Upper bound on the CSV bytes of one published chunk (one line may overshoot it)
+CHUNK_BYTES = int(os.environ.get("ETL_CHUNK_BYTES", str(4 * 2**20)))
+
+
+def get_values(dataset_ids, sizes=None, chunk_bytes=CHUNK_BYTES):
+    """Streams the data items of dataset_ids as CSV chunks of about chunk_bytes.
+
+    Responses are read line by line and yielded as (body, headers) as soon as a
+    chunk fills up, so memory stays at one chunk whatever the dataset sizes.
+    Every chunk starts with the CSV header. Its headers carry the batch id, the
+    chunk's sequence number, the datasets with rows in it and, under
+    "complete", the first sequence number of each dataset whose last rows it
+    holds; Reassembly uses them to mark a dataset stored once all its chunks
+    are. A dataset whose fetch fails is never completed and stays pending.
+
+    When a dict is passed as sizes, the (bytes, rows) of every dataset fetched
+    are recorded in it for the batch planner.
+    """
+    base_url = f"{AIHW_API_URL}/datasets/"
     headers = {
         'Authorization': 'Bearer YOUR_ACCESS_TOKEN',  # Make sure to replace YOUR_ACCESS_TOKEN with your actual token
         'User-Agent': 'MyApp/1.0',
         'accept': 'text/csv'
     }
 
-    concatenated_csv = ""
+    chunk = {"batch": uuid.uuid4().hex, "seq": 0, "header": None, "lines": [], "bytes": 0,
+             "dataset_ids": [], "complete": {}}
+    first_seq = {}
+
+    def cut():
+        body = b"\n".join([chunk["header"] or b""] + chunk["lines"]) + b"\n"
+        message_headers = {"batch": chunk["batch"], "seq": chunk["seq"], "dataset_ids": chunk["dataset_ids"],
+                           "complete": chunk["complete"]}
+        chunk.update(seq=chunk["seq"] + 1, lines=[], bytes=0, dataset_ids=[], complete={})
+        return body, message_headers
+
+    # Time spent on the current dataset: the request, the body read and the chunking, not the consumer's
+    clock = {"seconds": 0.0, "since": 0.0}
+
+    def handoff():
+        clock["seconds"] += time.perf_counter() - clock["since"]
+        try:
+            yield cut()
+        finally:
+            clock["since"] = time.perf_counter()
+
     for dataset_id in dataset_ids:
         url = f"{base_url}{dataset_id}/data-items"
+        nbytes = rows = 0
+        clock.update(seconds=0.0, since=time.perf_counter())
         try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                concatenated_csv += response.text
-            else:
-                logging.error(f"Failed to fetch dataset {dataset_id}. Status code: {response.status_code}")
+            response = requests.get(url, headers=headers, stream=True)
+            with response:
+                if response.status_code != 200:
+                    metrics.stage_failures.inc(stage="fetch")
+                    logging.error(f"Failed to fetch dataset {dataset_id}. Status code: {response.status_code}")
+                    continue
+                lines = (line for line in response.iter_lines(chunk_size=64 * 1024) if line)
+                header = next(lines, None)
+                if header is None:
+                    continue
+                nbytes += len(header) + 1
+                if chunk["header"] not in (None, header) and (chunk["lines"] or chunk["dataset_ids"]):
+                    yield from handoff()
+                chunk["header"] = header
+                first_seq[dataset_id] = chunk["seq"]
+                chunk["dataset_ids"].append(dataset_id)
+                for line in lines:
+                    if chunk["bytes"] >= chunk_bytes:
+                        yield from handoff()
+                        chunk["dataset_ids"].append(dataset_id)
+                    chunk["lines"].append(line)
+                    chunk["bytes"] += len(line) + 1
+                    nbytes += len(line) + 1
+                    rows += 1
+            chunk["complete"][str(dataset_id)] = first_seq.pop(dataset_id)
+            if sizes is not None:
+                sizes[dataset_id] = (nbytes, rows)
         except Exception as e:
+            metrics.stage_failures.inc(stage="fetch")
             logging.error(f"Exception occurred while fetching dataset {dataset_id}: {e}")
+        finally:
+            metrics.stage_seconds.observe(clock["seconds"] + time.perf_counter() - clock["since"], stage="fetch")
+            metrics.stage_bytes.inc(nbytes, stage="fetch")
+            metrics.stage_rows.inc(rows, stage="fetch")
+
+    if chunk["lines"] or chunk["complete"]:
+        yield cut()
 
-    return concatenated_csv
 
+reassembly = Reassembly()
 
 
+def store_values(spark_session, values, rows=0):
+    """Writes data items (datasetid, reportingunitcode, value, caveats) to info and the lake.
+
+    Then scores the datasets they touch, and returns those DataSetIds.
+    Rankings wait for whole datasets: see datasets_completed. Every step replaces or skips what is already there, so storing
+    the same rows twice leaves the same state: the landing-zone stream relies
+    on that to replay a micro-batch after a crash.
+    """
+    with metrics.timed("db_write", rows=rows):
+        if tables.INFO_LAYOUT == "partitioned":
+            insert_into_postgresql(spark_session, encode_units(spark_session, values), 'info_compact')
+        else:
+            values = values.withColumn('id', concat(col('datasetid'), col('reportingunitcode')))
+            insert_into_postgresql(spark_session, values, 'info')
+
+    if lake.enabled():
+        lake.export_batch(values.select('datasetid', 'reportingunitcode', 'value', 'caveats').toPandas())
+
+    # Scores what the committed batch touched; never fails the message
+    batch_ids = [row['datasetid'] for row in values.select('datasetid').distinct().collect()]
+    anomalies.detect_batch(batch_ids)
+    return batch_ids
+
+
+def datasets_completed(dataset_ids):
+    """Marks datasets whose rows are all stored and folds them into the rankings, once each."""
+    update_stored(dataset_ids)
+    rankings.refresh(dataset_ids)
+
+
+@profiling.profiled(params=lambda spark_session, ch, method, properties, body: {"bytes": len(body)})
 def callback_values(spark_session, ch, method, properties, body):
-    try:
-        csv_data = body.decode('utf-8')
-        
-        csv_stream = io.StringIO(csv_data)
-        csv_lines = csv_stream.getvalue().split("\n")
-        
+    """Stores one published chunk and marks the datasets it completes stored.
+
+    Raises on failure: consume_from_rabbitmq then sends the message to a retry
+    queue, or to the dead-letter queue once its retries are spent, and the
+    datasets stay pending.
+    """
+    csv_data = body.decode('utf-8')
+    
+    csv_stream = io.StringIO(csv_data)
+    csv_lines = csv_stream.getvalue().split("\n")
+    # Data lines only: every dataset in the message brings its own header
+    rows = sum(1 for line in csv_lines if line and not line.lower().startswith("datasetid"))
+
+    with metrics.timed("parse", rows=rows, nbytes=len(body)):
         csv_rdd = spark_session.sparkContext.parallelize(csv_lines)
 
         sdf = spark_session.read.csv(csv_rdd, header=True, inferSchema = True)
@@ -45,10 +163,12 @@ def callback_values(spark_session, ch, method, properties, body):
 
         values = sdf.select('datasetid', 'reportingunitcode', 'value', 'caveats')
 
-        values = values.withColumn('id', concat(col('datasetid'), col('reportingunitcode')))
-        insert_into_postgresql(spark_session, values, 'info')
-
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+    batch_ids = store_values(spark_session, values, rows)
 
-    except Exception as e:
-        logging.error(f"Failed to process message: {e}")
+    # Only now is the chunk in Postgres. Chunks of get_values complete their datasets through
+    # reassembly; whole-batch messages (e.g. replayed ones) list every dataset they hold
+    headers = properties.headers or {}
+    if "batch" in headers:
+        datasets_completed(reassembly.chunk_stored(headers))
+    else:
+        datasets_completed(headers.get("dataset_ids") or batch_ids)
@@ -0,0 +1,159 @@
+"""Opt-in sampling profiler for the ETL hot paths and the dashboard pages.
+
+Shared by both through the hra-shared package (src/shared): the Docker images
+install it, and a source checkout runs pip install -e src/shared once.
+
+Disabled unless PROFILE_DIR is set (or ETL.py is started with --profile DIR).
+While a profiled region runs, a background thread samples the stack of the
+thread that entered it every PROFILE_INTERVAL_MS; when the region ends the
+samples are written to PROFILE_DIR as a collapsed-stack file (one
+"frame;frame;... count" line per distinct stack, the input of flamegraph.pl
+and speedscope) with a .json sidecar holding the region parameters.
+
+Regions nest: a sample is counted in every region open on its thread, so a
+batch profile includes the callback_values and insert_into_postgresql time
+that also get files of their own. When disabled, a profiled function costs
+one global lookup per call.
+
+In the dashboard every page run of dashboard.py is a region, tagged with the
+page and the widget values of the session. Streamlit runs each session in its
+own thread, so concurrent page runs are sampled separately.
+"""
+import functools
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Directory the profiles are written to; empty disables profiling
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "")
+# Sampling interval in milliseconds
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+
+_settings = {"directory": PROFILE_DIR, "interval": PROFILE_INTERVAL_MS / 1000}
+_active = {}
+_lock = threading.Condition()
+_sampler = {"thread": None}
+_sequence = itertools.count()
+
+
+def enable(directory, interval_ms=None):
+    """Turns profiling on at run time, e.g. from a command line switch."""
+    _settings["directory"] = directory
+    if interval_ms:
+        _settings["interval"] = interval_ms / 1000
+
+
+def enabled():
+    return bool(_settings["directory"])
+
+
+class Region:
+    def __init__(self, name, params):
+        self.name = name
+        self.params = params
+        self.samples = Counter()
+        self.started = time.time()
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame):
+    stack = []
+    while frame is not None:
+        stack.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def sample_forever():
+    while True:
+        with _lock:
+            while not _active:
+                _lock.wait()
+            targets = {thread_id: list(regions) for thread_id, regions in _active.items()}
+        frames = sys._current_frames()
+        for thread_id, regions in targets.items():
+            frame = frames.get(thread_id)
+            if frame is None:
+                continue
+            stack = collapse(frame)
+            for region in regions:
+                region.samples[stack] += 1
+        del frames
+        time.sleep(_settings["interval"])
+
+
+def tag(name, params):
+    """File name stem: region name, parameters, time, process and a per-process sequence number.
+
+    The sequence number keeps regions ending within the same second (e.g. the
+    page runs of two sessions) from overwriting each other's files.
+    """
+    parts = [name] + [f"{key}-{value}" for key, value in params.items()]
+    stem = re.sub(r"[^A-Za-z0-9_.=-]+", "_", "_".join(parts))[:150]
+    return f"{stem}_{time.strftime('%Y%m%dT%H%M%S')}_{os.getpid()}_{next(_sequence):06d}"
+
+
+def write(region):
+    os.makedirs(_settings["directory"], exist_ok=True)
+    stem = os.path.join(_settings["directory"], tag(region.name, region.params))
+    with open(f"{stem}.collapsed", "w") as f:
+        for stack, count in region.samples.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(f"{stem}.json", "w") as f:
+        json.dump({"name": region.name, "params": region.params, "started": region.started,
+                   "seconds": round(time.time() - region.started, 3), "interval_ms": _settings["interval"] * 1000,
+                   "samples": sum(region.samples.values())}, f, indent=2, default=str)
+    return stem
+
+
+@contextmanager
+def profile(name, **params):
+    """Profiles the enclosed block as one region, tagged with params."""
+    if not _settings["directory"]:
+        yield
+        return
+    region = Region(name, params)
+    thread_id = threading.get_ident()
+    with _lock:
+        if _sampler["thread"] is None:
+            _sampler["thread"] = threading.Thread(target=sample_forever, name="profiler", daemon=True)
+            _sampler["thread"].start()
+        _active.setdefault(thread_id, []).append(region)
+        _lock.notify()
+    try:
+        yield
+    finally:
+        with _lock:
+            _active[thread_id].remove(region)
+            if not _active[thread_id]:
+                del _active[thread_id]
+        try:
+            logging.info(f"Profile written to {write(region)}.collapsed")
+        except OSError as e:
+            logging.error(f"Failed to write profile {region.name}: {e}")
+
+
+def profiled(name=None, params=None):
+    """Decorator form of profile(); params(*args, **kwargs) returns the tags of one call."""
+    def decorator(func):
+        region_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _settings["directory"]:
+                return func(*args, **kwargs)
+            with profile(region_name, **(params(*args, **kwargs) if params else {})):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator